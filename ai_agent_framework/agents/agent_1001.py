@@ -1,29 +1,39 @@
 import openai
-from typing import List, Tuple, Optional, Generator, Deque
+import time
+import asyncio
+from functools import partial
+from typing import Iterable, List, Tuple, Optional, Generator, AsyncGenerator, Deque
 from datetime import datetime, timedelta
 from collections import deque
 from ai_agent_framework.agents.base_agent import BaseAgent
 from ai_agent_framework.knowledge.knowledge_base import VectorDB
-from openai import OpenAI
-from langdetect import detect
-
-def get_language_name(lang_code):
-    """
-    Convert language code to full name
-    """
-    lang_map = {
-        'zh-cn': 'Chinese (Simplified)',
-        'zh-tw': 'Chinese (Traditional)',
-        'en': 'English',
-        # Add more mappings as needed
-    }
-    return lang_map.get(lang_code, lang_code)
+from ai_agent_framework.knowledge.embedder import Embedder, get_embedder
+from ai_agent_framework.agents.answer_cache import AnswerCache, question_symbols
+from ai_agent_framework.agents.context_assembler import ContextAssembler
+from ai_agent_framework.api.openai_client import get_openai_client, get_async_openai_client
+from ai_agent_framework.agents.language_detector import LanguageDetector, get_language_detector, get_language_name
 
 class Agent1001(BaseAgent):
-    def __init__(self, knowledge_base: VectorDB, openai_api_key: str, max_history: int = 5):
+    def __init__(self, knowledge_base: VectorDB, openai_api_key: str, max_history: int = 5,
+                 embedder: Optional[Embedder] = None, answer_cache: Optional[AnswerCache] = None,
+                 context_assembler: Optional[ContextAssembler] = None,
+                 language_detector: Optional[LanguageDetector] = None, session_language: Optional[str] = None,
+                 conversation_history: Optional[Iterable[Tuple[str, str]]] = None):
         super().__init__(knowledge_base)
-        self.client = OpenAI(api_key=openai_api_key)
-        self.conversation_history: Deque[Tuple[str, str]] = deque(maxlen=max_history)
+        self.openai_api_key = openai_api_key
+        # 每条消息都会新建 agent，共享的客户端让请求复用已建立的连接
+        self.client = get_openai_client(openai_api_key)
+        # 嵌入后端由 EMBEDDING_BACKEND 决定；问题的向量先查进程内 LRU 和持久缓存
+        self.embedder = embedder or get_embedder(api_key=openai_api_key)
+        # 前端每条消息都新建 agent，之前的问答由 conversation_history 传入
+        self.conversation_history: Deque[Tuple[str, str]] = deque(conversation_history or (), maxlen=max_history)
+        # 可选的语义答案缓存，相似且提到相同币种的问题直接返回之前生成的答案
+        self.answer_cache = answer_cache
+        # 提示词按 token 预算组装（PROMPT_TOKEN_BUDGET）
+        self.context_assembler = context_assembler or ContextAssembler()
+        self.language_detector = language_detector or get_language_detector()
+        # 会话中上一次检测到的语言，"ok"、"BTC?" 这类无法判断的短消息沿用它
+        self.session_language = session_language
 
     def answer_question(self, question: str, tags: Optional[List[str]] = ["chainbuzz"]) -> Generator[str, None, None]:
         """
@@ -34,8 +44,10 @@ class Agent1001(BaseAgent):
         :param tags: Optional list of tags to filter results, defaults to ["chainbuzz"]
         :yield: Chunks of the answer as they are generated in the user's language
         """
+        start_time = time.time()
+        
         # Detect the language of the question
-        source_lang = detect(question)
+        source_lang = self._detect_language(question)
         language_name = get_language_name(source_lang)
         
         query_vector = self.get_embedding(question)[0]
@@ -45,17 +57,14 @@ class Agent1001(BaseAgent):
             limit=5
         )
         
-        context = self._build_context(question, search_results, language_name)
-        
-        messages = [
-            {"role": "system", "content": f"You are an AI assistant with expertise in trading and cryptocurrency news. Communicate in a warm, conversational tone. Your responses should be concise, engaging, and infused with personality, avoiding unnecessary long-windedness. Use natural, everyday language and avoid technical jargon unless necessary, explaining complex concepts in simple ways. Always consider the previous conversation history and adjust your replies based on the user's prior messages to ensure relevance and coherence. Prioritize understanding the user's underlying needs and intentions, even if they aren't explicitly stated, and offer assistance that addresses these core concerns. If a misunderstanding occurs, politely ask for clarification to keep the conversation flowing smoothly. Where appropriate, include light humor or interesting anecdotes to make interactions more enjoyable without straying from the main topic. IMPORTANT: Always respond in {language_name}."},
-            {"role": "user", "content": context}
-        ]
+        cached_answer = self._lookup_cached_answer(question, query_vector, source_lang, search_results)
+        if cached_answer is not None:
+            yield cached_answer
+            self._update_conversation_history(question, cached_answer)
+            self._record_answer_cache(True, start_time)
+            return
         
-        # Add conversation history to messages
-        for past_question, past_answer in self.conversation_history:
-            messages.append({"role": "user", "content": past_question})
-            messages.append({"role": "assistant", "content": past_answer})
+        messages = self._build_messages(question, search_results, language_name)
         
         response = self.client.chat.completions.create(
             model="gpt-4",
@@ -70,32 +79,115 @@ class Agent1001(BaseAgent):
                 full_answer += content
                 yield content
         
+        self._store_cached_answer(question, query_vector, source_lang, search_results, full_answer)
         self._update_conversation_history(question, full_answer)
+        self._record_answer_cache(False, start_time)
 
-    def _build_context(self, question: str, search_results: List[dict], language_name: str) -> str:
+    async def answer_question_async(self, question: str, tags: Optional[List[str]] = ["chainbuzz"]) -> AsyncGenerator[str, None]:
+        """
+        Async variant of answer_question for async servers. Language detection runs in a
+        worker thread while the embedding request is in flight, the FAISS search runs in
+        the default executor, and the completion is streamed with AsyncOpenAI, so the event
+        loop keeps serving other conversations throughout.
+        
+        :param question: The user's question in any language
+        :param tags: Optional list of tags to filter results, defaults to ["chainbuzz"]
+        :yield: Chunks of the answer as they are generated in the user's language
         """
-        Build context information for GPT-4
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        # 语言检测与嵌入请求同时进行
+        source_lang, query_vector = await asyncio.gather(
+            loop.run_in_executor(None, self._detect_language, question),
+            self.embedder.aembed_query(question)
+        )
+        language_name = get_language_name(source_lang)
+        
+        search_results = await loop.run_in_executor(
+            None, partial(self.knowledge_base.search, query_vector, limit=5)
+        )
+        
+        cached_answer = self._lookup_cached_answer(question, query_vector, source_lang, search_results)
+        if cached_answer is not None:
+            yield cached_answer
+            self._update_conversation_history(question, cached_answer)
+            self._record_answer_cache(True, start_time)
+            return
+        
+        messages = self._build_messages(question, search_results, language_name)
+        
+        response = await get_async_openai_client(self.openai_api_key).chat.completions.create(
+            model="gpt-4",
+            messages=messages,
+            stream=True
+        )
+        
+        full_answer = ""
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                content = chunk.choices[0].delta.content
+                full_answer += content
+                yield content
+        
+        self._store_cached_answer(question, query_vector, source_lang, search_results, full_answer)
+        self._update_conversation_history(question, full_answer)
+        self._record_answer_cache(False, start_time)
+
+    def _detect_language(self, question: str) -> str:
+        """Detect the question's language and remember it as the session's language"""
+        self.session_language = self.language_detector.detect(question, self.session_language)
+        return self.session_language
+
+    def _uses_answer_cache(self) -> bool:
+        # 后续问题的答案依赖对话历史，只缓存对话中的第一个问题
+        return self.answer_cache is not None and not self.conversation_history
+
+    def _lookup_cached_answer(self, question: str, query_vector, source_lang: str,
+                              search_results: List[dict]) -> Optional[str]:
+        """
+        Return a cached answer to a similar question in the same language about the same
+        coins whose context is still current, or None.
+        """
+        if not self._uses_answer_cache():
+            return None
+        entry = self.answer_cache.lookup(query_vector, source_lang, question_symbols(question),
+                                         [result['id'] for result in search_results])
+        return entry.answer if entry is not None else None
+
+    def _store_cached_answer(self, question: str, query_vector, source_lang: str, search_results: List[dict],
+                             answer: str) -> None:
+        if self._uses_answer_cache() and answer:
+            self.answer_cache.store(query_vector, source_lang, question_symbols(question),
+                                    [result['id'] for result in search_results], answer)
+
+    def _record_answer_cache(self, hit: bool, start_time: float) -> None:
+        """Record and print whether the answer came from the cache and how long it took"""
+        if self.answer_cache is None:
+            return
+        duration = time.time() - start_time
+        self.answer_cache.record(hit, duration)
+        stats = self.answer_cache.stats()
+        print(f"Answer cache {'hit' if hit else 'miss'} in {duration:.2f}s "
+              f"(hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {stats['hit_rate']:.0%}, "
+              f"avg hit: {stats['avg_hit_seconds']:.2f}s, avg miss: {stats['avg_miss_seconds']:.2f}s)")
+
+    def _build_messages(self, question: str, search_results: List[dict], language_name: str) -> List[dict]:
+        """
+        Build the chat completion messages (system prompt, context and conversation history)
+        within the context assembler's token budget
         
         :param question: The user's question
         :param search_results: Knowledge base search results
         :param language_name: The name of the language to respond in
-        :return: The constructed context string
+        :return: The messages list
         """
-        context = f"Question: {question}\n\nRelevant information\n"
-        for result in search_results:
-            content = result['content']
-            timestamp = result['timestamp']
-            tags = result['tags']
-            similarity = result['similarity']
-            context += f"- {content} (Timestamp: {timestamp}, Tags: {', '.join(tags)}, Similarity: {similarity:.2f})\n"
-        
-        if self.conversation_history:
-            context += "\nRecent conversation history:\n"
-            for past_question, past_answer in self.conversation_history:
-                context += f"Q: {past_question}\nA: {past_answer}\n\n"
-        
-        context += f"Based on the above information and the conversation history, please provide a concise and accurate answer to the question. If the question is similar to a previous one, refer to the previous answer and provide any updates or corrections if necessary. IMPORTANT: Your response must be in {language_name}."
-        return context
+        system_prompt = f"You are an AI assistant with expertise in trading and cryptocurrency news. Communicate in a warm, conversational tone. Your responses should be concise, engaging, and infused with personality, avoiding unnecessary long-windedness. Use natural, everyday language and avoid technical jargon unless necessary, explaining complex concepts in simple ways. Always consider the previous conversation history and adjust your replies based on the user's prior messages to ensure relevance and coherence. Prioritize understanding the user's underlying needs and intentions, even if they aren't explicitly stated, and offer assistance that addresses these core concerns. If a misunderstanding occurs, politely ask for clarification to keep the conversation flowing smoothly. Where appropriate, include light humor or interesting anecdotes to make interactions more enjoyable without straying from the main topic. IMPORTANT: Always respond in {language_name}."
+        messages, report = self.context_assembler.assemble(
+            system_prompt, question, search_results, language_name, self.conversation_history
+        )
+        print(f"Prompt: {report['prompt_tokens']} tokens of {self.context_assembler.token_budget} "
+              f"({report['documents']} documents, {report['truncated']} shortened, {report['history_turns']} history turns)")
+        return messages
 
     def _update_conversation_history(self, question: str, answer: str) -> None:
         """
@@ -106,15 +198,11 @@ class Agent1001(BaseAgent):
         """
         self.conversation_history.append((question, answer))
 
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str) -> List[List[float]]:
         """
-        Get the embedding for a given text using OpenAI's API
+        Get the embedding for a given text from the configured embedder
         
         :param text: The text to get the embedding for
-        :return: The embedding vector
+        :return: A list holding the embedding vector
         """
-        response = self.client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=[text]
-        )
-        return [embedding.embedding for embedding in response.data]
\ No newline at end of file
+        return [self.embedder.embed_query(text)]
\ No newline at end of file
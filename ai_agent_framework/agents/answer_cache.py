@@ -0,0 +1,220 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+import numpy as np
+
+# 环境变量 ANSWER_CACHE=1 开启缓存（默认关闭）；ANSWER_CACHE_THRESHOLD / ANSWER_CACHE_TTL 调整相似度阈值和有效期
+# 阈值与嵌入模型有关，先用 benchmark_answer_cache.py 在所用模型上测量同义问题和换了币种的问题的相似度
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_TTL = 600.0
+DEFAULT_MAX_ENTRIES = 1000
+
+# 问题中提到的币种；名称和无歧义的代码不区分大小写，"LINK"、"DOT" 这类同时是普通单词的代码只认大写
+COIN_SYMBOLS = {
+    'bitcoin': 'BTC', 'btc': 'BTC', 'xbt': 'BTC',
+    'ethereum': 'ETH', 'ether': 'ETH', 'eth': 'ETH',
+    'solana': 'SOL', 'ripple': 'XRP', 'xrp': 'XRP',
+    'cardano': 'ADA', 'dogecoin': 'DOGE', 'doge': 'DOGE',
+    'bnb': 'BNB', 'tether': 'USDT', 'usdt': 'USDT', 'usdc': 'USDC', 'pyusd': 'PYUSD',
+    'polkadot': 'DOT', 'avalanche': 'AVAX', 'avax': 'AVAX', 'chainlink': 'LINK',
+    'litecoin': 'LTC', 'ltc': 'LTC', 'tron': 'TRX', 'trx': 'TRX', 'toncoin': 'TON',
+    'polygon': 'MATIC', 'matic': 'MATIC', 'shiba': 'SHIB', 'shib': 'SHIB',
+    'uniswap': 'UNI', 'aave': 'AAVE',
+}
+# 其他文字中的名称按子串匹配，俄语等语言的词形变化（如 "биткоине"）也能识别
+COIN_NAMES = {
+    '比特币': 'BTC', '比特幣': 'BTC', 'ビットコイン': 'BTC', '비트코인': 'BTC', 'биткоин': 'BTC', 'біткоїн': 'BTC',
+    '以太坊': 'ETH', '以太币': 'ETH', '以太幣': 'ETH', 'イーサリアム': 'ETH', '이더리움': 'ETH',
+    'эфириум': 'ETH', 'ефіріум': 'ETH',
+    '狗狗币': 'DOGE', '瑞波币': 'XRP', 'ソラナ': 'SOL', '솔라나': 'SOL',
+}
+_WORD_PATTERN = re.compile(r'\$?[A-Za-z][A-Za-z0-9]*|\d+(?:[.,]\d+)*')
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def question_symbols(question: str) -> frozenset:
+    """
+    The coins, tickers and numbers a question mentions, e.g. {'BTC', '2024'} for
+    "Bitcoin price in 2024?". Questions that differ only in the coin, like "Should I
+    buy BTC?" and "Should I buy ETH?", embed almost identically, so a cached answer
+    is only reused when these match too. Any other upper-case word counts as a
+    ticker; an unknown ticker or a shouted word can only cause a miss.
+    """
+    symbols = set()
+    for word in _WORD_PATTERN.findall(question):
+        if word[0].isdigit():
+            symbols.add(word)
+        elif word.startswith('$'):
+            symbols.add(word[1:].upper())
+        elif word.lower() in COIN_SYMBOLS:
+            symbols.add(COIN_SYMBOLS[word.lower()])
+        elif len(word) > 1 and word.isupper():
+            symbols.add(word)
+    lowered = question.lower()
+    symbols.update(symbol for name, symbol in COIN_NAMES.items() if name in lowered)
+    return frozenset(symbols)
+
+
+class CachedAnswer:
+    def __init__(self, vector: np.ndarray, language: str, symbols: frozenset, context_ids: frozenset, answer: str):
+        self.vector = vector
+        self.language = language
+        self.symbols = symbols
+        self.context_ids = context_ids
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class AnswerCache:
+    """
+    In-process cache of generated answers, looked up by query embedding similarity.
+
+    A cached answer is reused for a question in the same language that mentions the
+    same coins and numbers (see question_symbols) and whose embedding has a cosine
+    similarity of at least similarity_threshold with the cached question's. It is
+    dropped when it is older than ttl seconds, or when the question's knowledge base
+    search now returns an article that was not part of the context the answer was
+    generated from, i.e. a newer article matching that context has been imported.
+    """
+
+    def __init__(self, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param similarity_threshold: Minimum cosine similarity between query embeddings
+        :param ttl: Seconds an answer stays valid
+        :param max_entries: Answers kept; the least recently used ones are evicted first
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._next_key = 0
+        # 每种 (语言, 币种) 的问题向量矩阵，条目变化时重建
+        self._matrices = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _matrix(self, group):
+        """(keys, normalized question vectors) of the entries with a (language, symbols) pair"""
+        if group not in self._matrices:
+            keys = [key for key, entry in self._entries.items() if (entry.language, entry.symbols) == group]
+            vectors = np.stack([self._entries[key].vector for key in keys]) if keys else None
+            self._matrices[group] = (keys, vectors)
+        return self._matrices[group]
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._matrices.pop((entry.language, entry.symbols), None)
+
+    def lookup(self, query_vector, language: str, symbols: Iterable[str],
+               context_ids: Iterable[str]) -> Optional[CachedAnswer]:
+        """
+        Find a valid cached answer for a question.
+
+        :param query_vector: The question's embedding
+        :param language: The question's detected language code
+        :param symbols: The question's question_symbols()
+        :param context_ids: Ids of the knowledge base results retrieved for the question now
+        :return: The cached answer, or None
+        """
+        query = self._normalize(query_vector)
+        context_ids = frozenset(context_ids)
+        now = time.time()
+        with self._lock:
+            keys, vectors = self._matrix((language, frozenset(symbols)))
+            if vectors is None:
+                return None
+            similarities = vectors @ query
+            # 从最相似的开始检查，过期或上下文已更新的条目直接删除
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.similarity_threshold:
+                    break
+                key = keys[i]
+                entry = self._entries[key]
+                if now - entry.created_at > self.ttl or not context_ids <= entry.context_ids:
+                    self._remove(key)
+                    self.invalidated += 1
+                    continue
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def store(self, query_vector, language: str, symbols: Iterable[str], context_ids: Iterable[str],
+              answer: str) -> None:
+        """
+        Cache an answer together with the ids of the results it was generated from.
+
+        :param query_vector: The question's embedding
+        :param language: The question's detected language code
+        :param symbols: The question's question_symbols()
+        :param context_ids: Ids of the knowledge base results used as context
+        :param answer: The generated answer
+        """
+        entry = CachedAnswer(self._normalize(query_vector), language, frozenset(symbols), frozenset(context_ids),
+                             answer)
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            self._matrices.pop((entry.language, entry.symbols), None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def record(self, hit: bool, seconds: float) -> None:
+        """Count a request answered from (hit) or past (miss) the cache and its latency"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidated': self.invalidated,
+                'hit_rate': self.hits / total if total else 0.0,
+                'avg_hit_seconds': self.hit_seconds / self.hits if self.hits else 0.0,
+                'avg_miss_seconds': self.miss_seconds / self.misses if self.misses else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    The process-wide answer cache configured from the environment when ANSWER_CACHE=1
+    enables it, otherwise None.
+    """
+    global _shared_cache
+    if os.getenv("ANSWER_CACHE", "0").strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AnswerCache(
+                similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)),
+                ttl=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL))
+            )
+        return _shared_cache
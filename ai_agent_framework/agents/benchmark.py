@@ -10,6 +10,7 @@ sys.path.insert(0, project_root)
 
 from ai_agent_framework.agents import Agent1001
 from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.embedder import get_embedder, knowledge_db_path
 
 # 加载环境变量
 load_dotenv()
@@ -95,15 +96,15 @@ def main():
     if not openai_api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables")
     
-    # 获取数据库路径
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(current_dir, "..", "knowledge", "knowledge.db")
+    # 嵌入模型决定向量维度和数据库路径
+    embedder = get_embedder(api_key=openai_api_key)
+    db_path = knowledge_db_path(embedder)
     
     # 初始化知识库
-    knowledge_base = VectorDB(db_path)
+    knowledge_base = VectorDB(db_path, vector_dim=embedder.dimension)
     
     # 初始化 Agent1001
-    agent = Agent1001(knowledge_base, openai_api_key)
+    agent = Agent1001(knowledge_base, openai_api_key, embedder=embedder)
     
     results = run_benchmark(agent)
     save_results(results, agent.__class__.__name__)
@@ -0,0 +1,109 @@
+import os
+import sys
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_root)
+
+from ai_agent_framework.agents.answer_cache import DEFAULT_SIMILARITY_THRESHOLD, question_symbols
+from ai_agent_framework.knowledge.embedder import get_embedder
+
+# 加载环境变量
+load_dotenv()
+
+# 措辞不同、答案相同的问题，应当命中缓存
+PARAPHRASES = [
+    ("What are your thoughts on BTC right now?", "What do you think about BTC at the moment?"),
+    ("Where are the current support and resistance levels for BTC?", "What are BTC's support and resistance levels now?"),
+    ("Should I go short or long on BTC, and why?", "Should I long or short BTC, and why?"),
+    ("What do you think about ETH's price at the moment?", "What's your take on the ETH price right now?"),
+    ("What are the current funding rates for BTC and ETH?", "What are BTC and ETH funding rates right now?"),
+    ("What is the current market sentiment using the fear and greed index?",
+     "What does the fear and greed index say about market sentiment now?"),
+    ("How can I spot a potential BTC reversal using technical indicators or chart patterns?",
+     "Which indicators or chart patterns show a possible BTC reversal?"),
+    ("What's the best strategy for scalping BTC or ETH in a volatile market?",
+     "How should I scalp BTC or ETH when the market is volatile?"),
+    ("你觉得以太坊现在的价格怎么样？", "你怎么看以太坊现在的价格？"),
+    ("Was hältst du gerade vom Bitcoin-Kurs?", "Wie findest du den Bitcoin-Kurs gerade?"),
+]
+
+# 只有币种（或数字）不同的问题，答案不同，不能命中缓存
+NEAR_MISS_TEMPLATES = [
+    "What are your thoughts on {} right now?",
+    "Where are the current support and resistance levels for {}?",
+    "Should I go short or long on {}, and why?",
+    "What are the current funding rates for {}?",
+    "How do I find the best entry points for {} as a day trader?",
+    "Is {} a good buy today?",
+]
+NEAR_MISS_COINS = ["BTC", "ETH", "SOL", "Bitcoin", "Ethereum"]
+NEAR_MISS_NUMBERS = [
+    ("What happened to BTC in 2021?", "What happened to BTC in 2022?"),
+    ("Will BTC reach 100k this year?", "Will BTC reach 150k this year?"),
+]
+
+
+def near_miss_pairs():
+    pairs = list(NEAR_MISS_NUMBERS)
+    for template in NEAR_MISS_TEMPLATES:
+        for i, first in enumerate(NEAR_MISS_COINS):
+            for second in NEAR_MISS_COINS[i + 1:]:
+                if question_symbols(first) != question_symbols(second):
+                    pairs.append((template.format(first), template.format(second)))
+    return pairs
+
+
+def similarities(embedder, pairs):
+    """Cosine similarity of each pair's embeddings"""
+    texts = sorted({text for pair in pairs for text in pair})
+    vectors = dict(zip(texts, embedder.embed(texts)))
+    result = []
+    for first, second in pairs:
+        a, b = np.asarray(vectors[first], dtype=np.float32), np.asarray(vectors[second], dtype=np.float32)
+        result.append(float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b))))
+    return np.array(result)
+
+
+def run_benchmark(embedder):
+    near_misses = near_miss_pairs()
+    paraphrase_similarities = similarities(embedder, PARAPHRASES)
+    near_miss_similarities = similarities(embedder, near_misses)
+    # 按币种分组后，近似问题只有 question_symbols 相同时才会被比较
+    symbols_match = np.array([question_symbols(a) == question_symbols(b) for a, b in near_misses])
+    paraphrase_symbols_match = np.array([question_symbols(a) == question_symbols(b) for a, b in PARAPHRASES])
+
+    print(f"Model: {embedder.model_name}, {len(PARAPHRASES)} paraphrase pairs, {len(near_misses)} near-miss pairs\n")
+    print(f"Paraphrases:  min {paraphrase_similarities.min():.4f}  median {np.median(paraphrase_similarities):.4f}")
+    print(f"Near misses:  max {near_miss_similarities.max():.4f}  median {np.median(near_miss_similarities):.4f}\n")
+
+    print("Threshold  paraphrase hits  near-miss hits (embedding only)  near-miss hits (with symbols)")
+    for threshold in np.round(np.arange(0.80, 1.0, 0.01), 2):
+        hits = (paraphrase_similarities >= threshold) & paraphrase_symbols_match
+        false_hits = near_miss_similarities >= threshold
+        print(f"{threshold:>9.2f}  {hits.sum():>8}/{len(hits):<6}  {false_hits.sum():>16}/{len(false_hits):<15}  "
+              f"{(false_hits & symbols_match).sum():>13}/{len(false_hits)}"
+              f"{'   <- default' if threshold == DEFAULT_SIMILARITY_THRESHOLD else ''}")
+
+    # 不依赖币种分组也没有误命中的最低阈值
+    safe = near_miss_similarities.max() + 0.01
+    print(f"\nLowest threshold with no near-miss hits on embeddings alone: {safe:.2f}; "
+          f"set ANSWER_CACHE_THRESHOLD to at least this for {embedder.model_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure query similarities of paraphrases and of questions about different coins, "
+                    "to choose ANSWER_CACHE_THRESHOLD for an embedding model")
+    parser.add_argument('--backend', help="Embedding backend; defaults to EMBEDDING_BACKEND")
+    parser.add_argument('--model', help="Embedding model; defaults to EMBEDDING_MODEL")
+    args = parser.parse_args()
+    embedder = get_embedder(args.backend, args.model, api_key=os.getenv("OPENAI_API_KEY"))
+    run_benchmark(embedder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_root)
+
+from ai_agent_framework.agents.language_detector import LanguageDetector, detect_script, looks_english
+
+# 英语问题与 BENCHMARK_QUESTIONS 同类，另加常见的其他语言提问
+SAMPLE_QUESTIONS = [
+    "What are your thoughts on BTC right now?",
+    "Where are the current support and resistance levels for BTC?",
+    "Should I go short or long on BTC, and why?",
+    "What do you think about ETH's price at the moment?",
+    "Can you give me a quick technical analysis of BTC and ETH for today?",
+    "What is the current market sentiment using the fear and greed index?",
+    "How can I use open interest and volume to gauge market sentiment for BTC and ETH?",
+    "BTC?",
+    "ok thanks",
+    "比特币现在的支撑位和阻力位在哪里？",
+    "你觉得以太坊现在的价格怎么样？",
+    "比特幣現在應該做多還是做空？",
+    "ビットコインの今の価格についてどう思いますか？",
+    "비트코인 지금 사야 하나요?",
+    "Что вы думаете о биткоине сейчас?",
+    "Які зараз рівні підтримки для біткоїна?",
+    "¿Qué opinas del precio de bitcoin ahora mismo?",
+    "Que penses-tu du prix du bitcoin en ce moment ?",
+    "Was hältst du gerade vom Bitcoin-Kurs?",
+    "Qual é o sentimento atual do mercado de criptomoedas?",
+    "Bitcoin şu anda alınır mı?",
+    "Có nên mua bitcoin lúc này không?",
+]
+
+
+def time_calls(function, texts, repeat):
+    """Per-call latencies in microseconds"""
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            function(text)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return np.array(latencies)
+
+
+def report(name, latencies):
+    print(f"{name:<36} mean {latencies.mean():>9.1f} µs   p50 {np.percentile(latencies, 50):>9.1f} µs   "
+          f"p99 {np.percentile(latencies, 99):>9.1f} µs")
+
+
+def run_benchmark(texts, repeat):
+    from langdetect import detect
+
+    print(f"{len(texts)} texts, {repeat} passes")
+    start = time.perf_counter()
+    detect(texts[0])
+    print(f"langdetect first call (loads profiles): {(time.perf_counter() - start) * 1000:.1f} ms")
+    # 在 LanguageDetector 固定随机种子之前记录 langdetect 默认行为下的结果
+    unseeded_runs = {text: sorted({detect(text) for _ in range(5)}) for text in texts}
+    start = time.perf_counter()
+    detector = LanguageDetector()
+    print(f"LanguageDetector initialisation:        {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    report("langdetect.detect (current)", time_calls(detect, texts, repeat))
+
+    def detect_uncached(text):
+        detector._cache.clear()
+        return detector.detect(text)
+    report("LanguageDetector (no memo)", time_calls(detect_uncached, texts, repeat))
+    report("LanguageDetector (memoized)", time_calls(detector.detect, texts, repeat))
+
+    # 各条路径命中的比例，以及当前实现多次运行的结果
+    script = sum(1 for text in texts if detect_script(text) is not None)
+    english = sum(1 for text in texts if detect_script(text) is None and looks_english(text))
+    print(f"\nResolved by script: {script}, by English words: {english}, by langdetect: {len(texts) - script - english}")
+
+    print("\nText                                               langdetect runs          LanguageDetector")
+    for text in texts:
+        print(f"{text[:50]:<50} {','.join(unseeded_runs[text]):<24} {detector.detect(text)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare language detection latency of langdetect and LanguageDetector")
+    parser.add_argument('--repeat', type=int, default=20, help="Passes over the sample questions")
+    args = parser.parse_args()
+    run_benchmark(SAMPLE_QUESTIONS, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+from ai_agent_framework.utils.tokens import TokenCounter, get_token_counter
+
+# GPT-4 (8k) 的上下文中为回答预留空间后的提示词预算
+DEFAULT_PROMPT_TOKEN_BUDGET = 3000
+DEFAULT_DOCUMENT_TOKENS = 400
+# 对话历史最多占用的预算比例
+DEFAULT_HISTORY_SHARE = 0.3
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。！？])\s+|\n+')
+_WORD = re.compile(r'[^\W_]+', re.UNICODE)
+_CJK = re.compile(r'[぀-ヿ㐀-鿿]')
+
+
+def query_terms(text: str) -> set:
+    """Lowercase words of the text; CJK characters count as single terms"""
+    terms = set()
+    for word in _WORD.findall(text.lower()):
+        if _CJK.search(word):
+            terms.update(_CJK.findall(word))
+        elif len(word) > 2:
+            terms.add(word)
+    return terms
+
+
+class ContextAssembler:
+    """
+    Builds Agent1001's prompt within a hard token budget.
+
+    Every search result gets an equal share of the budget left after the fixed prompt
+    text and the history. A document that does not fit is cut down to the passage that
+    shares the most terms with the question, extended with its neighbouring sentences.
+    Past turns go only into the chat messages (never repeated in the context), newest
+    first, without repeated questions, up to history_share of the budget.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, document_tokens: int = DEFAULT_DOCUMENT_TOKENS,
+                 history_share: float = DEFAULT_HISTORY_SHARE, counter: Optional[TokenCounter] = None):
+        """
+        :param token_budget: Maximum prompt tokens; defaults to PROMPT_TOKEN_BUDGET, then DEFAULT_PROMPT_TOKEN_BUDGET
+        :param document_tokens: Maximum tokens per search result
+        :param history_share: Maximum fraction of the budget used by conversation history
+        :param counter: TokenCounter to use; defaults to the shared one
+        """
+        self.token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
+        self.document_tokens = document_tokens
+        self.history_share = history_share
+        self.counter = counter or get_token_counter()
+
+    def snippet(self, text: str, terms: set, max_tokens: int) -> Tuple[str, bool]:
+        """
+        Cut text to max_tokens around its most relevant sentence.
+
+        :return: (snippet, whether the text was shortened)
+        """
+        if self.counter.count(text) <= max_tokens:
+            return text, False
+        sentences = [sentence for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+        if len(sentences) <= 1 or not terms:
+            return self.counter.truncate(text, max_tokens), True
+
+        scores = [len(terms & query_terms(sentence)) for sentence in sentences]
+        best = max(range(len(sentences)), key=lambda i: (scores[i], -i))
+        lengths = [self.counter.count(sentence) + 1 for sentence in sentences]
+        start = end = best
+        used = lengths[best]
+        # 以最相关的句子为中心，交替向后、向前扩展到预算用完
+        while True:
+            grown = False
+            if end + 1 < len(sentences) and used + lengths[end + 1] <= max_tokens:
+                end += 1
+                used += lengths[end]
+                grown = True
+            if start > 0 and used + lengths[start - 1] <= max_tokens:
+                start -= 1
+                used += lengths[start]
+                grown = True
+            if not grown:
+                break
+        passage = " ".join(sentences[start:end + 1])
+        if start > 0:
+            passage = "... " + passage
+        if end < len(sentences) - 1:
+            passage += " ..."
+        return self.counter.truncate(passage, max_tokens), True
+
+    def select_history(self, history: Iterable[Tuple[str, str]], max_tokens: int) -> List[Tuple[str, str]]:
+        """The most recent distinct turns that fit in max_tokens, oldest first"""
+        selected = []
+        seen_questions = set()
+        used = 0
+        for question, answer in reversed(list(history)):
+            key = question.strip().lower()
+            if key in seen_questions:
+                continue
+            tokens = self.counter.count(question) + self.counter.count(answer) + 8
+            if used + tokens > max_tokens:
+                break
+            seen_questions.add(key)
+            selected.append((question, answer))
+            used += tokens
+        selected.reverse()
+        return selected
+
+    def assemble(self, system_prompt: str, question: str, search_results: Sequence[dict], language_name: str,
+                 history: Iterable[Tuple[str, str]] = ()) -> Tuple[List[dict], dict]:
+        """
+        Build the chat completion messages.
+
+        :param system_prompt: The system message
+        :param question: The user's question
+        :param search_results: Knowledge base search results, most relevant first
+        :param language_name: The name of the language to respond in
+        :param history: (question, answer) pairs, oldest first
+        :return: (messages, report with prompt_tokens, documents, truncated, history_turns)
+        """
+        header = f"Question: {question}\n\nRelevant information\n"
+        footer = (
+            "\nBased on the above information and the conversation history, please provide a concise and accurate "
+            "answer to the question. If the question is similar to a previous one, refer to the previous answer and "
+            f"provide any updates or corrections if necessary. IMPORTANT: Your response must be in {language_name}."
+        )
+        # 每条消息另有约 4 个 token 的格式开销
+        fixed_tokens = self.counter.count(system_prompt) + self.counter.count(header) + self.counter.count(footer) + 8
+
+        turns = self.select_history(history, int((self.token_budget - fixed_tokens) * self.history_share))
+        history_tokens = sum(self.counter.count(q) + self.counter.count(a) + 8 for q, a in turns)
+        remaining = self.token_budget - fixed_tokens - history_tokens
+
+        terms = query_terms(question)
+        parts = [header]
+        documents = truncated = 0
+        for i, result in enumerate(search_results):
+            tags = ', '.join(result['tags'])
+            suffix = f" (Timestamp: {result['timestamp']}, Tags: {tags}, Similarity: {result['similarity']:.2f})\n"
+            overhead = self.counter.count(suffix) + 2
+            # 剩余预算在尚未加入的文档之间平均分配
+            share = min(self.document_tokens, remaining // (len(search_results) - i)) - overhead
+            if share <= 0:
+                break
+            content, shortened = self.snippet(result['content'], terms, share)
+            parts.append(f"- {content}{suffix}")
+            remaining -= self.counter.count(content) + overhead
+            documents += 1
+            truncated += shortened
+        parts.append(footer)
+        context = "".join(parts)
+
+        # 历史对话放在系统消息之后、当前问题之前，最后一条消息始终是当前问题
+        messages = [{"role": "system", "content": system_prompt}]
+        for past_question, past_answer in turns:
+            messages.append({"role": "user", "content": past_question})
+            messages.append({"role": "assistant", "content": past_answer})
+        messages.append({"role": "user", "content": context})
+
+        report = {
+            'prompt_tokens': sum(self.counter.count(message['content']) + 4 for message in messages),
+            'documents': documents,
+            'truncated': truncated,
+            'history_turns': len(turns),
+        }
+        return messages, report
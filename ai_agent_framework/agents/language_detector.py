@@ -0,0 +1,245 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# langdetect 支持的全部语言代码
+LANGUAGE_NAMES = {
+    'af': 'Afrikaans',
+    'ar': 'Arabic',
+    'bg': 'Bulgarian',
+    'bn': 'Bengali',
+    'ca': 'Catalan',
+    'cs': 'Czech',
+    'cy': 'Welsh',
+    'da': 'Danish',
+    'de': 'German',
+    'el': 'Greek',
+    'en': 'English',
+    'es': 'Spanish',
+    'et': 'Estonian',
+    'fa': 'Persian',
+    'fi': 'Finnish',
+    'fr': 'French',
+    'gu': 'Gujarati',
+    'he': 'Hebrew',
+    'hi': 'Hindi',
+    'hr': 'Croatian',
+    'hu': 'Hungarian',
+    'id': 'Indonesian',
+    'it': 'Italian',
+    'ja': 'Japanese',
+    'kn': 'Kannada',
+    'ko': 'Korean',
+    'lt': 'Lithuanian',
+    'lv': 'Latvian',
+    'mk': 'Macedonian',
+    'ml': 'Malayalam',
+    'mr': 'Marathi',
+    'ne': 'Nepali',
+    'nl': 'Dutch',
+    'no': 'Norwegian',
+    'pa': 'Punjabi',
+    'pl': 'Polish',
+    'pt': 'Portuguese',
+    'ro': 'Romanian',
+    'ru': 'Russian',
+    'sk': 'Slovak',
+    'sl': 'Slovenian',
+    'so': 'Somali',
+    'sq': 'Albanian',
+    'sv': 'Swedish',
+    'sw': 'Swahili',
+    'ta': 'Tamil',
+    'te': 'Telugu',
+    'th': 'Thai',
+    'tl': 'Tagalog',
+    'tr': 'Turkish',
+    'uk': 'Ukrainian',
+    'ur': 'Urdu',
+    'vi': 'Vietnamese',
+    'zh-cn': 'Chinese (Simplified)',
+    'zh-tw': 'Chinese (Traditional)',
+}
+
+# 只被一种语言使用的文字，直接按字符范围判断
+_SCRIPT_LANGUAGES = [
+    (re.compile(r'[぀-ヿ]'), 'ja'),
+    (re.compile(r'[가-힯ᄀ-ᇿ㄰-㆏]'), 'ko'),
+    (re.compile(r'[Ͱ-Ͽ]'), 'el'),
+    (re.compile(r'[֐-׿]'), 'he'),
+    (re.compile(r'[฀-๿]'), 'th'),
+    (re.compile(r'[ঀ-৿]'), 'bn'),
+    (re.compile(r'[਀-੿]'), 'pa'),
+    (re.compile(r'[઀-૿]'), 'gu'),
+    (re.compile(r'[஀-௿]'), 'ta'),
+    (re.compile(r'[ఀ-౿]'), 'te'),
+    (re.compile(r'[ಀ-೿]'), 'kn'),
+    (re.compile(r'[ഀ-ൿ]'), 'ml'),
+]
+_HAN = re.compile(r'[一-鿿㐀-䶿]')
+_CYRILLIC = re.compile(r'[Ѐ-ӿ]')
+_LETTER = re.compile(r'[^\W\d_]', re.UNICODE)
+_WORD = re.compile(r"[a-z']+")
+_LETTER_RUN = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+# 常用字中繁简写法不同的部分，用来区分繁体和简体中文
+_TRADITIONAL_CHARS = set("們這個來說時為會對從與過還麼學國現發經點開關業體實長東頭問題幣價區塊鏈錢買賣漲跌應該場")
+_SIMPLIFIED_CHARS = set("们这个来说时为会对从与过还么学国现发经点开关业体实长东头问题币价区块链钱买卖涨跌应该场")
+
+# 西里尔字母中各语言特有的字母
+_CYRILLIC_MARKERS = [
+    (set("іїєґ"), 'uk'),
+    (set("ѓќљњџѕ"), 'mk'),
+    (set("ыэ"), 'ru'),
+]
+
+# 纯 ASCII 文本中出现足够多的英语功能词时直接判定为英语
+_ENGLISH_WORDS = {
+    "the", "a", "an", "is", "are", "was", "were", "be", "do", "does", "did", "what", "where", "when", "why",
+    "how", "which", "who", "should", "can", "could", "would", "will", "i", "you", "your", "my", "me", "we",
+    "it", "its", "this", "that", "of", "to", "in", "on", "for", "with", "and", "or", "about", "right", "now",
+    "any", "there", "if", "at", "from", "think", "today", "current", "best", "good", "give", "tell",
+}
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+# langdetect 对很短的文本同样给出接近 1 的概率 ('BTC?' -> de 0.99999)，
+# 少于这么多个词或字母的文本一律视为不确定
+DEFAULT_MIN_WORDS = 3
+DEFAULT_MIN_LETTERS = 12
+
+_shared_detector = None
+_shared_detector_lock = threading.Lock()
+
+
+def get_language_name(lang_code: str) -> str:
+    """
+    Convert language code to full name
+    """
+    return LANGUAGE_NAMES.get(lang_code, lang_code)
+
+
+def detect_script(text: str) -> Optional[str]:
+    """
+    The language of text when its script identifies it unambiguously, else None.
+    Covers scripts used by a single language, Chinese (traditional or simplified by
+    characteristic characters), Japanese kana and the distinctive Cyrillic letters.
+    """
+    for pattern, language in _SCRIPT_LANGUAGES:
+        if pattern.search(text):
+            return language
+    if _HAN.search(text):
+        traditional = sum(1 for char in text if char in _TRADITIONAL_CHARS)
+        simplified = sum(1 for char in text if char in _SIMPLIFIED_CHARS)
+        return 'zh-tw' if traditional > simplified else 'zh-cn'
+    if _CYRILLIC.search(text):
+        lowered = set(text.lower())
+        for markers, language in _CYRILLIC_MARKERS:
+            if lowered & markers:
+                return language
+    return None
+
+
+def looks_english(text: str) -> bool:
+    """ASCII text in which at least two words and a third of all words are common English function words"""
+    if not text.isascii():
+        return False
+    words = _WORD.findall(text.lower())
+    if not words:
+        return False
+    common = sum(1 for word in words if word in _ENGLISH_WORDS)
+    return common >= 2 and common * 3 >= len(words)
+
+
+class LanguageDetector:
+    """
+    Detects the language of a user's message, cheapest check first:
+
+    1. the in-process memo of recent texts
+    2. the script (CJK, kana, Hangul, distinctive Cyrillic letters, other single-language scripts)
+    3. common English function words in ASCII text
+    4. langdetect, initialised once with a fixed seed so results are deterministic
+
+    When langdetect is unsure, or the text is too short for its probability to mean
+    anything (such as "ok" or "BTC?"), the session's previous language is kept.
+    """
+
+    def __init__(self, cache_size: int = 4096, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                 min_words: int = DEFAULT_MIN_WORDS, min_letters: int = DEFAULT_MIN_LETTERS):
+        """
+        :param cache_size: Number of recent texts whose result is memoized
+        :param min_confidence: Minimum langdetect probability to override the session language
+        :param min_words: Texts with fewer words are never a confident langdetect result
+        :param min_letters: Texts with fewer letters are never a confident langdetect result
+        """
+        from langdetect import DetectorFactory
+        from langdetect.detector_factory import init_factory
+
+        # langdetect 默认每次检测使用随机种子，固定种子后结果可复现；语言模型在此一次性加载
+        DetectorFactory.seed = 0
+        init_factory()
+        self.cache_size = cache_size
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.min_letters = min_letters
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _detect_uncached(self, text: str) -> Tuple[str, bool]:
+        """(language code, whether the result is confident)"""
+        language = detect_script(text)
+        if language is not None:
+            return language, True
+        if looks_english(text):
+            return 'en', True
+        if not _LETTER.search(text):
+            return 'en', False
+        words = _LETTER_RUN.findall(text)
+        long_enough = len(words) >= self.min_words and sum(map(len, words)) >= self.min_letters
+
+        from langdetect import detect_langs
+        from langdetect.lang_detect_exception import LangDetectException
+        try:
+            best = detect_langs(text)[0]
+        except LangDetectException:
+            return 'en', False
+        return best.lang, long_enough and best.prob >= self.min_confidence
+
+    def detect_with_confidence(self, text: str) -> Tuple[str, bool]:
+        """
+        :param text: The text to identify
+        :return: (language code, whether the result is confident)
+        """
+        key = text.strip()
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                return result
+
+        result = self._detect_uncached(key)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def detect(self, text: str, session_language: Optional[str] = None) -> str:
+        """
+        :param text: The text to identify
+        :param session_language: Language detected earlier in the same conversation, if any
+        :return: The language code
+        """
+        language, confident = self.detect_with_confidence(text)
+        if not confident and session_language:
+            return session_language
+        return language
+
+
+def get_language_detector() -> LanguageDetector:
+    """The process-wide LanguageDetector, created and initialised on first use"""
+    global _shared_detector
+    with _shared_detector_lock:
+        if _shared_detector is None:
+            _shared_detector = LanguageDetector()
+        return _shared_detector
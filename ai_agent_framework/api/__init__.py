@@ -1,3 +1,4 @@
 from .openai_api import OpenAIAPI
+from .openai_client import get_openai_client
 
-__all__ = ['OpenAIAPI']
\ No newline at end of file
+__all__ = ['OpenAIAPI', 'get_openai_client']
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import asyncio
+import weakref
+import threading
+from typing import Optional
+from openai import (OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient, Timeout,
+                    DEFAULT_CONNECTION_LIMITS)
+
+# 使用 SDK 自己的 httpx 类型，避免与单独安装的 httpx 版本不一致
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+# 连接池参数可通过环境变量调整
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+# OpenAI SDK 在未指定 base_url 时使用的地址
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+_shared_clients = {}
+# 异步连接池绑定在创建它的事件循环上，每个事件循环各有一组客户端
+_shared_async_clients = weakref.WeakKeyDictionary()
+_shared_clients_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _http_client_options(max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                         keepalive_expiry: Optional[float] = None, timeout: Optional[float] = None,
+                         connect_timeout: Optional[float] = None, http2: Optional[bool] = None) -> dict:
+    """
+    Connection pool settings for the httpx clients the OpenAI SDK sends its requests through.
+    Unset arguments come from the OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_KEEPALIVE_EXPIRY, OPENAI_TIMEOUT, OPENAI_CONNECT_TIMEOUT and OPENAI_HTTP2
+    environment variables, then the defaults above.
+
+    :param max_connections: Maximum number of open connections
+    :param max_keepalive_connections: Idle connections kept open for reuse
+    :param keepalive_expiry: Seconds an idle connection is kept open
+    :param timeout: Read/write/pool timeout in seconds
+    :param connect_timeout: Connect timeout in seconds
+    :param http2: Use HTTP/2 (requires the h2 package; falls back to HTTP/1.1 without it)
+    :return: Keyword arguments for DefaultHttpxClient / DefaultAsyncHttpxClient
+    """
+    if http2 is None:
+        http2 = _env_bool("OPENAI_HTTP2")
+    if http2 and not _http2_available():
+        print("Warning: OPENAI_HTTP2 is set but the h2 package is not installed. Using HTTP/1.1.")
+        http2 = False
+
+    limits = Limits(
+        max_connections=max_connections or int(_env_float("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=max_keepalive_connections or int(
+            _env_float("OPENAI_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+        keepalive_expiry=keepalive_expiry or _env_float("OPENAI_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)
+    )
+    timeout = Timeout(
+        timeout or _env_float("OPENAI_TIMEOUT", DEFAULT_TIMEOUT),
+        connect=connect_timeout or _env_float("OPENAI_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+    )
+    return {'limits': limits, 'timeout': timeout, 'http2': http2}
+
+
+def create_http_client(**kwargs) -> DefaultHttpxClient:
+    """Create a pooled httpx client; see _http_client_options for the arguments"""
+    # DefaultHttpxClient 保留 SDK 自身的默认设置（如跟随重定向），只替换连接池和超时
+    return DefaultHttpxClient(**_http_client_options(**kwargs))
+
+
+def create_async_http_client(**kwargs) -> DefaultAsyncHttpxClient:
+    """Create a pooled async httpx client; see _http_client_options for the arguments"""
+    return DefaultAsyncHttpxClient(**_http_client_options(**kwargs))
+
+
+def _client_key(api_key: Optional[str], base_url) -> tuple:
+    """
+    The (api_key, base_url) a shared client is stored under. The base URL is resolved
+    the way the SDK does and kept as a string without a trailing slash, so None, the
+    default URL and a client's own base_url (an httpx.URL ending in '/') share one client.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+    return api_key, str(base_url).rstrip('/')
+
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+    """
+    Return the process-wide OpenAI client for an API key and base URL, creating it on
+    first use. All callers share one connection pool, so requests reuse open keep-alive
+    connections instead of doing a new TCP/TLS handshake each time.
+
+    Use client.with_options(...) for per-caller settings such as max_retries; the copy
+    shares the same connection pool.
+
+    :param api_key: API key; defaults to the OPENAI_API_KEY environment variable
+    :param base_url: API base URL; defaults to OPENAI_BASE_URL, then the OpenAI API
+                     (point it at a local stand-in such as fake_embeddings_server.py)
+    :return: The shared client
+    """
+    key = api_key, base_url = _client_key(api_key, base_url)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=create_http_client())
+            _shared_clients[key] = client
+        return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client of the running event loop for an API key and
+    base URL, creating it on first use. Must be called from a coroutine: an async
+    connection pool can only be used on the event loop it was created on.
+
+    :param api_key: See get_openai_client
+    :param base_url: See get_openai_client
+    :return: The shared async client
+    """
+    loop = asyncio.get_running_loop()
+    key = api_key, base_url = _client_key(api_key, base_url)
+    with _shared_clients_lock:
+        clients = _shared_async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=create_async_http_client())
+            clients[key] = client
+        return client
+
+
+def close_openai_clients():
+    """Close the shared sync clients and their connection pools"""
+    with _shared_clients_lock:
+        for client in _shared_clients.values():
+            client.close()
+        _shared_clients.clear()
@@ -1,39 +1,106 @@
+import threading
+from collections import OrderedDict
 import gradio as gr
-from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.shared_vector_db import get_shared_vector_db
+from ai_agent_framework.knowledge.embedder import get_embedder
 from ai_agent_framework.agents.agent_1001 import Agent1001
-from typing import Generator, List, Tuple
+from ai_agent_framework.agents.answer_cache import get_answer_cache
+from ai_agent_framework.utils.tokens import get_token_counter
+from ai_agent_framework.agents.language_detector import get_language_detector
+from typing import AsyncGenerator, Generator, List, Optional, Tuple
 
 class ChatInterface:
+    # 记住语言的会话数上限
+    MAX_SESSIONS = 10000
+
     def __init__(self, db_path: str, openai_api_key: str):
         self.db_path = db_path
         self.openai_api_key = openai_api_key
+        # 整个进程共用一个嵌入模型和一个知识库实例，新数据由后台线程加载并原子切换
+        self.embedder = get_embedder(api_key=openai_api_key)
+        self.knowledge_base = get_shared_vector_db(db_path, vector_dim=self.embedder.dimension)
+        # 每条消息都新建 agent，答案缓存在进程内共享（ANSWER_CACHE=1 开启）
+        self.answer_cache = get_answer_cache()
+        # 启动时加载 tokenizer，首个请求不承担加载（或离线时的下载重试）开销
+        get_token_counter()
+        # 语言检测模型同样在启动时加载；每个会话记住上一次检测到的语言
+        self.language_detector = get_language_detector()
+        self.session_languages = OrderedDict()
+        self._session_lock = threading.Lock()
         self.agents = {
             "Agent1001": Agent1001,
             # Add other agents
         }
 
-    def chat(self, message: str, agent_name: str, history: List[Tuple[str, str]]) -> Generator[List[Tuple[str, str]], None, None]:
+    def _session_language(self, session_id: Optional[str]) -> Optional[str]:
+        with self._session_lock:
+            return self.session_languages.get(session_id) if session_id else None
+
+    def _remember_session_language(self, session_id: Optional[str], language: Optional[str]) -> None:
+        if not session_id or not language:
+            return
+        with self._session_lock:
+            self.session_languages[session_id] = language
+            self.session_languages.move_to_end(session_id)
+            while len(self.session_languages) > self.MAX_SESSIONS:
+                self.session_languages.popitem(last=False)
+
+    def _create_agent(self, agent_class, session_id: Optional[str], history: List[Tuple[str, str]]):
+        # 之前的问答交给新 agent，后续问题带着对话历史回答，也不会命中答案缓存
+        conversation_history = [(question, answer) for question, answer in history if answer]
+        return agent_class(self.knowledge_base, self.openai_api_key, embedder=self.embedder,
+                           answer_cache=self.answer_cache, language_detector=self.language_detector,
+                           session_language=self._session_language(session_id),
+                           conversation_history=conversation_history)
+
+    def chat(self, message: str, agent_name: str, history: List[Tuple[str, str]],
+             session_id: Optional[str] = None) -> Generator[List[Tuple[str, str]], None, None]:
         """
         Process user message and generate a streaming response.
 
         :param message: User's input message
         :param agent_name: Name of the selected agent
         :param history: Chat history
+        :param session_id: Identifies the user's session, so short messages keep the session's language
         :yield: Updated chat history with streaming response
         """
-        db = VectorDB(self.db_path)
         agent_class = self.agents.get(agent_name)
         if not agent_class:
             yield history + [(message, "Invalid agent selected. Please choose a valid agent.")]
             return
 
-        agent = agent_class(db, self.openai_api_key)
+        agent = self._create_agent(agent_class, session_id, history)
         response_generator = agent.answer_question(message)
         
         partial_response = ""
         for chunk in response_generator:
             partial_response += chunk
             yield history + [(message, partial_response)]
+        self._remember_session_language(session_id, agent.session_language)
+
+    async def chat_async(self, message: str, agent_name: str, history: List[Tuple[str, str]],
+                         session_id: Optional[str] = None) -> AsyncGenerator[List[Tuple[str, str]], None]:
+        """
+        Async variant of chat(): streams the agent's answer_question_async on the event
+        loop, so concurrent conversations do not each hold a worker thread.
+
+        :param message: User's input message
+        :param agent_name: Name of the selected agent
+        :param history: Chat history
+        :param session_id: Identifies the user's session, so short messages keep the session's language
+        :yield: Updated chat history with streaming response
+        """
+        agent_class = self.agents.get(agent_name)
+        if not agent_class:
+            yield history + [(message, "Invalid agent selected. Please choose a valid agent.")]
+            return
+
+        agent = self._create_agent(agent_class, session_id, history)
+        partial_response = ""
+        async for chunk in agent.answer_question_async(message):
+            partial_response += chunk
+            yield history + [(message, partial_response)]
+        self._remember_session_language(session_id, agent.session_language)
 
     def launch(self):
         with gr.Blocks() as demo:
@@ -54,13 +121,15 @@ class ChatInterface:
             def user(user_message: str, history: List[Tuple[str, str]]) -> Tuple[str, List[Tuple[str, str]]]:
                 return "", history + [(user_message, None)]
 
-            def bot(history: List[Tuple[str, str]], agent_name: str) -> Generator[List[Tuple[str, str]], None, None]:
+            async def bot(history: List[Tuple[str, str]], agent_name: str, request: gr.Request) -> AsyncGenerator[List[Tuple[str, str]], None]:
                 user_message = history[-1][0]
-                for updated_history in self.chat(user_message, agent_name, history[:-1]):
+                session_id = request.session_hash if request else None
+                async for updated_history in self.chat_async(user_message, agent_name, history[:-1], session_id):
                     yield updated_history
 
+            # 异步处理函数不占用线程，取消默认每个事件只处理一个请求的并发限制
             msg.submit(user, [msg, chatbot], [msg, chatbot], queue=False).then(
-                bot, [chatbot, agent_dropdown], chatbot
+                bot, [chatbot, agent_dropdown], chatbot, concurrency_limit=None
             )
             clear.click(lambda: None, None, chatbot, queue=False)
 
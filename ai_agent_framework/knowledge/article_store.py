@@ -0,0 +1,378 @@
+import os
+import json
+import sqlite3
+from typing import Iterable, Iterator, Optional, Tuple
+
+# 存档格式：'sqlite'（默认）或 'jsonl'，可用 ARTICLE_STORAGE 环境变量选择
+DEFAULT_STORAGE = 'sqlite'
+STORAGE_FILES = {
+    'sqlite': 'knowledge_base.db',
+    'jsonl': 'knowledge_base.jsonl',
+}
+LEGACY_JSON_FILE = 'knowledge_base.json'
+
+
+def _in_window(article: dict, start: Optional[int], end: Optional[int], source: Optional[str],
+               tag: Optional[str]) -> bool:
+    timestamp = article.get('timestamp')
+    if start is not None and (timestamp is None or timestamp < start):
+        return False
+    if end is not None and (timestamp is None or timestamp >= end):
+        return False
+    if source is not None and article.get('source') != source:
+        return False
+    return tag is None or tag in article.get('tags', [])
+
+
+class ArticleStore:
+    """
+    Append-only article archive in JSON Lines format: one article per line.
+
+    Writers only ever append, so an update costs O(new articles) instead of rewriting
+    the whole archive. Readers stream the file line by line from any byte offset; each
+    article is yielded together with the offset just past it, which callers persist as
+    a checkpoint to resume from next time. A last line without its newline is an append
+    still in progress and is left for the next read.
+    """
+    # VectorDB metadata key holding the byte offset imported so far
+    CHECKPOINT_KEY = 'article_store_offset'
+
+    def __init__(self, path: str):
+        """
+        :param path: Path to the .jsonl file; created on the first append
+        """
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def size(self) -> int:
+        """Current size of the archive in bytes, 0 if it does not exist yet"""
+        return os.path.getsize(self.path) if self.exists() else 0
+
+    def append(self, articles: Iterable[dict]) -> int:
+        """
+        Append articles with a single write.
+
+        :param articles: Article dicts (data, source, timestamp, tags)
+        :return: The number of articles appended
+        """
+        lines = [json.dumps(article, ensure_ascii=False) + '\n' for article in articles]
+        if not lines:
+            return 0
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines)
+
+    def iter_from(self, offset: int = 0) -> Iterator[Tuple[int, dict]]:
+        """
+        Stream articles starting at a byte offset.
+
+        :param offset: Offset returned with a previously read article, or 0 for the beginning
+        :yield: (offset just past the article, article)
+        """
+        if not self.exists():
+            return
+        if offset > self.size():
+            # 文件被截断或替换，checkpoint 已失效
+            print(f"Warning: Offset {offset} is past the end of {self.path}. Reading from the beginning.")
+            offset = 0
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # 写入尚未完成的最后一行，留到下次读取
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping malformed line ending at offset {offset} in {self.path}")
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, article in self.iter_from(0):
+            yield article
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None, source: Optional[str] = None,
+              tag: Optional[str] = None) -> Iterator[dict]:
+        """
+        Articles in a time window, optionally from one source or with one tag.
+        Scans the whole file; SQLiteArticleStore answers the same query from its indexes.
+
+        :param start: Earliest timestamp, inclusive
+        :param end: Latest timestamp, exclusive
+        """
+        for article in self:
+            if _in_window(article, start, end, source, tag):
+                yield article
+
+
+class SQLiteArticleStore:
+    """
+    Article archive in SQLite: one row per article, with the source and timestamp
+    columns indexed and the tags in an indexed (tag, article) table.
+
+    Each append() is a single transaction, so a crash leaves either the whole batch
+    or none of it and the cost of an update depends on the new articles only. Readers
+    stream the rows in insertion order from a row id checkpoint, like ArticleStore's
+    byte offset, or query a time window without loading the archive.
+    """
+    TABLE_NAME = 'articles'
+    TAGS_TABLE_NAME = 'article_tags'
+    SQLITE_TIMEOUT = 30.0
+    # VectorDB metadata key holding the last row id imported so far
+    CHECKPOINT_KEY = 'article_store_rowid'
+
+    def __init__(self, path: str):
+        """
+        :param path: Path to the SQLite file; created on first use
+        """
+        self.path = path
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=self.SQLITE_TIMEOUT, check_same_thread=False)
+            # WAL 模式下读取（如 embeding.py 同步）不会被正在写入的批次阻塞
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            with self._conn:
+                # AUTOINCREMENT 保证行号不被复用，可作为读取进度
+                self._conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        data TEXT NOT NULL,
+                        source TEXT,
+                        timestamp INTEGER,
+                        guid TEXT,
+                        tags TEXT NOT NULL
+                    )
+                ''')
+                self._conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {self.TAGS_TABLE_NAME} (
+                        tag TEXT NOT NULL,
+                        article_id INTEGER NOT NULL,
+                        PRIMARY KEY (tag, article_id)
+                    ) WITHOUT ROWID
+                ''')
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE_NAME}_source "
+                                   f"ON {self.TABLE_NAME} (source, timestamp)")
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE_NAME}_timestamp "
+                                   f"ON {self.TABLE_NAME} (timestamp)")
+        return self._conn
+
+    @staticmethod
+    def _to_article(row) -> dict:
+        _, data, source, timestamp, guid, tags = row
+        article = {"data": data, "source": source, "timestamp": timestamp}
+        if guid is not None:
+            article["guid"] = guid
+        article["tags"] = json.loads(tags)
+        return article
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def size(self) -> int:
+        """Current size of the database in bytes, including its write-ahead log; 0 if it does not exist yet"""
+        return sum(os.path.getsize(path) for path in (self.path, self.path + '-wal') if os.path.exists(path))
+
+    def count(self) -> int:
+        """Number of articles stored"""
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME}").fetchone()[0]
+
+    def append(self, articles: Iterable[dict]) -> int:
+        """
+        Insert articles in a single transaction.
+
+        :param articles: Article dicts (data, source, timestamp, guid, tags)
+        :return: The number of articles inserted
+        """
+        articles = list(articles)
+        if not articles:
+            return 0
+        conn = self._connection()
+        with conn:
+            for article in articles:
+                tags = article.get('tags', [])
+                cursor = conn.execute(
+                    f"INSERT INTO {self.TABLE_NAME} (data, source, timestamp, guid, tags) VALUES (?, ?, ?, ?, ?)",
+                    (article['data'], article.get('source'), article.get('timestamp'), article.get('guid'),
+                     json.dumps(tags, ensure_ascii=False))
+                )
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO {self.TAGS_TABLE_NAME} (tag, article_id) VALUES (?, ?)",
+                    [(tag, cursor.lastrowid) for tag in tags]
+                )
+        return len(articles)
+
+    def iter_from(self, offset: int = 0) -> Iterator[Tuple[int, dict]]:
+        """
+        Stream articles in insertion order after a row id.
+
+        :param offset: Row id returned with a previously read article, or 0 for the beginning
+        :yield: (row id of the article, article)
+        """
+        if not self.exists():
+            return
+        conn = self._connection()
+        last_id = conn.execute(f"SELECT MAX(id) FROM {self.TABLE_NAME}").fetchone()[0] or 0
+        if offset > last_id:
+            # 数据库被重建，checkpoint 已失效
+            print(f"Warning: Row id {offset} is past the end of {self.path}. Reading from the beginning.")
+            offset = 0
+        cursor = conn.execute(
+            f"SELECT id, data, source, timestamp, guid, tags FROM {self.TABLE_NAME} WHERE id > ? ORDER BY id",
+            (offset,)
+        )
+        for row in cursor:
+            yield row[0], self._to_article(row)
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, article in self.iter_from(0):
+            yield article
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None, source: Optional[str] = None,
+              tag: Optional[str] = None) -> Iterator[dict]:
+        """
+        Articles in a time window, optionally from one source or with one tag, oldest first.
+
+        :param start: Earliest timestamp, inclusive
+        :param end: Latest timestamp, exclusive
+        """
+        if not self.exists():
+            return
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if source is not None:
+            conditions.append("source = ?")
+            params.append(source)
+        if tag is not None:
+            conditions.append(f"id IN (SELECT article_id FROM {self.TAGS_TABLE_NAME} WHERE tag = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self._connection().execute(
+            f"SELECT id, data, source, timestamp, guid, tags FROM {self.TABLE_NAME} {where} ORDER BY timestamp, id",
+            params
+        )
+        for row in cursor:
+            yield self._to_article(row)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def convert_json_to_jsonl(json_path: str, jsonl_path: str) -> int:
+    """
+    One-time conversion of the legacy knowledge_base.json array into an ArticleStore.
+    The output is written to a temporary file and moved into place atomically.
+
+    :param json_path: Path to the legacy JSON file
+    :param jsonl_path: Path to the JSON Lines file to create
+    :return: The number of articles converted
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        articles = json.load(f)
+
+    tmp_path = jsonl_path + '.tmp'
+    # 先创建空文件，空数组也能得到一个有效的存档
+    open(tmp_path, 'w').close()
+    ArticleStore(tmp_path).append(articles)
+    os.replace(tmp_path, jsonl_path)
+    print(f"Converted {len(articles)} articles from {json_path} to {jsonl_path}")
+    return len(articles)
+
+
+def convert_to_sqlite(articles: Iterable[dict], db_path: str, chunk_size: int = 1000) -> int:
+    """
+    One-time import of an existing archive (a JSONL ArticleStore or the legacy JSON
+    array) into a SQLiteArticleStore. The database is built in a temporary file and
+    moved into place atomically.
+
+    :param articles: The articles to import, in order
+    :param db_path: Path to the SQLite file to create
+    :param chunk_size: Articles inserted per transaction
+    :return: The number of articles imported
+    """
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    store = SQLiteArticleStore(tmp_path)
+    count = 0
+    chunk = []
+    for article in articles:
+        chunk.append(article)
+        if len(chunk) >= chunk_size:
+            count += store.append(chunk)
+            chunk = []
+    count += store.append(chunk)
+    # 关闭连接时 WAL 内容写回主文件，之后再移动
+    store.close()
+    os.replace(tmp_path, db_path)
+    print(f"Imported {count} articles into {db_path}")
+    return count
+
+
+def export_json(articles: Iterable[dict], json_path: str) -> int:
+    """
+    Write articles as a legacy knowledge_base.json array (indent=4), streaming them
+    to a temporary file that is moved into place atomically.
+
+    :param articles: The articles to export, e.g. the whole store (insertion order) or store.query(start, end)
+    :param json_path: Path to the JSON file to write
+    :return: The number of articles exported
+    """
+    tmp_path = json_path + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for article in articles:
+            # 与 json.dump(articles, f, indent=4) 的输出逐字节一致；只按 '\n' 分行缩进，
+            # 文本中的 U+2028 等字符不是换行 (textwrap.indent 会在这些字符处断行)
+            f.write(',\n' if count else '[\n')
+            f.write('\n'.join('    ' + line for line in json.dumps(article, indent=4, ensure_ascii=False).split('\n')))
+            count += 1
+        f.write('\n]' if count else '[]')
+    os.replace(tmp_path, json_path)
+    print(f"Exported {count} articles to {json_path}")
+    return count
+
+
+def open_article_store(directory: str, storage: Optional[str] = None):
+    """
+    The article archive in directory, in the format chosen by storage or the
+    ARTICLE_STORAGE environment variable. On first use it is converted once from the
+    formats the archive was kept in before: knowledge_base.jsonl or knowledge_base.json.
+
+    :param directory: Directory holding the archive (data_source)
+    :param storage: 'sqlite' (knowledge_base.db) or 'jsonl' (knowledge_base.jsonl)
+    :return: A SQLiteArticleStore or an ArticleStore
+    """
+    storage = storage or os.getenv("ARTICLE_STORAGE", DEFAULT_STORAGE)
+    if storage not in STORAGE_FILES:
+        raise ValueError(f"Unknown article storage: {storage}. Expected one of {', '.join(STORAGE_FILES)}")
+    path = os.path.join(directory, STORAGE_FILES[storage])
+    jsonl_path = os.path.join(directory, STORAGE_FILES['jsonl'])
+    json_path = os.path.join(directory, LEGACY_JSON_FILE)
+
+    if storage == 'jsonl':
+        if not os.path.exists(path) and os.path.exists(json_path):
+            convert_json_to_jsonl(json_path, path)
+        return ArticleStore(path)
+
+    if not os.path.exists(path):
+        if os.path.exists(jsonl_path):
+            convert_to_sqlite(ArticleStore(jsonl_path), path)
+        elif os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                convert_to_sqlite(json.load(f), path)
+    return SQLiteArticleStore(path)
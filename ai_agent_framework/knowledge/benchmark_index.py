@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_root)
+
+from ai_agent_framework.knowledge.knowledge_base import DEFAULT_VECTOR_DIM, VectorDB, blob_to_vector
+from ai_agent_framework.knowledge.index_factory import (
+    STORAGE_TYPES,
+    blob_dtype,
+    build_index,
+    code_size,
+    make_search_params,
+    needs_training,
+    resolve_index_params,
+    train_index,
+)
+
+
+def stored_vector_dim(db_path):
+    """
+    The vector dimension of a knowledge base: the one recorded in its FAISS snapshot,
+    otherwise the largest stored BLOB read as float32 (float16 rows are half as long).
+    """
+    meta_path = os.path.splitext(db_path)[0] + '.faiss.meta.npz'
+    if os.path.exists(meta_path):
+        with np.load(meta_path, allow_pickle=False) as meta:
+            return int(meta['vector_dim'])
+    with sqlite3.connect(db_path) as conn:
+        blob_size = conn.execute(f"SELECT MAX(LENGTH(vector)) FROM {VectorDB.TABLE_NAME}").fetchone()[0]
+    return blob_size // 4 if blob_size else None
+
+
+def load_corpus(db_path, vector_dim=None):
+    """
+    Load every vector stored in the knowledge base into one float32 matrix
+
+    :param vector_dim: The vector dimension; defaults to stored_vector_dim()
+    """
+    vector_dim = vector_dim or stored_vector_dim(db_path)
+    if not vector_dim:
+        return np.empty((0, 0), dtype=np.float32)
+    with sqlite3.connect(db_path) as conn:
+        count = conn.execute(f"SELECT COUNT(*) FROM {VectorDB.TABLE_NAME}").fetchone()[0]
+        vectors = np.empty((count, vector_dim), dtype=np.float32)
+        loaded = 0
+        for (vector_blob,) in conn.execute(f"SELECT vector FROM {VectorDB.TABLE_NAME}"):
+            if loaded == count:
+                break
+            if isinstance(vector_blob, bytes) and len(vector_blob) in (vector_dim * 4, vector_dim * 2):
+                vectors[loaded] = blob_to_vector(vector_blob, vector_dim)
+                loaded += 1
+    if loaded < count:
+        print(f"Skipped {count - loaded} vectors whose size does not match dimension {vector_dim}")
+    return vectors[:loaded]
+
+
+def synthetic_corpus(size, vector_dim=DEFAULT_VECTOR_DIM, clusters=200, seed=42):
+    """Clustered random vectors, a rough stand-in for news embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, vector_dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=size)
+    vectors = centers[assignment] + 0.5 * rng.normal(size=(size, vector_dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def default_configs(corpus_size):
+    """Index configurations to compare, scaled to the corpus size"""
+    # 每个聚类中心至少需要 39 个训练样本
+    nlist = max(16, min(int(4 * np.sqrt(corpus_size)), corpus_size // 39))
+    return [
+        ('ivf_flat', {'nlist': nlist, 'nprobe': 8}),
+        ('ivf_flat', {'nlist': nlist, 'nprobe': 32}),
+        ('hnsw', {'M': 32, 'efSearch': 32}),
+        ('hnsw', {'M': 32, 'efSearch': 128}),
+        ('ivf_pq', {'nlist': nlist, 'nprobe': 16, 'pq_m': 64}),
+        ('ivf_pq', {'nlist': nlist, 'nprobe': 64, 'pq_m': 96}),
+    ]
+
+
+def measure(index, index_type, params, queries, k):
+    """Search one query at a time, as the chat agent does, and return (labels, latencies in ms)"""
+    search_params = make_search_params(index, index_type, params)
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start_time = time.perf_counter()
+        _, labels[i:i + 1] = index.search(query[None, :], k, params=search_params)
+        latencies[i] = (time.perf_counter() - start_time) * 1000
+    return labels, latencies
+
+
+def recall_at_k(labels, ground_truth):
+    hits = sum(len(set(row) & set(truth)) for row, truth in zip(labels, ground_truth))
+    return hits / ground_truth.size
+
+
+def run_benchmark(corpus, query_count=200, k=5):
+    vector_dim = corpus.shape[1]
+    rng = np.random.default_rng(0)
+    queries = corpus[rng.choice(len(corpus), size=min(query_count, len(corpus)), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    flat_params = resolve_index_params('flat')
+    flat = build_index('flat', vector_dim, flat_params)
+    flat.add(corpus)
+    ground_truth, flat_latencies = measure(flat, 'flat', flat_params, queries, k)
+
+    print(f"Corpus: {len(corpus)} vectors, dim {vector_dim}, {len(queries)} queries, k={k}")
+    print(f"{'index':<45} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'flat':<45} {0.0:>8.2f} {1.0:>9.3f} {np.percentile(flat_latencies, 50):>8.3f} {np.percentile(flat_latencies, 95):>8.3f}")
+
+    for index_type, overrides in default_configs(len(corpus)):
+        params = resolve_index_params(index_type, overrides)
+        label = f"{index_type} {overrides}"
+        start_time = time.perf_counter()
+        try:
+            index = build_index(index_type, vector_dim, params)
+            if needs_training(index_type):
+                train_index(index, corpus, params, index_type)
+            index.add(corpus)
+        except (RuntimeError, ValueError) as e:
+            print(f"{label:<45} skipped: {e}")
+            continue
+        build_time = time.perf_counter() - start_time
+
+        labels, latencies = measure(index, index_type, params, queries, k)
+        print(f"{label:<45} {build_time:>8.2f} {recall_at_k(labels, ground_truth):>9.3f} "
+              f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 95):>8.3f}")
+
+
+def rerank(index, queries, stored_vectors, k, factor):
+    """Fetch k * factor candidates from the index and re-rank them with the stored vectors, as VectorDB does"""
+    _, candidates = index.search(queries, k * factor)
+    labels = np.full((len(queries), k), -1, dtype=np.int64)
+    for i, (query, row) in enumerate(zip(queries, candidates)):
+        row = row[row >= 0]
+        distances = ((stored_vectors[row].astype(np.float32) - query) ** 2).sum(axis=1)
+        best = row[np.argsort(distances, kind='stable')[:k]]
+        labels[i, :len(best)] = best
+    return labels
+
+
+def run_storage_benchmark(corpus, query_count=200, k=5, index_type='flat'):
+    """Compare bytes per vector and recall@k of every storage mode, with and without re-ranking"""
+    vector_dim = corpus.shape[1]
+    rng = np.random.default_rng(0)
+    queries = corpus[rng.choice(len(corpus), size=min(query_count, len(corpus)), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    flat = build_index('flat', vector_dim, resolve_index_params('flat'))
+    flat.add(corpus)
+    _, ground_truth = flat.search(queries, k)
+
+    print(f"Corpus: {len(corpus)} vectors, dim {vector_dim}, {len(queries)} queries, k={k}, index {index_type}")
+    print(f"{'storage':<10} {'index B/vec':>12} {'SQLite B/vec':>13} {'build s':>8} {'recall@k':>9} {'reranked':>9}")
+    for storage in STORAGE_TYPES:
+        params = resolve_index_params(index_type, None, storage)
+        start_time = time.perf_counter()
+        try:
+            index = build_index(index_type, vector_dim, params, storage)
+            if needs_training(index_type, storage):
+                train_index(index, corpus, params, index_type, storage)
+            index.add(corpus)
+        except (RuntimeError, ValueError) as e:
+            print(f"{storage:<10} skipped: {e}")
+            continue
+        build_time = time.perf_counter() - start_time
+
+        stored_vectors = corpus.astype(blob_dtype(storage))
+        labels, _ = measure(index, index_type, params, queries, k)
+        reranked = rerank(index, queries, stored_vectors, k, params['rerank_factor'])
+        print(f"{storage:<10} {code_size(index_type, vector_dim, params, storage):>12} {stored_vectors.itemsize * vector_dim:>13} "
+              f"{build_time:>8.2f} {recall_at_k(labels, ground_truth):>9.3f} {recall_at_k(reranked, ground_truth):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall@k and latency of FAISS index types and storage modes against the flat baseline")
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge.db'))
+    parser.add_argument('--synthetic', type=int, default=0, help="Use N synthetic vectors instead of the database")
+    parser.add_argument('--dim', type=int, default=None,
+                        help=f"Vector dimension; read from the database by default, {DEFAULT_VECTOR_DIM} for --synthetic")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--storage', action='store_true', help="Compare storage modes (bytes per vector, recall) instead of index types")
+    parser.add_argument('--index-type', default='flat', help="Index type used with --storage")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = synthetic_corpus(args.synthetic, args.dim or DEFAULT_VECTOR_DIM)
+    else:
+        corpus = load_corpus(args.db, args.dim)
+    if len(corpus) == 0:
+        print("No vectors to benchmark. Import data first or pass --synthetic N.")
+        return
+    if args.storage:
+        run_storage_benchmark(corpus, args.queries, args.k, args.index_type)
+    else:
+        run_benchmark(corpus, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import os
+import re
+import asyncio
+import threading
+from typing import List, Optional, Sequence
+import numpy as np
+from ai_agent_framework.knowledge.embedding_cache import DEFAULT_EMBEDDING_MODEL, EmbeddingCache, get_embedding_cache
+
+# 环境变量 EMBEDDING_BACKEND 选择后端 ('openai' 或 'local')，EMBEDDING_MODEL 选择模型
+EMBEDDING_BACKENDS = ('openai', 'local')
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+KNOWLEDGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# OpenAI 嵌入模型的输出维度
+OPENAI_MODEL_DIMENSIONS = {
+    'text-embedding-ada-002': 1536,
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+}
+
+_shared_embedders = {}
+_shared_embedders_lock = threading.Lock()
+
+
+class Embedder:
+    """
+    Turns texts into float32 vectors of a fixed dimension.
+
+    Subclasses implement embed_batch(); embed() and embed_query() put the persistent
+    EmbeddingCache (and its LRU for query strings) in front of it, keyed by model_name.
+    aembed_query() is the async counterpart; subclasses with a native async API override
+    aembed_batch(), otherwise it runs embed_batch() in a worker thread.
+    """
+    # 远程后端受网络延迟限制，适合并发请求；本地后端由推理库自己使用多线程
+    remote = False
+
+    def __init__(self, model_name: str, dimension: int, cache: Optional[EmbeddingCache] = None):
+        """
+        :param model_name: Model identifier, also the embedding cache key
+        :param dimension: Length of the vectors this embedder produces
+        :param cache: EmbeddingCache to use; defaults to the shared cache for model_name
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        self.cache = cache or get_embedding_cache(model_name)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts without the cache; returns a float32 matrix of shape (len(texts), dimension)"""
+        raise NotImplementedError("This method should be implemented by subclasses")
+
+    def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Embed texts, sending only those not cached yet to embed_batch()"""
+        return self.cache.get_many(list(texts), self.embed_batch)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query string, served from the in-process LRU when it was asked before"""
+        return self.cache.get(text, self.embed_batch)
+
+    async def aembed_batch(self, texts: List[str]) -> np.ndarray:
+        """Async embed_batch(); without a native async API the call runs in a worker thread"""
+        return await asyncio.to_thread(self.embed_batch, texts)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """Async embed_query(), with the same caching"""
+        return await self.cache.aget(text, self.aembed_batch)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API"""
+    remote = True
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, api_key: Optional[str] = None, client=None,
+                 dimension: Optional[int] = None, max_retries: int = 2, cache: Optional[EmbeddingCache] = None):
+        """
+        :param model_name: OpenAI embedding model
+        :param api_key: API key; defaults to the OPENAI_API_KEY environment variable
+        :param client: OpenAI client to use; defaults to the shared pooled client for api_key
+        :param dimension: Vector dimension, required for models not in OPENAI_MODEL_DIMENSIONS
+        :param max_retries: Retries done by the OpenAI client itself
+        :param cache: EmbeddingCache to use; defaults to the shared cache for model_name
+        """
+        if dimension is None:
+            if model_name not in OPENAI_MODEL_DIMENSIONS:
+                raise ValueError(f"Unknown dimension for embedding model '{model_name}'. Pass dimension explicitly.")
+            dimension = OPENAI_MODEL_DIMENSIONS[model_name]
+        super().__init__(model_name, dimension, cache)
+        if client is None:
+            from ai_agent_framework.api.openai_client import get_openai_client
+            client = get_openai_client(api_key)
+        # with_options 返回的副本与共享客户端使用同一个连接池
+        self.client = client.with_options(max_retries=max_retries)
+        self.max_retries = max_retries
+
+    @property
+    def async_client(self):
+        """The shared AsyncOpenAI client of the running event loop, with the same key, URL and retries"""
+        from ai_agent_framework.api.openai_client import get_async_openai_client
+        client = get_async_openai_client(self.client.api_key, self.client.base_url)
+        return client.with_options(max_retries=self.max_retries)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        response = self.client.embeddings.create(
+            model=self.model_name,
+            input=texts
+        )
+        return np.asarray([embedding.embedding for embedding in response.data], dtype=np.float32)
+
+    async def aembed_batch(self, texts: List[str]) -> np.ndarray:
+        response = await self.async_client.embeddings.create(
+            model=self.model_name,
+            input=texts
+        )
+        return np.asarray([embedding.embedding for embedding in response.data], dtype=np.float32)
+
+
+class LocalEmbedder(Embedder):
+    """
+    Embeddings computed on the CPU with sentence-transformers, no network involved.
+
+    The model is loaded and warmed up once in the constructor; use get_embedder() so the
+    whole process shares one loaded model. Inference is serialized with a lock so
+    concurrent requests do not oversubscribe the torch thread pool.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL, device: str = 'cpu', num_threads: Optional[int] = None,
+                 batch_size: int = 64, normalize: bool = True, cache: Optional[EmbeddingCache] = None):
+        """
+        :param model_name: sentence-transformers model name or local path
+        :param device: torch device, 'cpu' by default
+        :param num_threads: torch intra-op threads; None keeps the torch default
+        :param batch_size: Texts per forward pass
+        :param normalize: L2-normalize the vectors (matches OpenAI embeddings, which are unit length)
+        :param cache: EmbeddingCache to use; defaults to the shared cache for model_name
+        """
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("The local embedding backend requires sentence-transformers and torch (see requirements.txt)") from e
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+        self.model = SentenceTransformer(model_name, device=device)
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self._lock = threading.Lock()
+        super().__init__(model_name, self.model.get_sentence_embedding_dimension(), cache)
+        # 预热一次，首个真实查询不承担图初始化和内存分配的开销
+        self.embed_batch(["warm up"])
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        with self._lock, self._torch.inference_mode():
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+                show_progress_bar=False
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedder(backend: Optional[str] = None, model_name: Optional[str] = None, api_key: Optional[str] = None,
+                    **kwargs) -> Embedder:
+    """
+    Create an embedder for a backend.
+
+    :param backend: 'openai' or 'local'; defaults to the EMBEDDING_BACKEND environment variable, then 'openai'
+    :param model_name: Model to use; defaults to EMBEDDING_MODEL, then the backend's default model
+    :param api_key: OpenAI API key, ignored by the local backend
+    :param kwargs: Passed to the embedder's constructor
+    :return: The embedder
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "openai")
+    model_name = model_name or os.getenv("EMBEDDING_MODEL")
+    if backend == 'openai':
+        return OpenAIEmbedder(model_name or DEFAULT_EMBEDDING_MODEL, api_key=api_key, **kwargs)
+    if backend == 'local':
+        return LocalEmbedder(model_name or DEFAULT_LOCAL_MODEL, **kwargs)
+    raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {EMBEDDING_BACKENDS}")
+
+
+def get_embedder(backend: Optional[str] = None, model_name: Optional[str] = None, api_key: Optional[str] = None,
+                 **kwargs) -> Embedder:
+    """
+    Return the process-wide embedder for a backend and model, creating it on first use,
+    so a local model is loaded once and stays warm.
+
+    :param backend: See create_embedder
+    :param model_name: See create_embedder
+    :param api_key: See create_embedder (only used on creation)
+    :param kwargs: Passed to the embedder's constructor (only used on creation)
+    :return: The shared instance
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "openai")
+    model_name = model_name or os.getenv("EMBEDDING_MODEL")
+    key = (backend, model_name)
+    with _shared_embedders_lock:
+        embedder = _shared_embedders.get(key)
+        if embedder is None:
+            embedder = create_embedder(backend, model_name, api_key, **kwargs)
+            _shared_embedders[key] = embedder
+        return embedder
+
+
+def knowledge_db_path(embedder: Embedder) -> str:
+    """
+    The knowledge base file for an embedder. Vectors from different models cannot share
+    an index, so models other than the default one get their own database file.
+    """
+    if embedder.model_name == DEFAULT_EMBEDDING_MODEL:
+        return os.path.join(KNOWLEDGE_DIR, "knowledge.db")
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', embedder.model_name).strip('_').lower()
+    return os.path.join(KNOWLEDGE_DIR, f"knowledge_{slug}.db")
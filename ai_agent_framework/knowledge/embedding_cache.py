@@ -0,0 +1,207 @@
+import os
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Sequence
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+# 缓存文件默认放在知识库数据库旁边，clear_database() 不会清空它
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.db")
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def content_hash(text: str) -> str:
+    """The md5 of the text, the same key VectorDB uses as its entry id"""
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model, md5 of the text), backed by SQLite.
+
+    get_many() looks up a whole batch with one query per chunk and calls the embedding
+    function only for texts that have never been embedded with this model. get() is
+    meant for query strings and keeps an in-process LRU in front of the SQLite table,
+    so a repeated question skips both the network and the disk. aget() is the same
+    for async callers.
+    """
+    TABLE_NAME = 'embeddings'
+    SQL_VARIABLE_LIMIT = 900
+    SQLITE_TIMEOUT = 30.0
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, model: str = DEFAULT_EMBEDDING_MODEL, query_cache_size: int = 1024):
+        """
+        :param cache_path: Path to the SQLite cache file
+        :param model: Embedding model name; vectors from different models never mix
+        :param query_cache_size: Number of query strings kept in the in-process LRU
+        """
+        self.cache_path = cache_path
+        self.model = model
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(cache_path, timeout=self.SQLITE_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        with self._conn:
+            self._conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                ) WITHOUT ROWID
+            ''')
+
+    def lookup(self, hashes: Sequence[str]) -> dict:
+        """Cached vectors for the given content hashes, as {hash: float32 vector}"""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            cursor = self._conn.cursor()
+            for start in range(0, len(hashes), self.SQL_VARIABLE_LIMIT):
+                chunk = hashes[start:start + self.SQL_VARIABLE_LIMIT]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT content_hash, vector FROM {self.TABLE_NAME} WHERE model = ? AND content_hash IN ({placeholders})",
+                    [self.model] + chunk
+                )
+                found.update((hash, np.frombuffer(blob, dtype=np.float32)) for hash, blob in cursor)
+        return found
+
+    def store(self, hashes: Sequence[str], vectors: Sequence) -> None:
+        """Persist vectors under their content hashes in a single transaction"""
+        rows = [
+            (self.model, hash, np.asarray(vector, dtype=np.float32).tobytes())
+            for hash, vector in zip(hashes, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE_NAME} (model, content_hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def get_many(self, texts: Sequence[str], embed: Callable[[List[str]], Sequence]) -> List[np.ndarray]:
+        """
+        Embeddings for a batch of texts, calling embed() once with only the uncached ones.
+
+        :param texts: The texts to embed
+        :param embed: Function mapping a list of texts to a list of vectors in the same order
+        :return: One float32 vector per text, in order
+        """
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.lookup(hashes)
+
+        # 同一批次中重复的文本只请求一次
+        missing = {}
+        for hash, text in zip(hashes, texts):
+            if hash not in vectors:
+                missing.setdefault(hash, text)
+        if missing:
+            embedded = embed(list(missing.values()))
+            self.store(list(missing), embedded)
+            vectors.update(
+                (hash, np.asarray(vector, dtype=np.float32))
+                for hash, vector in zip(missing, embedded)
+            )
+
+        # embed() 失败时由调用方重试，只统计成功的查找
+        with self._lock:
+            self.hits += len(texts) - sum(1 for hash in hashes if hash in missing)
+            self.misses += len(missing)
+        return [vectors[hash] for hash in hashes]
+
+    def get(self, text: str, embed: Callable[[List[str]], Sequence]) -> np.ndarray:
+        """
+        The embedding of a single query string, served from the in-process LRU when possible.
+
+        :param text: The text to embed
+        :param embed: Function mapping a list of texts to a list of vectors in the same order
+        :return: The float32 vector
+        """
+        vector = self._recent_query(text)
+        if vector is not None:
+            return vector
+
+        vector = self.get_many([text], embed)[0]
+        self._remember_query(text, vector)
+        return vector
+
+    async def aget(self, text: str, embed: Callable[[List[str]], Awaitable[Sequence]]) -> np.ndarray:
+        """
+        Async variant of get(). The SQLite lookup and store run on the default executor
+        so a slow disk or a locked database does not block the event loop.
+
+        :param text: The text to embed
+        :param embed: Coroutine function mapping a list of texts to a list of vectors in the same order
+        :return: The float32 vector
+        """
+        vector = self._recent_query(text)
+        if vector is not None:
+            return vector
+
+        loop = asyncio.get_running_loop()
+        hash = content_hash(text)
+        vector = (await loop.run_in_executor(None, self.lookup, [hash])).get(hash)
+        if vector is None:
+            vector = np.asarray((await embed([text]))[0], dtype=np.float32)
+            await loop.run_in_executor(None, self.store, [hash], [vector])
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        self._remember_query(text, vector)
+        return vector
+
+    def _recent_query(self, text: str):
+        """The query's vector from the in-process LRU, or None"""
+        with self._lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+                self.hits += 1
+            return vector
+
+    def _remember_query(self, text: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._query_cache[text] = vector
+            self._query_cache.move_to_end(text)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_embedding_cache(model: str = DEFAULT_EMBEDDING_MODEL, cache_path: str = DEFAULT_CACHE_PATH) -> EmbeddingCache:
+    """
+    Return the process-wide EmbeddingCache for a model and cache file, creating it on first use.
+
+    :param model: Embedding model name
+    :param cache_path: Path to the SQLite cache file
+    :return: The shared instance
+    """
+    key = (os.path.abspath(cache_path), model)
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = EmbeddingCache(cache_path, model)
+            _shared_caches[key] = cache
+        return cache
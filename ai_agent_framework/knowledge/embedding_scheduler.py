@@ -0,0 +1,231 @@
+import time
+import random
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence
+import openai
+from ai_agent_framework.utils.tokens import estimate_tokens
+
+# 单次请求的上限：text-embedding-ada-002 每次最多 2048 条输入，单条最多 8191 token
+MAX_BATCH_ITEMS = 2048
+MAX_INPUT_TOKENS = 8191
+# 可重试的 HTTP 状态码：超时、冲突、限流和服务端错误
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+# 由输入本身引起的 HTTP 状态码：请求无效 (如输入过长)、请求过大、无法处理
+INPUT_ERROR_STATUS_CODES = (400, 413, 422)
+
+EmbeddedBatch = namedtuple('EmbeddedBatch', ['start', 'end', 'vectors', 'error'])
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection errors and 5xx responses are worth retrying"""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES
+
+
+def is_input_error(error: Exception) -> bool:
+    """
+    Errors caused by some of the texts (too long, invalid), which bisecting the batch
+    can narrow down; authentication and other request-wide HTTP errors are not.
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        return not is_retryable(error)
+    return status_code in INPUT_ERROR_STATUS_CODES
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The delay requested by the server through the Retry-After header, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+class EmbeddingScheduler:
+    """
+    Embeds a long sequence of texts with several requests in flight.
+
+    Texts longer than the model's input limit are truncated, then grouped into batches
+    bounded by an estimated token budget, so short headlines and long articles both
+    make good use of a request. Up to max_workers batches run concurrently on a thread
+    pool. A rate-limit or transient error pauses all workers for the backoff delay (or
+    the server's Retry-After) and the batch is retried. An error caused by the input is
+    narrowed down by bisecting the batch, so only the offending texts are left out.
+    Results are handed back strictly in input order so the caller can bulk-insert them
+    as they arrive.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Sequence],
+        max_batch_tokens: int = 50000,
+        max_batch_items: int = MAX_BATCH_ITEMS,
+        max_workers: int = 4,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        max_input_tokens: int = MAX_INPUT_TOKENS,
+    ):
+        """
+        :param embed: Function mapping a list of texts to a list of vectors in the same order
+        :param max_batch_tokens: Estimated token budget per request
+        :param max_batch_items: Maximum number of texts per request
+        :param max_workers: Number of requests kept in flight
+        :param max_retries: Retries per batch before it is reported as failed
+        :param initial_backoff: First retry delay in seconds, doubled on each retry
+        :param max_backoff: Upper bound for the retry delay in seconds
+        :param count_tokens: Token estimator used to size batches and truncate long texts
+        :param max_input_tokens: Token limit of a single input; longer texts are truncated
+        """
+        self.embed = embed
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.count_tokens = count_tokens
+        self.max_input_tokens = max_input_tokens
+        # 任一请求被限流时，所有工作线程都等到该时刻之后再发送
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.truncated = 0
+        self.failed_texts = 0
+
+    def truncate(self, text: str) -> str:
+        """The longest prefix of text within max_input_tokens according to count_tokens"""
+        if self.count_tokens(text) <= self.max_input_tokens:
+            return text
+        # 二分查找满足上限的最长前缀
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= self.max_input_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+    def make_batches(self, texts: Sequence[str]) -> List[tuple]:
+        """Split texts into consecutive (start, end) ranges within the token and item limits"""
+        batches = []
+        start = 0
+        tokens = 0
+        for i, text in enumerate(texts):
+            text_tokens = min(self.count_tokens(text), self.max_input_tokens)
+            if i > start and (tokens + text_tokens > self.max_batch_tokens or i - start >= self.max_batch_items):
+                batches.append((start, i))
+                start, tokens = i, 0
+            tokens += text_tokens
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def _wait_for_resume(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, delay: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            self.retries += 1
+
+    def _embed_batch(self, texts: List[str]):
+        attempt = 0
+        while True:
+            self._wait_for_resume()
+            with self._lock:
+                self.requests += 1
+            try:
+                vectors = self.embed(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return vectors
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    # 指数退避加随机抖动，避免所有线程同时重试
+                    delay = min(self.max_backoff, self.initial_backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self._pause(delay)
+                attempt += 1
+
+    def _embed_isolating(self, texts: List[str]):
+        """
+        Embed texts, bisecting the batch on an input error until the failing texts
+        are isolated. Returns (vectors, error): vectors has None for every text that
+        failed and error is the first such failure. Other errors are raised.
+        """
+        try:
+            return list(self._embed_batch(texts)), None
+        except Exception as e:
+            if not is_input_error(e):
+                raise
+            if len(texts) == 1:
+                with self._lock:
+                    self.failed_texts += 1
+                return [None], e
+            middle = len(texts) // 2
+            left, left_error = self._embed_isolating(texts[:middle])
+            right, right_error = self._embed_isolating(texts[middle:])
+            return left + right, left_error or right_error
+
+    def iter_batches(self, texts: Sequence[str]) -> Iterator[EmbeddedBatch]:
+        """
+        Embed texts concurrently and yield EmbeddedBatch(start, end, vectors, error) in input order.
+        A batch that still fails after all retries is yielded with vectors=None and the exception.
+        Texts rejected on their own are left as None in vectors, with the first such error.
+        """
+        original_texts = list(texts)
+        texts = [self.truncate(text) for text in original_texts]
+        self.truncated += sum(1 for text, original in zip(texts, original_texts) if text is not original)
+        batches = deque(self.make_batches(texts))
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="Embedding") as executor:
+            try:
+                while batches or in_flight:
+                    # 同时保持 2 倍线程数的请求排队，既不空闲也不无限占用内存
+                    while batches and len(in_flight) < 2 * self.max_workers:
+                        start, end = batches.popleft()
+                        in_flight.append((start, end, executor.submit(self._embed_isolating, texts[start:end])))
+                    start, end, future = in_flight.popleft()
+                    try:
+                        vectors, error = future.result()
+                    except Exception as e:
+                        yield EmbeddedBatch(start, end, None, e)
+                    else:
+                        yield EmbeddedBatch(start, end, vectors, error)
+            finally:
+                # 调用方提前停止迭代时，取消尚未开始的请求
+                for _, _, future in in_flight:
+                    future.cancel()
+
+    def embed_all(self, texts: Sequence[str]) -> List:
+        """Embed every text and return the vectors in order; raises the first error"""
+        vectors = []
+        for batch in self.iter_batches(texts):
+            if batch.error is not None:
+                raise batch.error
+            vectors.extend(batch.vectors)
+        return vectors
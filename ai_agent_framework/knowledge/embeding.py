@@ -1,33 +1,48 @@
 import json
 import os
+import sys
+import argparse
 from datetime import datetime
-from knowledge_base import VectorDB
-import numpy as np
-from openai import OpenAI
+
+# Add the project root to the Python path so the knowledge package can be imported
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.embedding_cache import content_hash
+from ai_agent_framework.knowledge.embedding_scheduler import EmbeddingScheduler
+from ai_agent_framework.knowledge.embedder import create_embedder, knowledge_db_path
+from ai_agent_framework.knowledge.article_store import STORAGE_FILES, open_article_store
 from tqdm import tqdm
 from dotenv import load_dotenv
 
 # Get the directory of the script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(SCRIPT_DIR)), 'data_source')
+
+# Articles are stored by data_source/main.py in knowledge_base.db (or knowledge_base.jsonl, see ARTICLE_STORAGE);
+# the store's CHECKPOINT_KEY in the VectorDB metadata holds how far the archive has been imported
+# Articles read from the stream per sync step; bounds memory use
+SYNC_CHUNK_SIZE = 1000
 
 # Build the path to the .env file (located in the parent directory of ai_agent_framework)
 env_path = os.path.join(os.path.dirname(os.path.dirname(SCRIPT_DIR)), '.env')
 
-# Check if the .env file exists
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at {env_path}")
-
 # Load the .env file
 load_dotenv(env_path)
 
-# Load the OpenAI API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in .env file")
+# The embedding backend is chosen with EMBEDDING_BACKEND ('openai' or 'local') and EMBEDDING_MODEL
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+if EMBEDDING_BACKEND == 'openai':
+    # Load the OpenAI API key
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(f"OPENAI_API_KEY not found in environment or {env_path}")
+    # 批量导入的重试和退避由 EmbeddingScheduler 负责，关闭客户端自带的重试
+    embedder = create_embedder(EMBEDDING_BACKEND, api_key=api_key, max_retries=0)
+else:
+    embedder = create_embedder(EMBEDDING_BACKEND)
 
-client = OpenAI(api_key=api_key)
-
-print(f"Successfully loaded API key from {env_path}")
+print(f"Using embedding model {embedder.model_name} (dim {embedder.dimension})")
 
 def decode_unicode(text):
     """Safely decode Unicode-encoded strings"""
@@ -44,72 +59,183 @@ def decode_unicode(text):
             print(f"Warning: Could not decode: {text[:50]}...")  # Print first 50 chars
             return text
 
+# 同时进行中的嵌入请求数；本地模型由推理库自己并行
+EMBEDDING_WORKERS = 4 if embedder.remote else 1
+
 def get_embeddings(texts):
-    """Get embeddings for texts in batch using OpenAI API"""
-    response = client.embeddings.create(
-        model="text-embedding-ada-002",
-        input=texts
-    )
-    return [embedding.embedding for embedding in response.data]
-
-def load_knowledge_base_data(filename):
-    """Load knowledge base data"""
-    file_path = os.path.join(os.path.dirname(os.path.dirname(SCRIPT_DIR)), 'data_source', filename)
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"Loaded {len(data)} items from {filename}")
-    
-    # Decode Unicode in the loaded data
-    for item in data:
-        item['data'] = decode_unicode(item['data'])
-        item['tags'] = [decode_unicode(tag) for tag in item['tags']]
-    
-    return data
+    """Get embeddings for texts in batch; only texts not embedded before reach the embedder"""
+    return embedder.embed(texts)
 
-def import_to_knowledge_base(db, knowledge_base_data):
-    """Import all knowledge base data to VectorDB without deduplication"""
-    print(f"Total items to import: {len(knowledge_base_data)}")
+def decode_item(item):
+    """Decode Unicode in an article's text and tags (in place)"""
+    item['data'] = decode_unicode(item['data'])
+    item['tags'] = [decode_unicode(tag) for tag in item['tags']]
+    return item
 
-    # 分批处理，每次处理100个项目
-    batch_size = 100
-    for i in range(0, len(knowledge_base_data), batch_size):
-        batch = knowledge_base_data[i:i+batch_size]
+def iter_knowledge_base_data(store, offset=0):
+    """Stream decoded articles from the archive as (offset just past the article, article)"""
+    for end_offset, item in store.iter_from(offset):
         try:
-            contents = [item['data'] for item in batch]
-            vectors = get_embeddings(contents)
-            for item, vector in zip(batch, vectors):
+            yield end_offset, decode_item(item)
+        except (KeyError, TypeError, AttributeError) as e:
+            print(f"Warning: Skipping malformed article ending at offset {end_offset}: {e}")
+
+def import_to_knowledge_base(db, knowledge_base_data, scheduler=None):
+    """
+    Embed and import items into VectorDB without deduplication.
+
+    Embedding requests are sized by tokens and run concurrently through an
+    EmbeddingScheduler (cached texts never reach the API); each batch is written
+    with one insert_many as soon as it and every batch before it are done.
+
+    :return: The number of items that could not be imported
+    """
+    print(f"Total items to import: {len(knowledge_base_data)}")
+
+    if scheduler is None:
+        scheduler = EmbeddingScheduler(get_embeddings, max_workers=EMBEDDING_WORKERS)
+
+    contents = [item['data'] for item in knowledge_base_data]
+    failed = 0
+    with tqdm(total=len(contents), desc="Importing", unit="item") as progress:
+        for batch in scheduler.iter_batches(contents):
+            items = knowledge_base_data[batch.start:batch.end]
+            progress.update(len(items))
+            if batch.vectors is None:
+                # 重试用尽的批次跳过，下次增量同步时会重新嵌入
+                print(f"Error getting embeddings for items {batch.start}-{batch.end - 1}: {batch.error}")
+                failed += len(items)
+                continue
+            if batch.error is not None:
+                # 被单独拒绝的条目跳过，同批次的其他条目照常导入
+                rejected = [batch.start + i for i, vector in enumerate(batch.vectors) if vector is None]
+                print(f"Error getting embeddings for items {rejected}: {batch.error}")
+                failed += len(rejected)
+
+            records = []
+            for item, vector in zip(items, batch.vectors):
+                if vector is None:
+                    continue
                 try:
-                    source = item['source']
-                    content = item['data']
-                    timestamp = datetime.fromtimestamp(item['timestamp'])
-                    tags = item['tags']
-                    db.insert(source, content, vector, tags, timestamp)
+                    records.append({
+                        'source': item['source'],
+                        'content': item['data'],
+                        'vector': vector,
+                        'tags': item['tags'],
+                        'timestamp': datetime.fromtimestamp(item['timestamp'])
+                    })
                 except Exception as e:
-                    print(f"Error inserting item: {e}")
-        except Exception as e:
-            print(f"Error getting embeddings for batch {i//batch_size + 1}: {e}")
+                    print(f"Error preparing item: {e}")
+                    failed += 1
+
+            try:
+                db.insert_many(records, verbose=False)
+            except Exception as e:
+                print(f"Error inserting items {batch.start}-{batch.end - 1}: {e}")
+                # 嵌入失败和无法解析的条目已在上面计入
+                failed += len(records)
+
+    stats = embedder.cache.stats()
+    print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} texts embedded")
+    print(f"Embedding requests: {scheduler.requests} ({scheduler.retries} retried), "
+          f"{scheduler.truncated} texts truncated, {failed} items not imported")
+    print(f"Import completed. Total items in knowledge base: {db.count()}")
+    return failed
+
+def sync_knowledge_base(db, knowledge_base_data):
+    """
+    Import the items that are not in VectorDB yet, without rebuilding it.
+    Items are identified by the md5 of their content, the id VectorDB stores, so
+    only new content is embedded and inserted. Readers such as the chat server keep
+    serving from the existing index while this runs.
+
+    :param db: The VectorDB to update
+    :param knowledge_base_data: Decoded items
+    :return: (number of items added, number of items that failed)
+    """
+    # 重复的内容只保留最后一条，与 insert_many 的行为一致
+    items_by_id = {content_hash(item['data']): item for item in knowledge_base_data}
+    existing_ids = db.existing_ids(items_by_id)
+    new_items = [item for id, item in items_by_id.items() if id not in existing_ids]
+    print(f"{len(items_by_id)} unique items, {len(existing_ids)} already in database, {len(new_items)} new")
+
+    failed = import_to_knowledge_base(db, new_items) if new_items else 0
+    return len(new_items) - failed, failed
 
-    print(f"Import completed. Total items in knowledge base: {len(db.get_all_contents())}")
+def sync_article_store(db, store, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Stream the article archive into VectorDB from the last checkpoint, chunk_size
+    articles at a time, so time and memory grow with the new articles only. The
+    checkpoint (a byte offset or row id kept in the database's metadata) advances after each
+    chunk until a chunk has failures; those articles are retried on the next run.
+
+    :return: (number of items added, number of items that failed)
+    """
+    offset = db.get_meta(store.CHECKPOINT_KEY, 0)
+    print(f"Reading {store.path} ({store.size()} bytes) from checkpoint {offset}")
+
+    added = failed = 0
+    checkpoint_valid = True
+    chunk = []
+    chunk_end = offset
+
+    def flush():
+        nonlocal added, failed, checkpoint_valid
+        chunk_added, chunk_failed = sync_knowledge_base(db, chunk)
+        added += chunk_added
+        failed += chunk_failed
+        checkpoint_valid = checkpoint_valid and chunk_failed == 0
+        if checkpoint_valid:
+            db.set_meta(store.CHECKPOINT_KEY, chunk_end)
+        chunk.clear()
+
+    for chunk_end, item in iter_knowledge_base_data(store, offset):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return added, failed
+
+def prune_knowledge_base(db, store):
+    """
+    Delete entries whose content is no longer in the article archive.
+    Streams the whole archive but only keeps the content ids in memory.
+
+    :return: The number of entries deleted
+    """
+    file_ids = {content_hash(item['data']) for _, item in iter_knowledge_base_data(store)}
+    stale_ids = set(db.get_all_ids()) - file_ids
+    deleted = db.delete(stale_ids) if stale_ids else 0
+    print(f"Deleted {deleted} entries no longer in {store.path}")
+    return deleted
 
 def main():
-    # Get the directory of the script
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Import the article archive into the vector database")
+    parser.add_argument('--full', action='store_true', help="Clear the database and re-import everything")
+    parser.add_argument('--prune', action='store_true', help="Delete entries that are no longer in the archive")
+    parser.add_argument('--storage', choices=list(STORAGE_FILES),
+                        help="Archive format written by data_source/main.py; defaults to ARTICLE_STORAGE or sqlite")
+    args = parser.parse_args()
+
+    # Build the path to the database file (one database per embedding model)
+    db_path = knowledge_db_path(embedder)
     
-    # Build the path to the database file
-    db_path = os.path.join(current_dir, "knowledge.db")
+    db = VectorDB(db_path, vector_dim=embedder.dimension)
     
-    # 清空数据库
-    db = VectorDB(db_path)
-    db.clear_database()
+    # Stream the article archive instead of loading it into memory
+    store = open_article_store(DATA_SOURCE_DIR, args.storage)
     
-    # Load knowledge base data
-    knowledge_base_data = load_knowledge_base_data("knowledge_base.json")
+    if args.full:
+        # 清空数据库（连同导入进度）后从头导入；聊天服务在导入完成前只能看到部分数据
+        db.clear_database()
     
-    print(f"Total items in knowledge_base.json: {len(knowledge_base_data)}")
+    # 默认增量同步：从上次的进度继续，只嵌入和写入新内容
+    added, failed = sync_article_store(db, store)
+    print(f"Added {added} items, {failed} failed")
     
-    # Import data to knowledge base
-    import_to_knowledge_base(db, knowledge_base_data)
+    if args.prune:
+        prune_knowledge_base(db, store)
     
     print("Data import completed")
     
@@ -0,0 +1,126 @@
+import json
+import base64
+import hashlib
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /v1/embeddings like the OpenAI API, with deterministic unit vectors
+    derived from the md5 of each input. Every rate_limit_every-th request gets a 429
+    with a Retry-After header, so the import pipeline's backoff can be exercised offline.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.rstrip('/') not in ('/v1/embeddings', '/embeddings'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        with server.stats_lock:
+            server.request_count += 1
+            request_number = server.request_count
+        if server.rate_limit_every and request_number % server.rate_limit_every == 0:
+            with server.stats_lock:
+                server.rate_limited += 1
+            self._send_json(
+                429,
+                {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                {'Retry-After': str(server.retry_after)}
+            )
+            return
+
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if server.latency:
+            time.sleep(server.latency)
+
+        # openai SDK 默认请求 base64 编码的 float32，和真实接口一样按请求格式返回
+        as_base64 = request.get('encoding_format') == 'base64'
+        data = []
+        for i, text in enumerate(inputs):
+            seed = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).normal(size=server.dim).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            embedding = base64.b64encode(vector.tobytes()).decode('ascii') if as_base64 else vector.tolist()
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+        tokens = sum(len(text.encode('utf-8')) // 4 + 1 for text in inputs)
+        with server.stats_lock:
+            server.embedded += len(inputs)
+        self._send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': request.get('model', 'text-embedding-ada-002'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        })
+
+
+def serve(host='127.0.0.1', port=0, dim=1536, latency=0.0, rate_limit_every=0, retry_after=0.2):
+    """
+    Start the fake server on a background thread.
+
+    :param port: 0 picks a free port; read it back from server.server_address
+    :param dim: Embedding dimension
+    :param latency: Seconds to wait before answering each successful request
+    :param rate_limit_every: Answer every N-th request with 429 (0 disables)
+    :param retry_after: Retry-After value sent with 429 responses, in seconds
+    :return: The running ThreadingHTTPServer; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), FakeEmbeddingsHandler)
+    server.daemon_threads = True
+    server.dim = dim
+    server.latency = latency
+    server.rate_limit_every = rate_limit_every
+    server.retry_after = retry_after
+    server.stats_lock = threading.Lock()
+    server.request_count = 0
+    server.rate_limited = 0
+    server.embedded = 0
+    threading.Thread(target=server.serve_forever, name="FakeEmbeddingsServer", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI embeddings endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds per request")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="Answer every N-th request with 429")
+    parser.add_argument('--retry-after', type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.dim, args.latency, args.rate_limit_every, args.retry_after)
+    host, port = server.server_address[:2]
+    print(f"Fake embeddings server on http://{host}:{port}/v1 - set OPENAI_BASE_URL to use it. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"{server.request_count} requests, {server.rate_limited} rate limited, {server.embedded} texts embedded")
+
+
+if __name__ == "__main__":
+    main()
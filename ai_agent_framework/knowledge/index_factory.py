@@ -0,0 +1,281 @@
+import faiss
+import numpy as np
+
+# 支持的索引类型：
+# - flat:     精确暴力搜索 (IndexFlatL2)
+# - ivf_flat: 倒排聚类 + 原始向量，需要训练 (nlist, nprobe)
+# - hnsw:     图索引，无需训练 (M, efConstruction, efSearch)
+# - ivf_pq:   倒排聚类 + 乘积量化，需要训练 (nlist, nprobe, pq_m, pq_nbits)
+INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq')
+
+# 向量存储精度 (索引内的编码方式)：
+# - float32: 原始向量，4 字节/维
+# - float16: 半精度，2 字节/维，召回几乎无损
+# - sq8:     8 位标量量化，1 字节/维，需要训练
+# - pq:      乘积量化，pq_m * pq_nbits / 8 字节/向量，需要训练
+# ivf_pq 索引本身就是 PQ 编码，与 storage 无关
+STORAGE_TYPES = ('float32', 'float16', 'sq8', 'pq')
+
+_SQ_TYPES = {
+    'float16': faiss.ScalarQuantizer.QT_fp16,
+    'sq8': faiss.ScalarQuantizer.QT_8bit,
+}
+
+DEFAULT_INDEX_PARAMS = {
+    'nlist': 1024,
+    'nprobe': 16,
+    'M': 32,
+    'efConstruction': 40,
+    'efSearch': 64,
+    'pq_m': 64,
+    'pq_nbits': 8,
+    # FAISS 建议每个聚类中心至少 39 个训练样本
+    'min_train_points_per_list': 39,
+    'max_train_points_per_list': 256,
+    # 有损存储 (sq8 / pq) 重排序时，先从索引取 limit * rerank_factor 个候选
+    'rerank_factor': 4,
+}
+
+
+def resolve_index_params(index_type, index_params=None, storage='float32'):
+    """
+    Validate the index type and storage and merge user supplied parameters with the defaults.
+
+    :param index_type: One of INDEX_TYPES
+    :param index_params: Optional dict overriding DEFAULT_INDEX_PARAMS
+    :param storage: One of STORAGE_TYPES
+    :return: The complete parameter dict
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown storage '{storage}'. Expected one of {STORAGE_TYPES}")
+    params = dict(DEFAULT_INDEX_PARAMS)
+    if index_params:
+        unknown = set(index_params) - set(DEFAULT_INDEX_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown index parameters: {sorted(unknown)}")
+        params.update(index_params)
+    return params
+
+
+def index_spec(index_type, params, storage='float32'):
+    """A string that uniquely identifies an index configuration, stored with snapshots"""
+    if index_type == 'flat':
+        spec = 'flat'
+    elif index_type == 'ivf_flat':
+        spec = f"ivf_flat:nlist={params['nlist']}"
+    elif index_type == 'hnsw':
+        spec = f"hnsw:M={params['M']},efConstruction={params['efConstruction']}"
+    else:
+        return f"ivf_pq:nlist={params['nlist']},m={params['pq_m']},nbits={params['pq_nbits']}"
+    if storage == 'float32':
+        return spec
+    if storage == 'pq':
+        return f"{spec}/pq:m={params['pq_m']},nbits={params['pq_nbits']}"
+    return f"{spec}/{storage}"
+
+
+def uses_pq(index_type, storage='float32'):
+    return index_type == 'ivf_pq' or storage == 'pq'
+
+
+def is_lossy(index_type, storage='float32'):
+    """Whether the index stores quantized codes coarse enough that re-ranking pays off"""
+    return uses_pq(index_type, storage) or storage == 'sq8'
+
+
+def needs_training(index_type, storage='float32'):
+    return index_type in ('ivf_flat', 'ivf_pq') or storage in ('sq8', 'pq')
+
+
+def blob_dtype(storage):
+    """
+    The dtype vectors are persisted with in SQLite. Compressed modes keep a float16 copy,
+    half the size of float32, which is enough to retrain the index and re-rank its results.
+    """
+    return np.float32 if storage == 'float32' else np.float16
+
+
+def supports_remove_ids(index_type):
+    """HNSW graphs cannot drop vectors; deleted entries are filtered out at search time instead"""
+    return index_type != 'hnsw'
+
+
+def _train_lists(index_type, params, storage):
+    """Number of centroids / quantization levels the training sample has to cover"""
+    lists = params['nlist'] if index_type in ('ivf_flat', 'ivf_pq') else 1
+    if uses_pq(index_type, storage):
+        lists = max(lists, 2 ** params['pq_nbits'])
+    if storage == 'sq8':
+        # 8 位标量量化每一维有 256 个取值区间
+        lists = max(lists, 256)
+    return lists
+
+
+def min_train_size(index_type, params, storage='float32'):
+    """Number of vectors required before a trainable index can be built"""
+    if not needs_training(index_type, storage):
+        return 0
+    return _train_lists(index_type, params, storage) * params['min_train_points_per_list']
+
+
+def build_index(index_type, vector_dim, params, storage='float32'):
+    """
+    Create an empty (untrained) FAISS index of the given type and storage.
+
+    :param index_type: One of INDEX_TYPES
+    :param vector_dim: The vector dimension
+    :param params: Parameters returned by resolve_index_params
+    :param storage: One of STORAGE_TYPES
+    :return: The FAISS index
+    """
+    if uses_pq(index_type, storage) and vector_dim % params['pq_m'] != 0:
+        raise ValueError(f"pq_m={params['pq_m']} must divide the vector dimension {vector_dim}")
+
+    if index_type == 'flat':
+        if storage in _SQ_TYPES:
+            return faiss.IndexScalarQuantizer(vector_dim, _SQ_TYPES[storage], faiss.METRIC_L2)
+        if storage == 'pq':
+            # IndexPQ 不支持 IDSelector 过滤，用单个倒排表的 IVFPQ 做同样的暴力扫描
+            index = faiss.IndexIVFPQ(faiss.IndexFlatL2(vector_dim), vector_dim, 1, params['pq_m'], params['pq_nbits'])
+            index.nprobe = 1
+            return index
+        return faiss.IndexFlatL2(vector_dim)
+
+    if index_type == 'hnsw':
+        if storage in _SQ_TYPES:
+            index = faiss.IndexHNSWSQ(vector_dim, _SQ_TYPES[storage], params['M'])
+        elif storage == 'pq':
+            index = faiss.IndexHNSWPQ(vector_dim, params['pq_m'], params['M'], params['pq_nbits'])
+        else:
+            index = faiss.IndexHNSWFlat(vector_dim, params['M'])
+        index.hnsw.efConstruction = params['efConstruction']
+        index.hnsw.efSearch = params['efSearch']
+        return index
+
+    quantizer = faiss.IndexFlatL2(vector_dim)
+    if uses_pq(index_type, storage):
+        index = faiss.IndexIVFPQ(quantizer, vector_dim, params['nlist'], params['pq_m'], params['pq_nbits'])
+    elif storage in _SQ_TYPES:
+        index = faiss.IndexIVFScalarQuantizer(quantizer, vector_dim, params['nlist'], _SQ_TYPES[storage], faiss.METRIC_L2)
+    else:
+        index = faiss.IndexIVFFlat(quantizer, vector_dim, params['nlist'])
+    index.nprobe = params['nprobe']
+    return index
+
+
+def code_size(index_type, vector_dim, params, storage='float32'):
+    """Bytes the index stores per vector, excluding ids and graph links"""
+    if uses_pq(index_type, storage):
+        return (params['pq_m'] * params['pq_nbits'] + 7) // 8
+    if storage == 'float16':
+        return 2 * vector_dim
+    if storage == 'sq8':
+        return vector_dim
+    return 4 * vector_dim
+
+
+def with_id_mapping(index):
+    """
+    Make an index addressable by external int64 ids (SQLite rowids).
+
+    IVF indexes store ids natively; a hashtable direct map makes remove_ids and
+    reconstruct by id cheap. Everything else is wrapped in IndexIDMap2. IVF must
+    not be wrapped: IndexIDMap2.remove_ids assumes the sub-index renumbers the
+    remaining vectors, which IVF does not.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def _copy_invlists(source):
+    """In-memory ArrayInvertedLists holding the entries of any inverted lists, e.g. on-disk (mmapped) ones"""
+    invlists = faiss.ArrayInvertedLists(source.nlist, source.code_size)
+    for list_no in range(source.nlist):
+        size = source.list_size(list_no)
+        if size:
+            invlists.add_entries(list_no, size, source.get_ids(list_no), source.get_codes(list_no))
+    return invlists
+
+
+def _has_array_invlists(ivf):
+    return isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.ArrayInvertedLists)
+
+
+def load_in_memory(index):
+    """
+    A writable in-memory copy of an index opened with IO_FLAG_MMAP. IVF inverted lists
+    are copied in place (clone_index cannot copy on-disk lists); other indexes are cloned.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return faiss.clone_index(index)
+    if _has_array_invlists(ivf):
+        return index
+    invlists = _copy_invlists(ivf.invlists)
+    ivf.replace_invlists(invlists, True)
+    # 倒排表的所有权交给索引，避免 Python 端重复释放
+    invlists.this.disown()
+    return index
+
+
+def copy_index(index):
+    """
+    An independent, writable in-memory copy of an index, leaving the original untouched
+    so it can keep serving searches. Unlike clone_index this also copies IVF indexes
+    opened with IO_FLAG_MMAP: the index without its lists is copied through serialization
+    and the lists are read into memory.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None or _has_array_invlists(ivf):
+        return faiss.clone_index(index)
+    # 映射的索引文件可能已被新快照替换删除，只序列化量化器等结构，倒排表从内存映射中复制
+    copy = faiss.deserialize_index(faiss.serialize_index(index), faiss.IO_FLAG_SKIP_IVF_DATA)
+    invlists = _copy_invlists(ivf.invlists)
+    faiss.try_extract_index_ivf(copy).replace_invlists(invlists, True)
+    invlists.this.disown()
+    return copy
+
+
+def train_index(index, vectors, params, index_type, storage='float32'):
+    """
+    Train a trainable index on a subsample of vectors (in place).
+
+    :param index: The FAISS index returned by build_index
+    :param vectors: float32 matrix of shape (n, dim)
+    :param params: Parameters returned by resolve_index_params
+    :param index_type: The index type the index was built for
+    :param storage: The storage the index was built for
+    """
+    if index.is_trained:
+        return
+    max_points = _train_lists(index_type, params, storage) * params['max_train_points_per_list']
+    if len(vectors) > max_points:
+        step = len(vectors) / max_points
+        vectors = vectors[[int(i * step) for i in range(max_points)]]
+    index.train(vectors)
+
+
+def make_search_params(index, index_type, params, selector=None):
+    """
+    Build the FAISS SearchParameters for an index, carrying the id selector and
+    the per-type search knobs (nprobe / efSearch). Passing SearchParameters
+    overrides the values set on the index, so they have to be repeated here.
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        index = index.index
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexFlat):
+        # 可训练索引在训练前仍然是暴力搜索
+        return faiss.SearchParameters(sel=selector) if selector is not None else None
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = params['nprobe'] if index_type in ('ivf_flat', 'ivf_pq') else ivf.nprobe
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=params['efSearch'])
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
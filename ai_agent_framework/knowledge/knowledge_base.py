@@ -1,25 +1,168 @@
 import os
+import copy
+import glob
 import sqlite3
-from datetime import datetime
+import tempfile
+import threading
+import time
+import calendar
+from datetime import datetime, timezone
 import json
 import faiss
 import numpy as np
 import hashlib
+from ai_agent_framework.knowledge.index_factory import (
+    blob_dtype,
+    build_index,
+    copy_index,
+    index_spec,
+    is_lossy,
+    load_in_memory,
+    make_search_params,
+    min_train_size,
+    needs_training,
+    resolve_index_params,
+    supports_remove_ids,
+    train_index,
+    with_id_mapping,
+)
+
+# PRAGMA user_version 记录存储格式版本：
+# 1 向量以 float32 二进制 BLOB 存储
+# 2 增加 generation 列、删除记录表和元数据表，用于增量同步 FAISS 索引
+SCHEMA_VERSION = 2
+# text-embedding-ada-002 的向量维度；其他嵌入模型通过 vector_dim 参数指定
+DEFAULT_VECTOR_DIM = 1536
+
+
+def vector_to_blob(vector, dtype=np.float32):
+    """Serialize a vector to the BLOB format stored in SQLite (float32, or float16 for compressed storage)"""
+    return np.asarray(vector, dtype=dtype).tobytes()
+
+
+def blob_to_vector(blob, vector_dim=None):
+    """
+    Deserialize a BLOB into a read-only numpy view without copying. The precision is
+    inferred from the BLOB size when vector_dim is given, so float32 and float16 rows
+    can coexist after the storage mode has been changed.
+    """
+    if vector_dim is not None and len(blob) == 2 * vector_dim:
+        return np.frombuffer(blob, dtype=np.float16)
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def to_epoch_seconds(value):
+    """
+    Convert a timestamp to epoch seconds the same way SQLite's strftime('%s') does:
+    naive datetimes and strings are interpreted as UTC.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        return int(value.timestamp())
+    return calendar.timegm(value.timetuple())
+
+
+def format_timestamp(value):
+    """Format a timestamp the way sqlite3 stores datetimes ('YYYY-MM-DD HH:MM:SS', UTC for epoch input)"""
+    return datetime.fromtimestamp(to_epoch_seconds(value), tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
 
 class VectorDB:
     TABLE_NAME = 'vectors'
+    TOMBSTONE_TABLE_NAME = 'vector_tombstones'
+    META_TABLE_NAME = 'vectordb_meta'
+    MIGRATION_BATCH_SIZE = 1000
+    # SQLite 单条语句的参数个数上限较低，IN (...) 查询按此大小分块
+    SQL_VARIABLE_LIMIT = 900
+    # 不支持删除的索引 (HNSW) 中失效向量超过该比例时重建索引
+    MAX_STALE_RATIO = 0.1
+    # SQLite 连接参数：等待写锁的秒数、内存映射大小、页缓存大小 (KiB)、缓存的预编译语句数
+    SQLITE_TIMEOUT = 30.0
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB = 64 * 1024
+    SQLITE_CACHED_STATEMENTS = 256
+    # 未被元数据引用的快照索引文件超过该秒数后才删除，以免删掉其他进程正在写入的文件
+    SNAPSHOT_GRACE_SECONDS = 60
 
-    def __init__(self, db_path):
+    def __init__(self, db_path, index_type='flat', index_params=None, storage='float32', rerank=None,
+                 vector_dim=DEFAULT_VECTOR_DIM, read_only=False):
+        """
+        :param db_path: Path to the SQLite database file
+        :param index_type: FAISS index type, one of 'flat', 'ivf_flat', 'hnsw', 'ivf_pq'
+        :param index_params: Optional index parameters (nlist, nprobe, M, efConstruction,
+                             efSearch, pq_m, pq_nbits, rerank_factor), see index_factory.DEFAULT_INDEX_PARAMS
+        :param storage: Vector precision, one of 'float32', 'float16', 'sq8', 'pq'. Compressed
+                        modes store quantized codes in the index and float16 BLOBs in SQLite
+        :param rerank: Re-rank index candidates with the vectors stored in SQLite;
+                       defaults to True for lossy storage (sq8, pq, ivf_pq)
+        :param vector_dim: Vector dimension, taken from the embedder (Embedder.dimension)
+        :param read_only: Only search: writes raise RuntimeError and the FAISS snapshot
+                          is never saved, leaving it to the process that writes
+        """
         self.db_path = db_path
+        self.read_only = read_only
+        self.index_type = index_type
+        self.storage = storage
+        self.index_params = resolve_index_params(index_type, index_params, storage)
+        self.index_spec = index_spec(index_type, self.index_params, storage)
+        self.blob_dtype = blob_dtype(storage)
+        self.rerank = is_lossy(index_type, storage) if rerank is None else rerank
+        # 可训练索引 (IVF) 在数据量足够之前使用暴力索引，训练后再切换
+        self.index_trained = False
+        self._index_mmapped = False
+        # FAISS 索引快照保存在数据库文件旁边，例如 knowledge.db -> knowledge.faiss.meta.npz，
+        # 元数据中记录它对应的索引文件 knowledge.faiss.<generation>.<随机后缀>.index
+        self.index_path = os.path.splitext(db_path)[0] + '.faiss'
+        self.index_meta_path = self.index_path + '.meta.npz'
+        # FAISS 中的向量 id 即 SQLite rowid，upsert 时保持不变
         self.index = None
-        self.id_map = {}
-        self.vector_dim = 1536  # 假设向量维度为1536，可以根据实际情况调整
+        # 已同步进索引的写入代数 (generation)，之后的写入和删除需要增量补齐
+        self.generation = 0
+        # 不支持删除的索引中仍然存在的失效向量个数
+        self.stale_vectors = 0
+        self._snapshot_dirty = False
+        # 每个线程一个长连接，close() 时统一关闭
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._reset_metadata()
+        self.vector_dim = vector_dim
         self.initialize_db()
         self.load_vectors()
         print(f"VectorDB initialized. FAISS index size: {self.index.ntotal if self.index else 0}")
 
+    def _connection(self):
+        """
+        The calling thread's long-lived connection, created on first use.
+
+        WAL mode lets readers proceed while the import job writes, synchronous=NORMAL
+        is safe under WAL, and the mmap/page cache settings keep hot pages in memory.
+        Use it as `with self._connection() as conn:` to commit or roll back a transaction.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.SQLITE_TIMEOUT,
+                cached_statements=self.SQLITE_CACHED_STATEMENTS,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {self.SQLITE_MMAP_SIZE}")
+            conn.execute(f"PRAGMA cache_size = -{self.SQLITE_CACHE_SIZE_KIB}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
     def initialize_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f'''
                 CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (
@@ -28,135 +171,952 @@ class VectorDB:
                     content TEXT,
                     vector BLOB,
                     tags TEXT,
-                    timestamp DATETIME
+                    timestamp DATETIME,
+                    generation INTEGER NOT NULL DEFAULT 0
                 )
             ''')
             conn.commit()
 
-    def load_vectors(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME}")
-            count = cursor.fetchone()[0]
-            print(f"Total entries in SQLite database: {count}")
+            cursor.execute("PRAGMA user_version")
+            user_version = cursor.fetchone()[0]
+            if user_version < 1:
+                self.migrate_json_vectors(conn)
+            if user_version < 2:
+                columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({self.TABLE_NAME})")]
+                if 'generation' not in columns:
+                    cursor.execute(f"ALTER TABLE {self.TABLE_NAME} ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
 
-            if count == 0:
-                print("No vectors found in the database")
-                self.index = faiss.IndexFlatL2(self.vector_dim)
-                return
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE_NAME}_generation ON {self.TABLE_NAME} (generation)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE_NAME}_timestamp ON {self.TABLE_NAME} (timestamp)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE_NAME}_source ON {self.TABLE_NAME} (source)")
+            # 删除记录：其他进程据此把已删除的向量从各自的索引中移除
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.TOMBSTONE_TABLE_NAME} (
+                    rowid INTEGER PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TOMBSTONE_TABLE_NAME}_generation ON {self.TOMBSTONE_TABLE_NAME} (generation)")
+            # generation 每次写事务加一；reset_generation 记录最近一次清空时的代数；
+            # pruned_generation 记录已清理到哪一代的删除记录，更早的快照无法再补齐
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.META_TABLE_NAME} (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            cursor.execute(
+                f"INSERT OR IGNORE INTO {self.META_TABLE_NAME} (key, value) "
+                "VALUES ('generation', 0), ('reset_generation', 0), ('pruned_generation', 0)"
+            )
+            if user_version < SCHEMA_VERSION:
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
 
-            cursor.execute(f"SELECT id, vector FROM {self.TABLE_NAME}")
+    def migrate_json_vectors(self, conn):
+        """
+        One-time migration of legacy rows whose vector column holds a JSON string
+        into the float32 BLOB format. Runs in batches so memory stays bounded.
+        """
+        cursor = conn.cursor()
+        migrated = 0
+        while True:
+            cursor.execute(
+                f"SELECT rowid, vector FROM {self.TABLE_NAME} WHERE typeof(vector) = 'text' LIMIT ?",
+                (self.MIGRATION_BATCH_SIZE,)
+            )
             rows = cursor.fetchall()
+            if not rows:
+                break
 
-            vectors = []
-            for i, (id, vector_blob) in enumerate(rows):
+            updates = []
+            for rowid, vector_json in rows:
                 try:
-                    # 尝试解析 JSON
-                    vector_data = json.loads(vector_blob)
-                except json.JSONDecodeError:
-                    # 如果不是 JSON，假设它已经是一个列表
-                    vector_data = vector_blob
-
-                # 确保 vector_data 是一个列表
-                if isinstance(vector_data, list):
-                    vector = np.array(vector_data, dtype=np.float32)
-                else:
-                    print(f"Warning: Unexpected vector format for id {id}. Skipping.")
-                    continue
+                    updates.append((vector_to_blob(json.loads(vector_json), self.blob_dtype), rowid))
+                except (json.JSONDecodeError, TypeError, ValueError):
+                    # 无法解析的向量置为 NULL，加载时会被跳过，避免重复迁移
+                    print(f"Warning: Could not migrate vector for rowid {rowid}. Setting it to NULL.")
+                    updates.append((None, rowid))
+
+            cursor.executemany(f"UPDATE {self.TABLE_NAME} SET vector = ? WHERE rowid = ?", updates)
+            conn.commit()
+            migrated += len(rows)
+
+        if migrated:
+            print(f"Migrated {migrated} JSON vectors to {np.dtype(self.blob_dtype).name} BLOBs")
+
+    def _reset_metadata(self):
+        """
+        In-memory metadata indexed by SQLite rowid (the FAISS id), used to filter
+        searches without touching SQLite:
+        - timestamps: epoch seconds per rowid
+        - alive: True for rowids currently present in the table
+        - tag_postings: inverted list tag -> sorted int64 array of the rowids carrying that tag;
+          arrays are replaced on change, never modified in place
+        """
+        self.timestamps = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.tag_postings = {}
+
+    def _ensure_capacity(self, max_rowid):
+        if max_rowid < self.alive.size:
+            return
+        capacity = max(max_rowid + 1, 2 * self.alive.size)
+        timestamps = np.zeros(capacity, dtype=np.int64)
+        alive = np.zeros(capacity, dtype=bool)
+        timestamps[:self.timestamps.size] = self.timestamps
+        alive[:self.alive.size] = self.alive
+        self.timestamps, self.alive = timestamps, alive
 
-                vectors.append(vector)
-                self.id_map[i] = id
+    def _is_indexed(self, rowid):
+        return rowid < self.alive.size and self.alive[rowid]
 
-            if vectors:
-                vectors = np.array(vectors).astype('float32')
-                self.index = faiss.IndexFlatL2(self.vector_dim)
-                self.index.add(vectors)
+    @staticmethod
+    def _rowids_by_tag(rowids, tags_lists):
+        """{tag: sorted int64 array of the given rowids carrying it}"""
+        grouped = {}
+        for rowid, tags in zip(rowids, tags_lists):
+            for tag in tags or ():
+                grouped.setdefault(tag, []).append(rowid)
+        return {tag: np.unique(np.asarray(tag_rowids, dtype=np.int64)) for tag, tag_rowids in grouped.items()}
+
+    def _set_metadata(self, rowids, timestamps, tags_lists, old_tags_lists=None):
+        """Record metadata for new or replaced rowids, dropping the tags they had before"""
+        self._ensure_capacity(max(rowids))
+        self.timestamps[rowids] = timestamps
+        self.alive[rowids] = True
+        if old_tags_lists:
+            self._remove_from_postings(rowids, old_tags_lists)
+        # 每个标签合并一次，而不是逐个 rowid 插入
+        for tag, added in self._rowids_by_tag(rowids, tags_lists).items():
+            postings = self.tag_postings.get(tag)
+            self.tag_postings[tag] = added if postings is None else np.union1d(postings, added)
+
+    def _remove_from_postings(self, rowids, tags_lists):
+        for tag, removed in self._rowids_by_tag(rowids, tags_lists).items():
+            postings = self.tag_postings.get(tag)
+            if postings is None:
+                continue
+            postings = np.setdiff1d(postings, removed, assume_unique=True)
+            if postings.size:
+                self.tag_postings[tag] = postings
             else:
-                print("No valid vectors found in the database")
-                self.index = faiss.IndexFlatL2(self.vector_dim)
+                del self.tag_postings[tag]
+
+    def _clear_metadata(self, rowids, tags_lists):
+        """Forget deleted rowids; all of them must currently be indexed"""
+        self.alive[rowids] = False
+        self._remove_from_postings(rowids, tags_lists)
+
+    def _tags_of(self, rowids):
+        """Tags currently recorded in memory for the given rowids"""
+        wanted = np.asarray(rowids, dtype=np.int64)
+        tags_of = [[] for _ in range(wanted.size)]
+        if not wanted.size:
+            return tags_of
+        for tag, postings in self.tag_postings.items():
+            # 倒排数组有序，二分查找每个 rowid 是否在其中
+            positions = np.minimum(np.searchsorted(postings, wanted), postings.size - 1)
+            for i in np.flatnonzero(postings[positions] == wanted):
+                tags_of[i].append(tag)
+        return tags_of
+
+    def _read_meta(self, cursor, key):
+        return cursor.execute(f"SELECT value FROM {self.META_TABLE_NAME} WHERE key = ?", (key,)).fetchone()[0]
+
+    def get_meta(self, key, default=None):
+        """An integer stored in the metadata table, e.g. an import checkpoint"""
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT value FROM {self.META_TABLE_NAME} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"VectorDB {self.db_path} was opened read-only")
+
+    def set_meta(self, key, value):
+        """Store an integer in the metadata table; cleared by clear_database()"""
+        self._check_writable()
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO {self.META_TABLE_NAME} (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def read_generation(self):
+        """The database's current write generation; differs from self.generation when the index is behind"""
+        with self._connection() as conn:
+            return self._read_meta(conn.cursor(), 'generation')
+
+    def _next_generation(self, cursor):
+        """Bump the write generation counter; must run inside a write transaction"""
+        cursor.execute(f"UPDATE {self.META_TABLE_NAME} SET value = value + 1 WHERE key = 'generation'")
+        return self._read_meta(cursor, 'generation')
+
+    def _advance_generation(self, previous_generation, new_generation):
+        # 只有在中间没有其他进程写入时才推进代数，否则留给下次补齐
+        if previous_generation == self.generation:
+            self.generation = new_generation
+            self._snapshot_dirty = True
+
+    def load_vectors(self):
+        start_time = time.perf_counter()
+
+        if self.load_index_snapshot():
+            snapshot_size = self.index.ntotal
+            changed = self._catch_up()
+            elapsed = time.perf_counter() - start_time
+            print(f"Loaded FAISS snapshot with {snapshot_size} vectors and {changed} changed rows in {elapsed:.2f}s")
+        else:
+            loaded = self._rebuild_index()
+            if loaded == 0:
+                print("No vectors found in the database")
+            elapsed = time.perf_counter() - start_time
+            print(f"Loaded {loaded} vectors into FAISS in {elapsed:.2f}s")
+
+        if self._snapshot_dirty and not self.read_only:
+            self.save_index()
+
+    def _reset_index(self):
+        """Start over with an empty index of the configured type"""
+        if needs_training(self.index_type, self.storage):
+            base_index = faiss.IndexFlatL2(self.vector_dim)
+            self.index_trained = False
+        else:
+            base_index = build_index(self.index_type, self.vector_dim, self.index_params, self.storage)
+            self.index_trained = True
+        self.index = with_id_mapping(base_index)
+        self._index_mmapped = False
+        self.generation = 0
+        self.stale_vectors = 0
+        self._reset_metadata()
+
+    def _rebuild_index(self):
+        """Rebuild the index and metadata from every row in SQLite; returns the number of vectors"""
+        self._reset_index()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # 在同一个读事务里读取代数和数据，保证两者一致
+            cursor.execute("BEGIN")
+            generation = self._read_meta(cursor, 'generation')
+            loaded = self._load_rows(cursor, "1 = 1", ())
+            conn.commit()
+        self.generation = generation
+        self._snapshot_dirty = True
+        return loaded
+
+    def _catch_up(self):
+        """Apply rows written and deleted after the snapshot's generation; returns the number of changed rows"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            generation = self._read_meta(cursor, 'generation')
+            if generation == self.generation:
+                conn.commit()
+                return 0
+            if (self._read_meta(cursor, 'pruned_generation') > self.generation or
+                    self._read_meta(cursor, 'reset_generation') > self.generation):
+                # 加载快照后删除记录已被清理，或数据库已被清空，无法增量补齐
+                conn.commit()
+                return self._rebuild_index()
+
+            # 先处理删除，再处理写入：rowid 可能在删除后被新行复用
+            cursor.execute(
+                f"SELECT rowid FROM {self.TOMBSTONE_TABLE_NAME} WHERE generation > ?",
+                (self.generation,)
+            )
+            deleted_rowids = [rowid for (rowid,) in cursor.fetchall() if self._is_indexed(rowid)]
+            self._remove_from_index(deleted_rowids)
+            self._clear_metadata(deleted_rowids, self._tags_of(deleted_rowids))
+
+            changed = self._load_rows(cursor, "generation > ?", (self.generation,))
+            conn.commit()
+
+        self.generation = generation
+        self._snapshot_dirty = True
+        return changed + len(deleted_rowids)
+
+    def updated_copy(self):
+        """
+        A copy of this instance brought up to date with the database, for a reader
+        that must keep serving searches from this one meanwhile. The FAISS index and
+        the metadata are copied in memory and only the rows written and deleted since
+        self.generation are applied, instead of loading the snapshot and replaying
+        everything written after it.
+
+        :return: The new VectorDB, or None if the changes cannot be replayed (the database
+                 was cleared or its delete records were pruned); open a new VectorDB then
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if (self._read_meta(cursor, 'pruned_generation') > self.generation or
+                    self._read_meta(cursor, 'reset_generation') > self.generation):
+                return None
+        db = copy.copy(self)
+        db.index = copy_index(self.index)
+        db._index_mmapped = False
+        db.timestamps = self.timestamps.copy()
+        db.alive = self.alive.copy()
+        # 倒排数组只会被整体替换，副本与原实例可以共用
+        db.tag_postings = dict(self.tag_postings)
+        # 副本使用自己的连接，关闭时互不影响
+        db._local = threading.local()
+        db._connections = []
+        db._connections_lock = threading.Lock()
+        db._catch_up()
+        db._compact_if_needed()
+        return db
+
+    def _load_rows(self, cursor, where, params):
+        """
+        Bulk-load the rows matching the WHERE clause into the index and the in-memory
+        metadata, replacing any vectors already indexed under the same rowid.
+
+        :return: The number of vectors loaded
+        """
+        cursor.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME} WHERE {where}", params)
+        count = cursor.fetchone()[0]
+        if count == 0:
+            return 0
+
+        # 预分配一个连续矩阵，逐行把 BLOB 直接拷贝进去，避免中间的 Python 列表
+        vectors = np.empty((count, self.vector_dim), dtype=np.float32)
+        blob_sizes = (4 * self.vector_dim, 2 * self.vector_dim)
+        loaded = 0
+        rowids, timestamps, tags_lists = [], [], []
+
+        # 时间戳在 SQLite 中直接换算为 epoch 秒，省去逐行 strptime
+        cursor.execute(f"""
+            SELECT rowid, id, vector, CAST(strftime('%s', timestamp) AS INTEGER), tags
+            FROM {self.TABLE_NAME}
+            WHERE {where}
+            ORDER BY rowid
+        """, params)
+        for rowid, id, vector_blob, epoch_seconds, tags_json in cursor:
+            if not isinstance(vector_blob, bytes) or len(vector_blob) not in blob_sizes:
+                print(f"Warning: Unexpected vector format for id {id}. Skipping.")
+                continue
+
+            vectors[loaded] = blob_to_vector(vector_blob, self.vector_dim)
+            rowids.append(rowid)
+            timestamps.append(epoch_seconds or 0)
+            tags_lists.append(json.loads(tags_json) if tags_json else [])
+            loaded += 1
+
+        if loaded:
+            replaced = [rowid for rowid in rowids if self._is_indexed(rowid)]
+            old_tags_lists = self._tags_of(rowids) if replaced else None
+            self._remove_from_index(replaced)
+            self._add_to_index(vectors[:loaded], rowids)
+            self._set_metadata(rowids, timestamps, tags_lists, old_tags_lists)
+        return loaded
+
+    def _writable_index(self):
+        if self._index_mmapped:
+            # 内存映射的数据是只读的，写入前复制到内存中；快照文件可能已被其他进程替换，不能重新读取
+            self.index = load_in_memory(self.index)
+            self._index_mmapped = False
+        return self.index
+
+    def _add_to_index(self, vectors, rowids):
+        """Add a float32 matrix under the given rowids, training the configured index type once enough vectors exist"""
+        self._writable_index().add_with_ids(vectors, np.asarray(rowids, dtype=np.int64))
+        self._snapshot_dirty = True
+        if not self.index_trained and self.index.ntotal >= min_train_size(self.index_type, self.index_params, self.storage):
+            self._train_index()
+
+    def _remove_from_index(self, rowids):
+        """Drop the vectors of the given rowids from the index, or count them as stale if the index cannot remove"""
+        if not rowids:
+            return
+        if self.index_trained and not supports_remove_ids(self.index_type):
+            self.stale_vectors += len(rowids)
+        else:
+            self._writable_index().remove_ids(np.asarray(rowids, dtype=np.int64))
+        self._snapshot_dirty = True
+
+    def _train_index(self):
+        """Replace the temporary flat index with the trained index type, keeping ids unchanged"""
+        start_time = time.perf_counter()
+        rowids = faiss.vector_to_array(self.index.id_map)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        base_index = build_index(self.index_type, self.vector_dim, self.index_params, self.storage)
+        train_index(base_index, vectors, self.index_params, self.index_type, self.storage)
+        index = with_id_mapping(base_index)
+        index.add_with_ids(vectors, rowids)
+        self.index = index
+        self.index_trained = True
+        self._snapshot_dirty = True
+        elapsed = time.perf_counter() - start_time
+        print(f"Trained {self.index_spec} index on {len(vectors)} vectors in {elapsed:.2f}s")
+
+    def _compact_if_needed(self):
+        """Rebuild an index that cannot remove vectors once too many of them are stale"""
+        if self.stale_vectors and self.stale_vectors > self.MAX_STALE_RATIO * self.index.ntotal:
+            print(f"Rebuilding {self.index_spec} index to drop {self.stale_vectors} stale vectors")
+            self._rebuild_index()
+
+    def load_index_snapshot(self):
+        """
+        Restore the FAISS index and its metadata from the snapshot next to the database.
+        The index file is opened with IO_FLAG_MMAP so that, where FAISS supports it,
+        the vector data is served from the shared page cache instead of being copied.
+
+        :return: True if a usable snapshot was loaded, False if a full rebuild is needed
+        """
+        # 读取元数据后、打开索引文件前，快照可能被其他进程替换并删除旧索引文件，此时重读一次
+        for attempt in range(2):
+            if not os.path.exists(self.index_meta_path):
+                return False
+
+            try:
+                with np.load(self.index_meta_path, allow_pickle=False) as meta:
+                    vector_dim = int(meta['vector_dim'])
+                    snapshot_spec = str(meta['index_spec'])
+                    index_trained = bool(meta['index_trained'])
+                    generation = int(meta['generation'])
+                    stale_vectors = int(meta['stale_vectors'])
+                    timestamps = meta['timestamps']
+                    alive = meta['alive']
+                    tag_names = meta['tag_names'].tolist()
+                    tag_offsets = meta['tag_offsets']
+                    tag_rowids = meta['tag_rowids']
+                    # 旧版本的快照没有 index_file，索引固定保存在 index_path
+                    index_file = str(meta['index_file']) if 'index_file' in meta.files else None
+            except Exception as e:
+                print(f"Warning: Could not read FAISS snapshot metadata ({e}). Rebuilding from SQLite.")
+                return False
+
+            if vector_dim != self.vector_dim or snapshot_spec != self.index_spec:
+                print(f"FAISS snapshot was built for {snapshot_spec} (dim {vector_dim}). Rebuilding from SQLite.")
+                return False
+
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                current_generation = self._read_meta(cursor, 'generation')
+                reset_generation = self._read_meta(cursor, 'reset_generation')
+                pruned_generation = self._read_meta(cursor, 'pruned_generation')
+            if not reset_generation <= generation <= current_generation:
+                # 快照早于最近一次清空，或来自另一个数据库
+                print("FAISS snapshot does not match the database contents. Rebuilding from SQLite.")
+                return False
+            if generation < pruned_generation:
+                print("FAISS snapshot is older than the pruned delete records. Rebuilding from SQLite.")
+                return False
+
+            index_file_path = self._snapshot_file_path(index_file)
+            # 需要补齐新写入时按可写方式读取，否则内存映射
+            mmapped = generation == current_generation
+            try:
+                index = faiss.read_index(index_file_path, faiss.IO_FLAG_MMAP if mmapped else 0)
+                break
+            except Exception as e:
+                if attempt == 0 and not os.path.exists(index_file_path):
+                    continue
+                print(f"Warning: Could not read FAISS snapshot ({e}). Rebuilding from SQLite.")
+                return False
+
+        self.index = index
+        self.index_trained = index_trained
+        self._index_mmapped = mmapped
+        self.generation = generation
+        self.stale_vectors = stale_vectors
+        self.timestamps = timestamps
+        self.alive = alive
+        # 旧版本快照中的倒排表由集合写出，没有排序
+        self.tag_postings = {
+            tag: np.sort(tag_rowids[tag_offsets[i]:tag_offsets[i + 1]])
+            for i, tag in enumerate(tag_names)
+        }
+        self._snapshot_dirty = False
+        return True
+
+    def save_index(self):
+        """
+        Write the FAISS index and its metadata (timestamps, tags and the write
+        generation it reflects) next to the database. The index goes to a new file
+        named in the metadata, and the metadata is replaced atomically, so readers
+        always see a matching pair.
+        """
+        self._check_writable()
+        if self.index is None:
+            return
+
+        tag_names = list(self.tag_postings)
+        postings = [self.tag_postings[tag] for tag in tag_names]
+        tag_offsets = np.zeros(len(tag_names) + 1, dtype=np.int64)
+        tag_offsets[1:] = np.cumsum([rowids.size for rowids in postings])
+        tag_rowids = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int64)
+
+        # 每次保存写入新的索引文件，元数据记录文件名后一次 os.replace 原子替换，
+        # 读取方不会拿到新索引配旧元数据；临时文件名唯一，多个写入方互不覆盖
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        prefix = os.path.basename(self.index_path)
+        fd, index_file_path = tempfile.mkstemp(prefix=f"{prefix}.{self.generation}.", suffix='.index', dir=directory)
+        os.close(fd)
+        fd, meta_tmp_path = tempfile.mkstemp(prefix=f"{prefix}.meta.", suffix='.tmp', dir=directory)
+        try:
+            faiss.write_index(self.index, index_file_path)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    vector_dim=self.vector_dim,
+                    index_spec=self.index_spec,
+                    index_trained=self.index_trained,
+                    generation=self.generation,
+                    stale_vectors=self.stale_vectors,
+                    timestamps=self.timestamps,
+                    alive=self.alive,
+                    tag_names=np.array(tag_names, dtype=str),
+                    tag_offsets=tag_offsets,
+                    tag_rowids=tag_rowids,
+                    index_file=os.path.basename(index_file_path)
+                )
+            previous_index_file, previous_generation = self._read_snapshot_pointer()
+            if previous_generation > self.generation:
+                # 其他进程已经保存了更新的快照，保留它
+                self._remove_file(meta_tmp_path)
+                self._remove_file(index_file_path)
+                self._snapshot_dirty = False
+                return
+            os.replace(meta_tmp_path, self.index_meta_path)
+        except BaseException:
+            for path in (index_file_path, meta_tmp_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        # 上一个快照的索引文件不再被引用；已经内存映射它的进程不受删除影响
+        if previous_index_file != index_file_path:
+            self._remove_file(previous_index_file)
+        self._remove_stale_snapshot_files()
+        self._snapshot_dirty = False
+        self._prune_tombstones(self.generation)
+        print(f"Saved FAISS snapshot with {self.index.ntotal} vectors to {index_file_path}")
+
+    def _prune_tombstones(self, generation):
+        """
+        Drop the delete records a snapshot of the given generation already reflects;
+        processes load that snapshot instead of replaying them.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(f"DELETE FROM {self.TOMBSTONE_TABLE_NAME} WHERE generation <= ?", (generation,))
+            if cursor.rowcount > 0:
+                cursor.execute(
+                    f"UPDATE {self.META_TABLE_NAME} SET value = MAX(value, ?) WHERE key = 'pruned_generation'",
+                    (generation,)
+                )
+            conn.commit()
+
+    def _snapshot_file_path(self, index_file):
+        """The path of an index file named in the snapshot metadata (None for snapshots that predate index_file)"""
+        if index_file is None:
+            return self.index_path
+        return os.path.join(os.path.dirname(os.path.abspath(self.index_path)), os.path.basename(index_file))
+
+    def _read_snapshot_pointer(self):
+        """(index file, generation) of the current snapshot metadata, or (None, -1) without a readable snapshot"""
+        try:
+            with np.load(self.index_meta_path, allow_pickle=False) as meta:
+                index_file = str(meta['index_file']) if 'index_file' in meta.files else None
+                return self._snapshot_file_path(index_file), int(meta['generation'])
+        except Exception:
+            return None, -1
+
+    def _snapshot_files(self):
+        """Index files and metadata temp files written by save_index, plus the pre-versioning index file"""
+        paths = glob.glob(glob.escape(self.index_path) + '.*.index')
+        paths += glob.glob(glob.escape(self.index_path) + '.meta.*.tmp')
+        if os.path.exists(self.index_path):
+            paths.append(self.index_path)
+        return paths
+
+    def _remove_stale_snapshot_files(self):
+        """Delete snapshot files that are no longer referenced and old enough not to be in progress elsewhere"""
+        current, _ = self._read_snapshot_pointer()
+        cutoff = time.time() - self.SNAPSHOT_GRACE_SECONDS
+        for path in self._snapshot_files():
+            try:
+                if path != current and (path == self.index_path or os.path.getmtime(path) < cutoff):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            if path is not None:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _remove_index_snapshot(self):
+        for path in [self.index_meta_path] + self._snapshot_files():
+            self._remove_file(path)
+
+    def _filter_mask(self, time_range=None, tags=None):
+        """Boolean mask over rowids that are alive and satisfy the time range and tag filters"""
+        mask = self.alive.copy()
+        if time_range:
+            start_epoch, end_epoch = to_epoch_seconds(time_range[0]), to_epoch_seconds(time_range[1])
+            mask &= (self.timestamps >= start_epoch) & (self.timestamps <= end_epoch)
+        if tags:
+            tag_mask = np.zeros_like(mask)
+            for tag in tags:
+                rowids = self.tag_postings.get(tag)
+                if rowids is not None:
+                    tag_mask[rowids] = True
+            mask &= tag_mask
+        return mask
+
+    def _search_params(self, mask):
+        """
+        Build FAISS search parameters restricting the search to the rowids set in mask
+        (None means no restriction). Returns (params, bitmap); the bitmap must stay
+        alive for the duration of the search.
+        """
+        if mask is None:
+            return make_search_params(self.index, self.index_type, self.index_params), None
+        # 第 i 个 rowid 对应第 i // 8 个字节的第 i % 8 位；IDSelectorBitmap 的第一个参数是字节数，
+        # 以 (id >> 3) < n 判断 id 是否在位图范围内，超出范围的 id 直接视为不选中
+        bitmap = np.packbits(mask, bitorder='little')
+        selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+        return make_search_params(self.index, self.index_type, self.index_params, selector), bitmap
+
+    def _fetch_rows(self, rowids):
+        """Fetch id, content, timestamp and tags for the given rowids, one query per SQL_VARIABLE_LIMIT rowids"""
+        rowids = list(rowids)
+        rows = {}
+        if not rowids:
+            return rows
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(rowids), self.SQL_VARIABLE_LIMIT):
+                chunk = rowids[start:start + self.SQL_VARIABLE_LIMIT]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT rowid, id, content, timestamp, tags FROM {self.TABLE_NAME} WHERE rowid IN ({placeholders})",
+                    chunk
+                )
+                rows.update(
+                    (rowid, (id, content, timestamp, json.loads(tags_json)))
+                    for rowid, id, content, timestamp, tags_json in cursor
+                )
+        return rows
+
+    def _fetch_vectors(self, rowids):
+        """Fetch the stored vectors for the given rowids as float32, one query per SQL_VARIABLE_LIMIT rowids"""
+        rowids = list(rowids)
+        vectors = {}
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(rowids), self.SQL_VARIABLE_LIMIT):
+                chunk = rowids[start:start + self.SQL_VARIABLE_LIMIT]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT rowid, vector FROM {self.TABLE_NAME} WHERE rowid IN ({placeholders})",
+                    chunk
+                )
+                vectors.update(
+                    (rowid, blob_to_vector(vector_blob, self.vector_dim).astype(np.float32))
+                    for rowid, vector_blob in cursor
+                    if isinstance(vector_blob, bytes)
+                )
+        return vectors
+
+    def _rerank(self, query_matrix, hits_per_query, limit):
+        """Re-score candidate hits with exact L2 distances to the vectors stored in SQLite"""
+        vectors = self._fetch_vectors({rowid for hits in hits_per_query for rowid, _ in hits})
+        reranked = []
+        for query, hits in zip(query_matrix, hits_per_query):
+            rowids = [rowid for rowid, _ in hits if rowid in vectors]
+            if not rowids:
+                reranked.append([])
+                continue
+            candidates = np.stack([vectors[rowid] for rowid in rowids])
+            distances = ((candidates - query) ** 2).sum(axis=1)
+            order = np.argsort(distances, kind='stable')[:limit]
+            reranked.append([(rowids[i], float(distances[i])) for i in order])
+        return reranked
 
     def search(self, query_vector, limit=5, time_range=None, tags=None):
+        return self.search_many([query_vector], limit=limit, time_range=time_range, tags=tags)[0]
+
+    def search_many(self, query_matrix, limit=5, time_range=None, tags=None):
+        """
+        Search many query vectors at once with a single FAISS call and a single metadata lookup.
+
+        :param query_matrix: Sequence of query vectors or a float32 matrix of shape (n, dim)
+        :param limit: Maximum number of results per query
+        :param time_range: Optional (start_time, end_time) applied to every query
+        :param tags: Optional list of tags applied to every query; an entry matches if it has any of them
+        :return: One list of results per query, in query order
+        """
+        query_matrix = np.atleast_2d(np.asarray(query_matrix, dtype=np.float32))
+        if query_matrix.shape[1] != self.vector_dim:
+            raise ValueError(f"Expected query vectors of dimension {self.vector_dim}, got {query_matrix.shape[1]}")
+        query_count = len(query_matrix)
         if self.index is None or self.index.ntotal == 0:
             print("FAISS index is not initialized or empty.")
-            return []
-        
-        query_vector = np.array([query_vector], dtype=np.float32)
-        distances, indices = self.index.search(query_vector, self.index.ntotal)  # 搜索所有向量
-        
-        results = []
-        seen_ids = set()  # 用于跟踪已经添加的 ID
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            for i, idx in enumerate(indices[0]):
-                id = self.id_map[idx]
-                if id in seen_ids:
-                    continue  # 跳过已经添加的 ID
-                
-                cursor.execute(f"SELECT content, timestamp, tags FROM {self.TABLE_NAME} WHERE id = ?", (id,))
-                content, timestamp, tags_json = cursor.fetchone()
-                
-                entry_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-                entry_tags = json.loads(tags_json)
-                
-                if time_range and (entry_time < time_range[0] or entry_time > time_range[1]):
+            return [[] for _ in range(query_count)]
+
+        # 过滤条件在内存中转换为位图，交给 FAISS 在搜索时直接跳过不符合的向量；
+        # 不支持删除的索引中存在失效向量时也需要位图
+        if time_range or tags or self.stale_vectors:
+            mask = self._filter_mask(time_range, tags)
+            candidate_count = int(np.count_nonzero(mask))
+            if candidate_count == 0:
+                return [[] for _ in range(query_count)]
+        else:
+            mask = None
+            candidate_count = self.index.ntotal
+
+        params, bitmap = self._search_params(mask)
+        # 有损存储时多取候选，再用 SQLite 中的向量精确重排序；
+        # 存在失效向量时也要重排序：被替换的旧向量仍以同一 rowid 留在图中，FAISS 返回的距离可能来自旧向量
+        rerank = self.rerank or self.stale_vectors > 0
+        fetch_limit = limit * self.index_params['rerank_factor'] if rerank else limit
+        # 被替换的旧向量与新向量共用同一个 id，多取一些结果再去重
+        k = min(fetch_limit, candidate_count) + self.stale_vectors
+        distances, labels = self.index.search(query_matrix, k, params=params)
+
+        hits_per_query = []
+        for query_labels, query_distances in zip(labels, distances):
+            hits = []
+            seen_rowids = set()
+            for label, distance in zip(query_labels, query_distances):
+                rowid = int(label)
+                if rowid == -1 or rowid in seen_rowids:
                     continue
-                
-                if tags and not any(tag in entry_tags for tag in tags):
+                seen_rowids.add(rowid)
+                hits.append((rowid, float(distance)))
+                if len(hits) == fetch_limit:
+                    break
+            hits_per_query.append(hits)
+
+        if rerank:
+            hits_per_query = self._rerank(query_matrix, hits_per_query, limit)
+
+        # 所有查询命中的条目合并后一次性读取
+        rows = self._fetch_rows({rowid for hits in hits_per_query for rowid, _ in hits})
+
+        results_per_query = []
+        for hits in hits_per_query:
+            results = []
+            for rowid, distance in hits:
+                if rowid not in rows:
+                    # 该条目已被其他进程删除
                     continue
-                
+                id, content, timestamp, entry_tags = rows[rowid]
                 results.append({
                     'id': id,
                     'content': content,
                     'timestamp': timestamp,
                     'tags': entry_tags,
-                    'similarity': 1 / (1 + distances[0][i])
+                    'similarity': 1 / (1 + distance)
                 })
-                seen_ids.add(id)
-                
-                if len(results) >= limit:
-                    break
-        
-        results.sort(key=lambda x: x['similarity'], reverse=True)
-        return results[:limit]
+            results_per_query.append(results)
+        return results_per_query
 
     def insert(self, source, content, vector, tags, timestamp):
-        content_hash = hashlib.md5(content.encode()).hexdigest()
-        vector_json = json.dumps(vector)
-        tags_json = json.dumps(tags)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(f'''
-            INSERT OR REPLACE INTO {self.TABLE_NAME} (id, source, content, vector, tags, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (content_hash, source, content, vector_json, tags_json, timestamp))
-        
-        # 更新 FAISS 索引
-        if self.index is None:
-            self.index = faiss.IndexFlatL2(self.vector_dim)
-        self.index.add(np.array([vector], dtype=np.float32))
-        self.id_map[len(self.id_map)] = content_hash
+        content_hash = self.insert_many([{
+            'source': source,
+            'content': content,
+            'vector': vector,
+            'tags': tags,
+            'timestamp': timestamp
+        }], verbose=False)[0]
         print(f"Inserted/Updated entry with id: {content_hash}, source: {source}")
 
+    def insert_many(self, records, verbose=True):
+        """
+        Insert or update many entries with a single SQLite transaction and a single FAISS add.
+        Entries are keyed by the md5 of their content; re-inserting existing content replaces
+        its row and its vector in place instead of adding a duplicate.
+
+        :param records: Sequence of dicts with keys 'source', 'content', 'vector', 'tags', 'timestamp'
+        :param verbose: Print one summary line for the whole batch
+        :return: The content ids (md5 of the content) of the inserted entries, in order
+        """
+        self._check_writable()
+        if not records:
+            return []
+
+        start_time = time.perf_counter()
+        ids = [hashlib.md5(record['content'].encode()).hexdigest() for record in records]
+        # 同一批次中重复的内容只保留最后一条
+        latest = dict(zip(ids, records))
+        unique_ids = list(latest)
+        unique_records = list(latest.values())
+        vectors = np.asarray([record['vector'] for record in unique_records], dtype=np.float32)
+        if vectors.shape[1] != self.vector_dim:
+            raise ValueError(f"Expected vectors of dimension {self.vector_dim}, got {vectors.shape[1]}")
+
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # 写事务内读取和更新代数，确保没有其他进程的写入夹在中间
+            cursor.execute("BEGIN IMMEDIATE")
+            previous_generation = self._read_meta(cursor, 'generation')
+            generation = self._next_generation(cursor)
+            cursor.executemany(f'''
+            INSERT INTO {self.TABLE_NAME} (id, source, content, vector, tags, timestamp, generation)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                source = excluded.source,
+                content = excluded.content,
+                vector = excluded.vector,
+                tags = excluded.tags,
+                timestamp = excluded.timestamp,
+                generation = excluded.generation
+            ''', [
+                (id, record['source'], record['content'], vector.tobytes(), json.dumps(record['tags']), record['timestamp'], generation)
+                for id, record, vector in zip(unique_ids, unique_records, vectors.astype(self.blob_dtype, copy=False))
+            ])
+            rowid_of = dict(cursor.execute(
+                f"SELECT id, rowid FROM {self.TABLE_NAME} WHERE generation = ?", (generation,)
+            ).fetchall())
+            conn.commit()
+
+        # 更新 FAISS 索引：已在索引中的 rowid 先移除旧向量再写入新向量
+        rowids = [rowid_of[id] for id in unique_ids]
+        replaced = [rowid for rowid in rowids if self._is_indexed(rowid)]
+        old_tags_lists = self._tags_of(rowids) if replaced else None
+        self._remove_from_index(replaced)
+        self._add_to_index(vectors, rowids)
+        self._set_metadata(
+            rowids,
+            [to_epoch_seconds(record['timestamp']) for record in unique_records],
+            [record['tags'] for record in unique_records],
+            old_tags_lists
+        )
+        self._advance_generation(previous_generation, generation)
+        self._compact_if_needed()
+
+        if verbose:
+            elapsed = time.perf_counter() - start_time
+            print(f"Inserted/Updated {len(unique_records)} entries ({len(replaced)} replaced) in {elapsed:.2f}s")
+        return ids
+
+    def delete(self, ids):
+        """
+        Delete entries by content id from SQLite and from the FAISS index.
+
+        :param ids: Content ids (md5 of the content) to delete
+        :return: The number of entries deleted
+        """
+        self._check_writable()
+        ids = list(ids)
+        rowids = []
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for start in range(0, len(ids), self.SQL_VARIABLE_LIMIT):
+                chunk = ids[start:start + self.SQL_VARIABLE_LIMIT]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT rowid FROM {self.TABLE_NAME} WHERE id IN ({placeholders})", chunk)
+                rowids.extend(rowid for (rowid,) in cursor.fetchall())
+            previous_generation, generation = self._delete_rowids(cursor, rowids)
+            conn.commit()
+        self._apply_delete(rowids, previous_generation, generation)
+        return len(rowids)
+
+    def delete_older_than(self, timestamp):
+        """
+        Delete every entry whose timestamp is strictly older than the given one.
+
+        :param timestamp: datetime, 'YYYY-MM-DD HH:MM:SS' string or epoch seconds
+        :return: The number of entries deleted
+        """
+        self._check_writable()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            # 时间戳以 'YYYY-MM-DD HH:MM:SS' 文本存储，按文本比较即可走 timestamp 索引
+            cursor.execute(
+                f"SELECT rowid FROM {self.TABLE_NAME} WHERE timestamp < ?",
+                (format_timestamp(timestamp),)
+            )
+            rowids = [rowid for (rowid,) in cursor.fetchall()]
+            previous_generation, generation = self._delete_rowids(cursor, rowids)
+            conn.commit()
+        self._apply_delete(rowids, previous_generation, generation)
+        print(f"Deleted {len(rowids)} entries older than {timestamp}")
+        return len(rowids)
+
+    def _delete_rowids(self, cursor, rowids):
+        """Delete rows and record tombstones inside the caller's write transaction; returns the generations"""
+        previous_generation = self._read_meta(cursor, 'generation')
+        if not rowids:
+            return previous_generation, previous_generation
+        generation = self._next_generation(cursor)
+        cursor.executemany(f"DELETE FROM {self.TABLE_NAME} WHERE rowid = ?", [(rowid,) for rowid in rowids])
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {self.TOMBSTONE_TABLE_NAME} (rowid, generation) VALUES (?, ?)",
+            [(rowid, generation) for rowid in rowids]
+        )
+        return previous_generation, generation
+
+    def _apply_delete(self, rowids, previous_generation, generation):
+        """Apply a committed delete to the index and the in-memory metadata"""
+        indexed = [rowid for rowid in rowids if self._is_indexed(rowid)]
+        self._remove_from_index(indexed)
+        self._clear_metadata(indexed, self._tags_of(indexed))
+        self._advance_generation(previous_generation, generation)
+        self._compact_if_needed()
+
+    def existing_ids(self, ids):
+        """The subset of the given content ids that are stored, one query per SQL_VARIABLE_LIMIT ids"""
+        ids = list(ids)
+        found = set()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(ids), self.SQL_VARIABLE_LIMIT):
+                chunk = ids[start:start + self.SQL_VARIABLE_LIMIT]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT id FROM {self.TABLE_NAME} WHERE id IN ({placeholders})", chunk)
+                found.update(id for (id,) in cursor)
+        return found
+
+    def count(self):
+        """Number of entries stored in SQLite"""
+        with self._connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME}").fetchone()[0]
+
     def get_all_ids(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"SELECT id FROM {self.TABLE_NAME}")
             return [row[0] for row in cursor.fetchall()]
 
     def get_all_contents(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"SELECT content FROM {self.TABLE_NAME}")
             return [row[0] for row in cursor.fetchall()]
 
     def close(self):
-        # 这个方法保留为了接口一致性，但不需要做任何事情
-        pass
+        # 把未保存的插入写入快照 (只读实例除外)，下次启动无需重新补齐，然后关闭所有线程的连接
+        if self._snapshot_dirty and not self.read_only:
+            self.save_index()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
     def clear_database(self):
-        with sqlite3.connect(self.db_path) as conn:
+        self._check_writable()
+        with self._connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
             cursor.execute(f"DELETE FROM {self.TABLE_NAME}")
+            cursor.execute(f"DELETE FROM {self.TOMBSTONE_TABLE_NAME}")
+            # 清空之前保存的所有快照都随之失效
+            generation = self._next_generation(cursor)
+            cursor.execute(f"UPDATE {self.META_TABLE_NAME} SET value = ? WHERE key = 'reset_generation'", (generation,))
+            # 导入进度等其他元数据随数据一起清空
+            cursor.execute(
+                f"DELETE FROM {self.META_TABLE_NAME} WHERE key NOT IN ('generation', 'reset_generation', 'pruned_generation')"
+            )
             conn.commit()
-        self.index = faiss.IndexFlatL2(self.vector_dim)
-        self.id_map = {}
+        self._reset_index()
+        self.generation = generation
+        self._snapshot_dirty = False
+        self._remove_index_snapshot()
         print("Database cleared")
@@ -0,0 +1,172 @@
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from ai_agent_framework.knowledge.knowledge_base import DEFAULT_VECTOR_DIM, VectorDB
+from ai_agent_framework.knowledge.index_factory import index_spec, resolve_index_params
+
+logger = logging.getLogger(__name__)
+
+_shared_instances = {}
+_shared_instances_lock = threading.Lock()
+
+
+class SharedVectorDB:
+    """
+    A read-only, thread-safe VectorDB shared by the whole process.
+
+    Searches run against the current VectorDB instance; a lock is held only to count
+    the searches using it. A background thread polls the database's write generation;
+    when the import job has written new data, it copies the current instance and applies
+    just the rows changed since (VectorDB.updated_copy) off the request path, then swaps
+    the copy in. Only when the changes cannot be replayed, e.g. after clear_database(),
+    is a fresh VectorDB loaded from the snapshot. In-flight searches keep using the
+    instance they started with, which is closed once the last of them ends.
+
+    Writes are not supported here: instances are opened read-only and never save
+    the FAISS snapshot; the import job owns its own VectorDB.
+    """
+
+    def __init__(self, db_path: str, index_type: str = 'flat', index_params: dict = None, refresh_interval: float = 5.0,
+                 storage: str = 'float32', rerank: bool = None, vector_dim: int = DEFAULT_VECTOR_DIM):
+        """
+        :param db_path: Path to the SQLite database file
+        :param index_type: FAISS index type, see VectorDB
+        :param index_params: Optional index parameters, see VectorDB
+        :param refresh_interval: Seconds between checks for new data; 0 disables background refresh
+        :param storage: Vector precision, see VectorDB
+        :param rerank: Re-rank with stored vectors, see VectorDB
+        :param vector_dim: Vector dimension of the embedder, see VectorDB
+        """
+        self.db_path = db_path
+        self.index_type = index_type
+        self.index_params = index_params
+        self.storage = storage
+        self.rerank = rerank
+        self.vector_dim = vector_dim
+        self.refresh_interval = refresh_interval
+        self._db = self._open()
+        # 每个实例上正在进行的调用数；被替换的实例在计数归零时关闭
+        self._in_use = {}
+        self._in_use_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+        if refresh_interval > 0:
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, name="VectorDBRefresh", daemon=True)
+            self._refresh_thread.start()
+
+    def _open(self) -> VectorDB:
+        return VectorDB(self.db_path, index_type=self.index_type, index_params=self.index_params,
+                        storage=self.storage, rerank=self.rerank, vector_dim=self.vector_dim, read_only=True)
+
+    @property
+    def db(self) -> VectorDB:
+        """
+        The VectorDB instance currently serving searches. It is closed after the next
+        refresh; use acquire() to keep an instance open across several calls.
+        """
+        return self._db
+
+    @contextmanager
+    def acquire(self):
+        """Use the current VectorDB instance; a refresh will not close it until the block exits"""
+        with self._in_use_lock:
+            db = self._db
+            self._in_use[db] = self._in_use.get(db, 0) + 1
+        try:
+            yield db
+        finally:
+            with self._in_use_lock:
+                self._in_use[db] -= 1
+                retired = self._in_use[db] == 0 and db is not self._db
+                if self._in_use[db] == 0:
+                    del self._in_use[db]
+            if retired:
+                db.close()
+
+    def search(self, query_vector, limit=5, time_range=None, tags=None):
+        with self.acquire() as db:
+            return db.search(query_vector, limit=limit, time_range=time_range, tags=tags)
+
+    def search_many(self, query_matrix, limit=5, time_range=None, tags=None):
+        with self.acquire() as db:
+            return db.search_many(query_matrix, limit=limit, time_range=time_range, tags=tags)
+
+    def get_all_ids(self):
+        with self.acquire() as db:
+            return db.get_all_ids()
+
+    def get_all_contents(self):
+        with self.acquire() as db:
+            return db.get_all_contents()
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Bring the VectorDB up to date if the database has changed and swap it in.
+
+        :param force: Reload from the snapshot even if the write generation is unchanged
+        :return: True if a new instance was swapped in
+        """
+        with self._refresh_lock:
+            current = self._db
+            if not force and current.read_generation() == current.generation:
+                return False
+
+            start_time = time.perf_counter()
+            # 在当前索引的副本上补齐新写入，只有无法增量补齐时才重新加载快照
+            fresh = None if force else current.updated_copy()
+            how = f"caught up from generation {current.generation}"
+            if fresh is None:
+                fresh = self._open()
+                how = "reloaded"
+            # 切换后进行中的搜索继续使用旧实例，由最后一个结束的搜索关闭它
+            with self._in_use_lock:
+                self._db = fresh
+                idle = current not in self._in_use
+            if idle:
+                current.close()
+            elapsed = time.perf_counter() - start_time
+            logger.info("Shared VectorDB %s %s to %d in %.2fs. FAISS index size: %d",
+                        self.db_path, how, fresh.generation, elapsed, fresh.index.ntotal)
+            return True
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # 刷新失败时继续使用当前实例，下个周期重试
+                logger.exception("Error refreshing shared VectorDB %s", self.db_path)
+
+    def close(self):
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+        with self._refresh_lock:
+            self._db.close()
+
+
+def get_shared_vector_db(db_path: str, index_type: str = 'flat', index_params: dict = None, refresh_interval: float = 5.0,
+                         storage: str = 'float32', rerank: bool = None, vector_dim: int = DEFAULT_VECTOR_DIM) -> SharedVectorDB:
+    """
+    Return the process-wide SharedVectorDB for a database, creating it on first use.
+
+    :param db_path: Path to the SQLite database file
+    :param index_type: FAISS index type, see VectorDB
+    :param index_params: Optional index parameters, see VectorDB
+    :param refresh_interval: Seconds between checks for new data (only used on creation)
+    :param storage: Vector precision, see VectorDB
+    :param rerank: Re-rank with stored vectors, see VectorDB (only used on creation)
+    :param vector_dim: Vector dimension of the embedder, see VectorDB
+    :return: The shared instance
+    """
+    params = resolve_index_params(index_type, index_params, storage)
+    key = (os.path.abspath(db_path), index_spec(index_type, params, storage), vector_dim)
+    with _shared_instances_lock:
+        shared = _shared_instances.get(key)
+        if shared is None:
+            shared = SharedVectorDB(db_path, index_type, index_params, refresh_interval, storage, rerank, vector_dim)
+            _shared_instances[key] = shared
+        return shared
@@ -1,6 +1,11 @@
 import os
-from knowledge_base import VectorDB
-from openai import OpenAI
+import sys
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.embedder import get_embedder, knowledge_db_path
 from dotenv import load_dotenv
 
 # 获取脚本所在目录
@@ -9,36 +14,24 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # 构建 .env 文件路径
 env_path = os.path.join(os.path.dirname(os.path.dirname(SCRIPT_DIR)), '.env')
 
-# 检查 .env 文件是否存在
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at {env_path}")
-
-# 加载 .env 文件
+# 加载 .env 文件（本地嵌入后端不需要 OpenAI API key）
 load_dotenv(env_path)
 
-# 加载 OpenAI API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in .env file")
-
-client = OpenAI(api_key=api_key)
+# 嵌入后端由 EMBEDDING_BACKEND / EMBEDDING_MODEL 决定
+embedder = get_embedder()
 
-print(f"Successfully loaded API key from {env_path}")
+print(f"Using embedding model {embedder.model_name} (dim {embedder.dimension})")
 
 def get_embedding(text):
     """获取文本的嵌入向量"""
-    response = client.embeddings.create(
-        model="text-embedding-ada-002",
-        input=[text]
-    )
-    return response.data[0].embedding
+    return embedder.embed_query(text)
 
 def main():
-    # 构建数据库文件路径
-    db_path = os.path.join(SCRIPT_DIR, "knowledge.db")
+    # 构建数据库文件路径（每个嵌入模型一个数据库）
+    db_path = knowledge_db_path(embedder)
     
     # 初始化 VectorDB
-    db = VectorDB(db_path)
+    db = VectorDB(db_path, vector_dim=embedder.dimension)
     
     while True:
         # 获取用户输入
@@ -1,11 +1,13 @@
 import sys
 import os
+import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 
 from ai_agent_framework.agents import agent_registry  # 导入 agent_registry
-from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.shared_vector_db import get_shared_vector_db
+from ai_agent_framework.knowledge.embedder import get_embedder, knowledge_db_path
 from ai_agent_framework.frontend.chat_interface import ChatInterface
 
 # 加载环境变量
@@ -21,12 +23,12 @@ class AIAgentFramework:
         if not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
-        # 获取数据库路径
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = os.path.join(current_dir, "knowledge", "knowledge.db")
+        # 嵌入模型决定向量维度和数据库路径（EMBEDDING_BACKEND / EMBEDDING_MODEL）
+        self.embedder = get_embedder(api_key=self.openai_api_key)
+        self.db_path = knowledge_db_path(self.embedder)
         
-        # 初始化知识库
-        self.knowledge_base = VectorDB(self.db_path)
+        # 初始化知识库（进程内共享，聊天界面使用同一个实例）
+        self.knowledge_base = get_shared_vector_db(self.db_path, vector_dim=self.embedder.dimension)
         
         # 初始化聊天界面
         self.chat_interface = ChatInterface(self.db_path, self.openai_api_key)
@@ -36,5 +38,7 @@ class AIAgentFramework:
         pass
 
 if __name__ == "__main__":
+    # 知识库后台刷新等模块通过 logging 输出
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     framework = AIAgentFramework()
     framework.chat_interface.launch()
\ No newline at end of file
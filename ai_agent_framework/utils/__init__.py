@@ -0,0 +1,3 @@
+from .tokens import TokenCounter, estimate_tokens, get_token_counter
+
+__all__ = ['TokenCounter', 'estimate_tokens', 'get_token_counter']
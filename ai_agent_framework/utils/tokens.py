@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import Optional
+
+# CONTEXT_TOKENIZER 可以是 Hugging Face Hub 上的 tokenizer 名称或本地 tokenizer.json 路径
+DEFAULT_TOKENIZER = "Xenova/gpt-4"
+# 本地缓存中没有 tokenizer 时等待下载的秒数 (CONTEXT_TOKENIZER_TIMEOUT)；离线时 Hub 客户端会反复重试，
+# 超时后改用估算，下载在后台完成后下次启动即可从缓存加载
+DEFAULT_DOWNLOAD_TIMEOUT = 5.0
+
+_shared_counters = {}
+_shared_counters_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 bytes of UTF-8 per token"""
+    return len(text.encode('utf-8')) // 4 + 1
+
+
+def _download_tokenizer(tokenizer_name: str, timeout: float) -> str:
+    """Path of the tokenizer.json of a Hub tokenizer, from the local cache or downloaded within timeout seconds"""
+    from huggingface_hub import hf_hub_download
+    try:
+        return hf_hub_download(tokenizer_name, 'tokenizer.json', local_files_only=True)
+    except Exception:
+        pass
+
+    result = {}
+
+    def download():
+        try:
+            result['path'] = hf_hub_download(tokenizer_name, 'tokenizer.json')
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=download, name="TokenizerDownload", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"not in the local cache and not downloaded within {timeout:g}s")
+    if 'error' in result:
+        raise result['error']
+    return result['path']
+
+
+class TokenCounter:
+    """
+    Counts and truncates text in tokens with a Hugging Face tokenizers model. Without the
+    tokenizers library, or when the model is neither a local file nor in the Hub cache
+    and cannot be downloaded within download_timeout (e.g. offline), it falls back to
+    estimate_tokens().
+    """
+
+    def __init__(self, tokenizer_name: str = DEFAULT_TOKENIZER, download_timeout: Optional[float] = None):
+        """
+        :param tokenizer_name: Tokenizer name on the Hugging Face Hub, or a path to a tokenizer.json file
+        :param download_timeout: Seconds to wait for a tokenizer that is not cached yet;
+                                 defaults to CONTEXT_TOKENIZER_TIMEOUT, then DEFAULT_DOWNLOAD_TIMEOUT
+        """
+        if download_timeout is None:
+            download_timeout = float(os.getenv("CONTEXT_TOKENIZER_TIMEOUT", DEFAULT_DOWNLOAD_TIMEOUT))
+        self.tokenizer_name = tokenizer_name
+        self.tokenizer = None
+        try:
+            from tokenizers import Tokenizer
+            if os.path.exists(tokenizer_name):
+                self.tokenizer = Tokenizer.from_file(tokenizer_name)
+            else:
+                self.tokenizer = Tokenizer.from_file(_download_tokenizer(tokenizer_name, download_timeout))
+        except Exception as e:
+            print(f"Warning: Could not load tokenizer '{tokenizer_name}' ({e}). Estimating token counts.")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is None:
+            return estimate_tokens(text)
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of text within max_tokens, cut at a token boundary"""
+        if max_tokens <= 0:
+            return ""
+        if self.tokenizer is None:
+            if estimate_tokens(text) <= max_tokens:
+                return text
+            encoded = text.encode('utf-8')[:max_tokens * 4]
+            return encoded.decode('utf-8', errors='ignore')
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[:encoding.offsets[max_tokens - 1][1]]
+
+
+def get_token_counter(tokenizer_name: Optional[str] = None) -> TokenCounter:
+    """The process-wide TokenCounter for a tokenizer (default: CONTEXT_TOKENIZER, then DEFAULT_TOKENIZER)"""
+    tokenizer_name = tokenizer_name or os.getenv("CONTEXT_TOKENIZER", DEFAULT_TOKENIZER)
+    with _shared_counters_lock:
+        counter = _shared_counters.get(tokenizer_name)
+        if counter is None:
+            counter = TokenCounter(tokenizer_name)
+            _shared_counters[tokenizer_name] = counter
+        return counter
@@ -0,0 +1,172 @@
+import os
+import sys
+import glob
+import json
+import html
+import time
+import random
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from html_cleaner import clean_html, clean_html_many
+
+GOLDEN_FILE = os.path.join(SCRIPT_DIR, 'clean_html_golden.json')
+RECORDED_FEED_DIR = os.path.join(SCRIPT_DIR, 'recorded_feeds')
+
+
+def soup_clean_html(content):
+    """The previous RSSFetcher.clean_html: BeautifulSoup tree, decompose img/script/style, get_text()"""
+    from bs4 import BeautifulSoup
+
+    if '<html' in content or '<body' in content or '<p' in content:
+        soup = BeautifulSoup(content, 'html.parser')
+        for img in soup.find_all('img'):
+            img.decompose()
+        for tag in soup(['style', 'script']):
+            tag.decompose()
+        clean_text = soup.get_text(separator=' ', strip=True)
+        return html.unescape(clean_text)
+    else:
+        return html.unescape(content)
+
+
+def load_golden():
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_golden():
+    """Recompute the expected text of every golden case with the BeautifulSoup cleaner"""
+    cases = [{"html": case["html"], "text": soup_clean_html(case["html"])} for case in load_golden()]
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cases, f, ensure_ascii=False, indent=2)
+    print(f"Wrote {len(cases)} golden cases to {GOLDEN_FILE}")
+
+
+def load_recorded_entries(feed_dir=RECORDED_FEED_DIR):
+    """Titles and contents of the entries in recorded_feed_server.py's recorded feeds"""
+    import feedparser
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(feed_dir, '*.xml'))):
+        for entry in feedparser.parse(path).entries:
+            texts.append(entry.get('title', ''))
+            texts.append(entry.content[0].value if 'content' in entry else entry.get('description', ''))
+    return texts
+
+
+def synthetic_articles(count, seed=0):
+    """Full-content articles shaped like Bitcoin Magazine's feed: figures, embeds, lists and entities"""
+    rng = random.Random(seed)
+    words = ("bitcoin ether price market etf inflows analysts said on monday traders &amp; whales "
+             "liquidity rally &#8217;s halving miners &mdash; exchange regulation").split()
+
+    def sentence():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(8, 25))).capitalize() + '.'
+
+    articles = []
+    for _ in range(count):
+        parts = ['<figure><img src="https://example.com/image.jpg" alt="chart" width="1200"/>'
+                 f'<figcaption>{sentence()}</figcaption></figure>']
+        for _ in range(rng.randint(6, 20)):
+            kind = rng.random()
+            if kind < 0.1:
+                parts.append(f'<ul><li>{sentence()}</li><li><strong>{sentence()}</strong></li></ul>')
+            elif kind < 0.15:
+                parts.append(f'<blockquote class="twitter-tweet"><p>{sentence()}</p></blockquote>'
+                             '<script async src="https://platform.twitter.com/widgets.js"></script>')
+            elif kind < 0.2:
+                parts.append(f'<style>.wp-block{{margin:0}}</style><h2>{sentence()}</h2>')
+            else:
+                parts.append(f'<p>{sentence()} <a href="https://example.com">{sentence()}</a> {sentence()}</p>')
+        articles.append('\n'.join(parts))
+    return articles
+
+
+def fuzz_markup(count, seed=0):
+    """Random tag soup: unclosed and stray tags, void elements, entities, comments and CDATA"""
+    rng = random.Random(seed)
+    tokens = ['<p>', '</p>', '<b>', '</b>', '<br>', '</br>', '<br/>', '<img src=x>', '</img>', '<script>x<p>y</script>',
+              '<style>p{}</style>', '<template>', '</template>', '<rt>', '</rt>', '<rp>', '</rp>', '<div/>',
+              '<!-- c -->', '<![CDATA[ cd ]]>', '<!DOCTYPE html>', '<?pi?>', '&amp;', '&lt;', '&copy', '&foo;',
+              '&#8217;', '&#150;', '&#x1F600;', '&#0;', ' ', '\n', 'text', 'AT&T', 'a < b', '<body>', '</body>']
+    return ['<p>' + ''.join(rng.choice(tokens) for _ in range(rng.randint(1, 30))) for _ in range(count)]
+
+
+def check(texts_by_corpus):
+    """Compare clean_html() with the golden texts and with the BeautifulSoup cleaner"""
+    failures = 0
+    golden = load_golden()
+    for case in golden:
+        if clean_html(case["html"]) != case["text"]:
+            failures += 1
+            print(f"Golden mismatch: {case['html'][:80]!r}\n  expected {case['text'][:80]!r}\n"
+                  f"  got      {clean_html(case['html'])[:80]!r}")
+    print(f"golden: {len(golden) - failures}/{len(golden)} identical")
+
+    for name, texts in texts_by_corpus.items():
+        mismatches = [text for text in texts if clean_html(text) != soup_clean_html(text)]
+        failures += len(mismatches)
+        for text in mismatches[:3]:
+            print(f"Mismatch: {text[:80]!r}\n  BeautifulSoup {soup_clean_html(text)[:80]!r}\n"
+                  f"  clean_html    {clean_html(text)[:80]!r}")
+        print(f"{name}: {len(texts) - len(mismatches)}/{len(texts)} identical to BeautifulSoup")
+    return failures
+
+
+def report(name, seconds, count):
+    print(f"    {name:<30} {seconds:8.3f} s  {count / seconds:10.0f} articles/s")
+
+
+def run_benchmark(texts, processes):
+    print(f"\n{len(texts)} texts, {sum(map(len, texts)) / len(texts):.0f} characters on average")
+    start = time.perf_counter()
+    for text in texts:
+        soup_clean_html(text)
+    report("BeautifulSoup (previous)", time.perf_counter() - start, len(texts))
+
+    start = time.perf_counter()
+    for text in texts:
+        clean_html(text)
+    report("clean_html", time.perf_counter() - start, len(texts))
+
+    for count in processes:
+        start = time.perf_counter()
+        clean_html_many(texts, processes=count)
+        report(f"clean_html_many, {count} processes", time.perf_counter() - start, len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check clean_html against the BeautifulSoup cleaner and compare their speed")
+    parser.add_argument('--articles', type=int, default=2000, help="Synthetic full-content articles to clean")
+    parser.add_argument('--fuzz', type=int, default=5000, help="Random markup samples to compare")
+    parser.add_argument('--processes', type=int, nargs='*', default=[2, 4], help="Process pool sizes to benchmark")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="Recompute clean_html_golden.json with the BeautifulSoup cleaner and exit")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden()
+        return
+
+    corpora = {
+        "synthetic articles": synthetic_articles(args.articles),
+        "random markup": fuzz_markup(args.fuzz),
+    }
+    recorded = load_recorded_entries()
+    if recorded:
+        corpora["recorded feeds"] = recorded
+    failures = check(corpora)
+    if failures:
+        print(f"{failures} mismatches")
+        sys.exit(1)
+
+    run_benchmark(corpora["synthetic articles"], args.processes)
+    if recorded:
+        run_benchmark(recorded, args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+# Add the project root to the Python path so the knowledge package can be imported
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from ai_agent_framework.knowledge.article_store import STORAGE_FILES, open_article_store
+from keyword_matcher import KeywordMatcher
+
+
+def substring_tags(tags, content):
+    """The previous TagExtractor.extract_tags: one substring scan per tag"""
+    content_lower = content.lower()
+    return list(set(tag for tag in tags if tag in content_lower))
+
+
+def load_articles(storage, limit):
+    """Article texts from the archive data_source/main.py keeps, or synthetic ones if it is empty"""
+    articles = []
+    store = open_article_store(SCRIPT_DIR, storage)
+    if store.exists():
+        for article in store:
+            articles.append(article['data'])
+            if len(articles) == limit:
+                break
+    if hasattr(store, 'close'):
+        store.close()
+    if articles:
+        return articles
+    rng = random.Random(0)
+    words = ("the market bitcoin ethereum rally etf approval together ethics defi staking whales "
+             "regulation liquidity layer 2 rollups exchange price traders analysts said on monday").split()
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(100, 600))) for _ in range(limit)]
+
+
+def synthetic_tags(count, seed=0):
+    """Made-up ticker and project names to grow the tag list to count entries"""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    tags = set()
+    while len(tags) < count:
+        tags.add(''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(tags)
+
+
+def run_benchmark(articles, tags):
+    start = time.perf_counter()
+    matcher = KeywordMatcher(tags, word_boundary=False)
+    build_seconds = time.perf_counter() - start
+    whole_words = KeywordMatcher(tags, word_boundary=True)
+
+    start = time.perf_counter()
+    old = [substring_tags(tags, article) for article in articles]
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [matcher.match(article) for article in articles]
+    new_seconds = time.perf_counter() - start
+
+    # TagExtractor 默认按子串匹配，结果应与逐个标签扫描完全一致
+    mismatches = sum(1 for o, n in zip(old, new) if set(o) != set(n))
+    # 只匹配整词时会丢掉 "nfts"、"stablecoins" 中的标签，同时去掉 "ethics" 中的 "eth"
+    bounded = [whole_words.match(article) for article in articles]
+    only_substring = sum(len(set(n) - set(b)) for n, b in zip(new, bounded))
+    print(f"{len(tags):>6} tags ({len(matcher)} automaton states, built in {build_seconds * 1000:.1f} ms)")
+    print(f"    substring scan:  {old_seconds / len(articles) * 1000:8.3f} ms/article  {len(articles) / old_seconds:10.0f} articles/s")
+    print(f"    Aho-Corasick:    {new_seconds / len(articles) * 1000:8.3f} ms/article  {len(articles) / new_seconds:10.0f} articles/s")
+    print(f"    articles tagged differently from the substring scan: {mismatches}")
+    print(f"    tags lost with word_boundary=True (plurals, compounds, partial words): {only_substring}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Aho-Corasick tagger with the per-tag substring scan")
+    parser.add_argument('--storage', choices=list(STORAGE_FILES),
+                        help="Archive format: sqlite (knowledge_base.db) or jsonl; defaults to ARTICLE_STORAGE or sqlite")
+    parser.add_argument('--limit', type=int, default=2000, help="Articles to tag")
+    parser.add_argument('--tag-counts', type=int, nargs='*', default=[1000, 5000],
+                        help="Also benchmark tags.json grown to these sizes with synthetic names")
+    args = parser.parse_args()
+
+    with open(os.path.join(SCRIPT_DIR, 'tags.json'), 'r') as f:
+        tags = [tag.lower() for tag in json.load(f)['tags']]
+    articles = load_articles(args.storage, args.limit)
+    print(f"{len(articles)} articles, {sum(map(len, articles)) / len(articles):.0f} characters on average\n")
+
+    run_benchmark(articles, tags)
+    for count in args.tag_counts:
+        if count > len(tags):
+            run_benchmark(articles, tags + synthetic_tags(count - len(tags)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import html
+from concurrent.futures import ProcessPoolExecutor
+from html.entities import html5
+from html.parser import HTMLParser
+
+# 只有包含这些标记的内容才按 HTML 解析，其余内容只做实体反转义
+HTML_MARKERS = ('<html', '<body', '<p')
+
+# BeautifulSoup 的 html.parser 构建器视为空元素的标签
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer',
+])
+
+# 这些标签中的文本不会出现在 BeautifulSoup 的 get_text() 结果中（script 和 style 原本就会被删除）
+EXCLUDED_ELEMENTS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# 命名实体，同时接受带分号和不带分号的写法
+_ENTITIES = {}
+for _name, _character in html5.items():
+    _ENTITIES.setdefault(_name.rstrip(';'), _character)
+
+DEFAULT_CHUNKSIZE = 32
+
+
+def _numeric_reference(name):
+    """The character of a numeric reference such as '8217' or 'x2019', resolved as BeautifulSoup does"""
+    number = int(name[1:], 16) if name[0] in 'xX' else int(name)
+    if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+        return '\ufffd'
+    if 0x80 <= number <= 0x9f:
+        # 按 Windows-1252 编码写出的引号、破折号等
+        try:
+            return bytes([number]).decode('windows-1252')
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects the text of an HTML fragment without building a tree.
+
+    Follows the BeautifulSoup html.parser tree builder event for event: text is split
+    into strings at every tag, comment or declaration; open tags are tracked only to
+    know when the text is inside script, style, template, rt or rp; CDATA sections are
+    kept and comments, doctypes and processing instructions are dropped.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.strings = []
+        self._data = []
+        self._open_tags = []
+        self._excluded = 0
+        self._closed_void_tags = []
+
+    def _flush(self):
+        if self._data:
+            text = ''.join(self._data).strip()
+            self._data = []
+            if text and not self._excluded:
+                self.strings.append(text)
+
+    def _start(self, tag, close_void):
+        self._flush()
+        self._open_tags.append(tag)
+        if tag in EXCLUDED_ELEMENTS:
+            self._excluded += 1
+        if close_void and tag in VOID_ELEMENTS:
+            # 空元素立即关闭，之后同名的结束标签会被忽略
+            self._end(tag, check_closed=False)
+            self._closed_void_tags.append(tag)
+
+    def _end(self, tag, check_closed=True):
+        if check_closed and tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+            return
+        self._flush()
+        open_tags = self._open_tags
+        for index in range(len(open_tags) - 1, -1, -1):
+            if open_tags[index] == tag:
+                # 结束标签同时关闭其中所有未关闭的标签
+                self._excluded -= sum(1 for name in open_tags[index:] if name in EXCLUDED_ELEMENTS)
+                del open_tags[index:]
+                break
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, close_void=True)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, close_void=False)
+        self._end(tag, check_closed=False)
+
+    def handle_endtag(self, tag):
+        self._end(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_entityref(self, name):
+        character = _ENTITIES.get(name)
+        self._data.append(character if character is not None else '&' + name)
+
+    def handle_charref(self, name):
+        self._data.append(_numeric_reference(name))
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith('CDATA['):
+            text = data[len('CDATA['):].strip()
+            if text:
+                self.strings.append(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def needs_parsing(content):
+    """Whether content is treated as HTML rather than plain text"""
+    return any(marker in content for marker in HTML_MARKERS)
+
+
+def clean_html(content):
+    """
+    Plain text of an entry's title or content: for HTML, the text with img, script
+    and style removed, strings joined by single spaces; entities are unescaped.
+    Gives the same result as the previous BeautifulSoup get_text() based cleaning.
+    """
+    if not needs_parsing(content):
+        # 标题和纯文本摘要不需要解析
+        return html.unescape(content)
+    parser = TextExtractor()
+    parser.feed(content)
+    parser.close()
+    return html.unescape(' '.join(parser.strings))
+
+
+def clean_html_many(contents, processes=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    clean_html() for a list of contents. Only the contents that need parsing are sent
+    to a pool of processes when processes > 1; plain text is handled in this process.
+
+    :param contents: List of titles or contents
+    :param processes: Worker processes; None, 0 or 1 cleans everything in this process
+    :param chunksize: Contents sent to a worker at a time
+    :return: The cleaned texts, in the order of contents
+    """
+    if not processes or processes <= 1:
+        return [clean_html(content) for content in contents]
+
+    results = list(contents)
+    parse_indexes = []
+    for index, content in enumerate(contents):
+        if needs_parsing(content):
+            parse_indexes.append(index)
+        else:
+            results[index] = clean_html(content)
+    if parse_indexes:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            cleaned = executor.map(clean_html, [contents[index] for index in parse_indexes], chunksize=chunksize)
+            for index, text in zip(parse_indexes, cleaned):
+                results[index] = text
+    return results
@@ -0,0 +1,100 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of keywords.
+
+    Built once, it finds every occurrence of every keyword in a single pass over the
+    text, so the cost grows with the text length rather than with the number of
+    keywords. Matching is case-insensitive. With word_boundary, a keyword only matches
+    when it is not preceded or followed by a letter or digit, so "eth" does not match
+    inside "ethics" or "together".
+    """
+
+    def __init__(self, keywords, word_boundary=True):
+        """
+        :param keywords: Iterable of keywords, or of (keyword, value) pairs; a keyword's value
+                         (the keyword itself by default) is what match() returns for it
+        :param word_boundary: Only match whole words
+        """
+        self.word_boundary = word_boundary
+        # 每个状态: 转移表、失败指针、在此结束的 (关键词长度, 值) 列表
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for keyword in keywords:
+            keyword, value = keyword if isinstance(keyword, tuple) else (keyword, keyword)
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((len(keyword), value))
+
+        # 按层序计算失败指针，并把失败状态的输出并入当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter_matches(self, text):
+        """
+        Yield (start, end, value) for every keyword occurrence in text, in order of end position.
+        """
+        text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        word_boundary = self.word_boundary
+        length = len(text)
+        root = goto[0]
+        state = 0
+        for index, char in enumerate(text):
+            if state:
+                transitions = goto[state]
+                while char not in transitions:
+                    state = fail[state]
+                    if not state:
+                        break
+                    transitions = goto[state]
+                state = goto[state].get(char, 0)
+            else:
+                # 大部分字符停留在根状态附近，单独处理以减少字典查找
+                state = root.get(char, 0)
+                if not state:
+                    continue
+            if not output[state]:
+                continue
+            end = index + 1
+            for keyword_length, value in output[state]:
+                start = end - keyword_length
+                if word_boundary and (
+                    (start > 0 and text[start - 1].isalnum() and text[start].isalnum()) or
+                    (end < length and text[end].isalnum() and text[end - 1].isalnum())
+                ):
+                    continue
+                yield start, end, value
+
+    def match(self, text):
+        """The distinct values of the keywords found in text, in order of first occurrence"""
+        return list(dict.fromkeys(value for _, _, value in self.iter_matches(text)))
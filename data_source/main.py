@@ -1,161 +1,467 @@
-import json
-import feedparser
-import time
-from bs4 import BeautifulSoup
-import os
-from datetime import datetime
-import html
-
-# Get the directory of the current script
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# Class for handling predefined tags and tag extraction logic
-class TagExtractor:
-    def __init__(self, tag_file='tags.json'):
-        tag_file_path = os.path.join(SCRIPT_DIR, tag_file)
-        with open(tag_file_path, 'r') as f:
-            data = json.load(f)
-            self.predefined_tags = data['tags']
-
-    def extract_tags(self, content):
-        content_lower = content.lower()
-        tags = [keyword for keyword in self.predefined_tags if keyword in content_lower]
-        return list(set(tags))
-
-# Class to handle fetching RSS feeds and cleaning the content
-class RSSFetcher:
-    def __init__(self):
-        self.feed_urls = {
-            "Blockworks": "https://blockworks.co/feed/",
-            "Cointelegraph": "https://cointelegraph.com/rss",
-            "The Block": "https://www.theblock.co/rss", 
-            "CryptoSlate": "https://cryptoslate.com/feed/",
-            "TodayOnChain": "https://www.todayonchain.com/feed/",
-            "CoinDesk": "https://www.coindesk.com/arc/outboundfeeds/rss/",
-            "NewsBTC": "https://www.newsbtc.com/feed/",
-            "Bitcoin Magazine": "https://bitcoinmagazine.com/.rss/full/",
-            "The Defiant": "https://thedefiant.io/feed",
-            "BeInCrypto": "https://beincrypto.com/feed/",
-            "CryptoBriefing": "https://cryptobriefing.com/feed/",
-            "U.Today": "https://u.today/rss",
-            "CryptoGlobe": "https://www.cryptoglobe.com/latest/feed/",
-            "AMBCrypto": "https://ambcrypto.com/feed/",
-            "Cryptopolitan": "https://www.cryptopolitan.com/feed/",
-            "Chainbuzz": "https://chainbuzz.xyz/rss"
-        }
-
-    @staticmethod
-    def clean_html(content):
-        if '<html' in content or '<body' in content or '<p' in content:
-            soup = BeautifulSoup(content, 'html.parser')
-            for img in soup.find_all('img'):
-                img.decompose()
-            for tag in soup(['style', 'script']):
-                tag.decompose()
-            clean_text = soup.get_text(separator=' ', strip=True)
-            try:
-                clean_text = bytes(clean_text, 'utf-8').decode('utf-8')
-            except UnicodeDecodeError:
-                pass
-            return html.unescape(clean_text)
-        else:
-            return html.unescape(content)
-
-    @staticmethod
-    def parse_date(date_string):
-        try:
-            parsed_date = feedparser._parse_date(date_string)
-            if parsed_date:
-                return int(time.mktime(parsed_date))
-        except:
-            pass
-
-        date_formats = [
-            "%a, %d %b %Y %H:%M:%S %z",
-            "%Y-%m-%dT%H:%M:%S%z",
-            "%Y-%m-%d %H:%M:%S",
-            "%a, %d %b %Y %H:%M:%S GMT",
-            "%Y-%m-%dT%H:%M:%SZ",
-        ]
-
-        for format in date_formats:
-            try:
-                return int(datetime.strptime(date_string, format).timestamp())
-            except ValueError:
-                continue
-
-        return int(time.time())
-
-    def fetch_rss_data_with_clean_text(self, rss_url):
-        feed = feedparser.parse(rss_url)
-        new_data = []
-
-        for entry in feed.entries:
-            title = entry.title
-            content = entry.content[0].value if 'content' in entry else entry.get('description', "No content available")
-            
-            clean_title = self.clean_html(title)
-            clean_content = self.clean_html(content)
-
-            published_date = entry.get('published', entry.get('updated', None))
-            if published_date:
-                timestamp = self.parse_date(published_date)
-            else:
-                timestamp = int(time.time())
-
-            new_data.append({
-                "data": f"{clean_title} - {clean_content}",
-                "source": rss_url,
-                "timestamp": timestamp
-            })
-
-        return new_data
-
-    def fetch_all_feeds(self):
-        all_articles = []
-        for source, url in self.feed_urls.items():
-            try:
-                articles = self.fetch_rss_data_with_clean_text(url)
-                all_articles.extend(articles)
-                print(f"Fetched {len(articles)} articles from {source}")
-            except Exception as e:
-                print(f"Failed to fetch data from {source}: {e}")
-        return all_articles
-
-# Class to manage the knowledge base and update it
-class KnowledgeBaseUpdater:
-    def __init__(self, database_file='knowledge_base.json'):
-        self.database_file = os.path.join(SCRIPT_DIR, database_file)
-        self.tag_extractor = TagExtractor()
-        self.rss_fetcher = RSSFetcher()
-
-    def load_knowledge_base(self):
-        try:
-            with open(self.database_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-
-    def save_knowledge_base(self, knowledge_base):
-        with open(self.database_file, 'w', encoding='utf-8') as f:
-            json.dump(knowledge_base, f, indent=4, ensure_ascii=False)
-
-    def update_database(self):
-        knowledge_base = self.load_knowledge_base()
-        fetched_articles = self.rss_fetcher.fetch_all_feeds()
-        
-        for article in fetched_articles:
-            tags = self.tag_extractor.extract_tags(article["data"])
-            article["tags"] = tags
-            knowledge_base.append(article)
-
-        self.save_knowledge_base(knowledge_base)
-        print(f"Database updated successfully with {len(knowledge_base)} articles.")
-
-# Function to trigger database update on one click
-def one_click_update():
-    updater = KnowledgeBaseUpdater()
-    updater.update_database()
-
-if __name__ == "__main__":
-    one_click_update()
\ No newline at end of file
+import json
+import feedparser
+import time
+import httpx
+import os
+import re
+import sys
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+# Get the directory of the current script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add the project root to the Python path so the knowledge package can be imported
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from ai_agent_framework.knowledge.article_store import STORAGE_FILES, export_json, open_article_store
+from keyword_matcher import KeywordMatcher
+from html_cleaner import clean_html, clean_html_many
+
+# Class for handling predefined tags and tag extraction logic
+class TagExtractor:
+    """
+    Tags articles with the keywords from tags.json in one pass per article, using an
+    Aho-Corasick automaton built once. Like the per-tag substring scan it replaced, a tag
+    also matches inside longer words, so "nft" tags "NFTs" and "crypto" tags
+    "cryptocurrency". tags.json may also map tags to aliases, e.g.
+    {"tags": [...], "aliases": {"ethereum": ["eth", "ether"]}}; an alias found in the
+    text adds its tag.
+    """
+    def __init__(self, tag_file='tags.json', word_boundary=False):
+        """
+        :param tag_file: Tag list, relative to this directory
+        :param word_boundary: Only match whole words, so "eth" does not match "ethics"; off by
+                              default because it also drops plurals and compounds ("NFTs", "DAOs")
+        """
+        tag_file_path = os.path.join(SCRIPT_DIR, tag_file)
+        with open(tag_file_path, 'r') as f:
+            data = json.load(f)
+            self.predefined_tags = data['tags']
+            self.aliases = data.get('aliases', {})
+        keywords = [(tag.lower(), tag) for tag in self.predefined_tags]
+        keywords += [(alias.lower(), tag) for tag, aliases in self.aliases.items() for alias in aliases]
+        self.matcher = KeywordMatcher(keywords, word_boundary=word_boundary)
+
+    def extract_tags(self, content):
+        return self.matcher.match(content)
+
+    def extract_tags_many(self, contents):
+        """Tags for each of a batch of articles, in order"""
+        match = self.matcher.match
+        return [match(content) for content in contents]
+
+def feed_slug(source):
+    """File-system friendly name of a feed, e.g. 'The Block' -> 'the_block'"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', source).strip('_').lower()
+
+def close_when_done(client, futures):
+    """Close the client now, or once the last of futures (requests still using it) is done"""
+    pending = set(futures)
+    if not pending:
+        client.close()
+        return
+    lock = threading.Lock()
+
+    def release(future):
+        with lock:
+            pending.discard(future)
+            if pending:
+                return
+        client.close()
+
+    for future in list(pending):
+        future.add_done_callback(release)
+
+# Class to handle fetching RSS feeds and cleaning the content
+class RSSFetcher:
+    # 单个订阅源的超时、整次抓取的截止时间和并发数
+    DEFAULT_TIMEOUT = 10.0
+    DEFAULT_DEADLINE = 60.0
+    DEFAULT_MAX_WORKERS = 8
+    # 清洗 HTML 的进程数，0 表示在当前进程中清洗
+    DEFAULT_CLEAN_WORKERS = 0
+
+    def __init__(self, feed_urls=None, state_file='feed_state.json', timeout=DEFAULT_TIMEOUT,
+                 deadline=DEFAULT_DEADLINE, max_workers=DEFAULT_MAX_WORKERS, clean_workers=DEFAULT_CLEAN_WORKERS):
+        """
+        :param feed_urls: {source name: feed URL}; defaults to the built-in list
+        :param state_file: JSON file keeping each feed's ETag and Last-Modified, relative to this directory
+        :param timeout: Seconds allowed for each feed's request
+        :param deadline: Seconds allowed for fetching all feeds; feeds not done by then are skipped
+        :param max_workers: Feeds fetched at the same time
+        :param clean_workers: Processes cleaning the entries' HTML; 0 or 1 cleans in this process
+        """
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.clean_workers = clean_workers
+        self.state_file = os.path.join(SCRIPT_DIR, state_file)
+        self.feed_state = self.load_state()
+        self.feed_urls = feed_urls or {
+            "Blockworks": "https://blockworks.co/feed/",
+            "Cointelegraph": "https://cointelegraph.com/rss",
+            "The Block": "https://www.theblock.co/rss", 
+            "CryptoSlate": "https://cryptoslate.com/feed/",
+            "TodayOnChain": "https://www.todayonchain.com/feed/",
+            "CoinDesk": "https://www.coindesk.com/arc/outboundfeeds/rss/",
+            "NewsBTC": "https://www.newsbtc.com/feed/",
+            "Bitcoin Magazine": "https://bitcoinmagazine.com/.rss/full/",
+            "The Defiant": "https://thedefiant.io/feed",
+            "BeInCrypto": "https://beincrypto.com/feed/",
+            "CryptoBriefing": "https://cryptobriefing.com/feed/",
+            "U.Today": "https://u.today/rss",
+            "CryptoGlobe": "https://www.cryptoglobe.com/latest/feed/",
+            "AMBCrypto": "https://ambcrypto.com/feed/",
+            "Cryptopolitan": "https://www.cryptopolitan.com/feed/",
+            "Chainbuzz": "https://chainbuzz.xyz/rss"
+        }
+
+    def load_state(self):
+        """ETag and Last-Modified per feed URL from the last run"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self):
+        """Persist the validators; call after the fetched articles have been stored"""
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.feed_state, f, indent=4)
+        os.replace(tmp_path, self.state_file)
+
+    @staticmethod
+    def clean_html(content):
+        return clean_html(content)
+
+    @staticmethod
+    def parse_date(date_string):
+        try:
+            parsed_date = feedparser._parse_date(date_string)
+            if parsed_date:
+                return int(time.mktime(parsed_date))
+        except:
+            pass
+
+        date_formats = [
+            "%a, %d %b %Y %H:%M:%S %z",
+            "%Y-%m-%dT%H:%M:%S%z",
+            "%Y-%m-%d %H:%M:%S",
+            "%a, %d %b %Y %H:%M:%S GMT",
+            "%Y-%m-%dT%H:%M:%SZ",
+        ]
+
+        for format in date_formats:
+            try:
+                return int(datetime.strptime(date_string, format).timestamp())
+            except ValueError:
+                continue
+
+        return int(time.time())
+
+    def fetch_rss_data_with_clean_text(self, rss_url):
+        return self.parse_feed_entries(feedparser.parse(rss_url), rss_url)
+
+    def parse_feed_entries(self, feed, rss_url):
+        return self.clean_entries(self.read_feed_entries(feed, rss_url))
+
+    def read_feed_entries(self, feed, rss_url):
+        """The feed's entries as articles whose title and content are not cleaned yet"""
+        new_data = []
+
+        for entry in feed.entries:
+            title = entry.title
+            content = entry.content[0].value if 'content' in entry else entry.get('description', "No content available")
+
+            published_date = entry.get('published', entry.get('updated', None))
+            if published_date:
+                timestamp = self.parse_date(published_date)
+            else:
+                timestamp = int(time.time())
+
+            article = {
+                "title": title,
+                "content": content,
+                "source": rss_url,
+                "timestamp": timestamp
+            }
+            # 订阅源提供的唯一标识（guid 或链接），用于去重
+            guid = entry.get('id') or entry.get('link')
+            if guid:
+                article["guid"] = guid
+            new_data.append(article)
+
+        return new_data
+
+    def clean_entries(self, entries):
+        """
+        Clean the title and content of entries from read_feed_entries() into the article's
+        "data", across clean_workers processes, and report the throughput.
+        """
+        if not entries:
+            return []
+        start_time = time.time()
+        texts = []
+        for entry in entries:
+            texts.append(entry.pop("title"))
+            texts.append(entry.pop("content"))
+        cleaned = clean_html_many(texts, processes=self.clean_workers)
+        articles = []
+        for index, entry in enumerate(entries):
+            article = {"data": f"{cleaned[2 * index]} - {cleaned[2 * index + 1]}"}
+            article.update(entry)
+            articles.append(article)
+        duration = max(time.time() - start_time, 1e-6)
+        print(f"Cleaned {len(articles)} articles in {duration:.2f}s ({len(articles) / duration:.0f} articles/s, "
+              f"{max(self.clean_workers, 1)} process{'es' if self.clean_workers > 1 else ''})")
+        return articles
+
+    def fetch_feed(self, client, source, rss_url):
+        """
+        Fetch one feed with a conditional GET.
+
+        :return: (source, status, entries, seconds, validators or None, error or None);
+                 entries come from read_feed_entries() and still need clean_entries();
+                 status 304 means the feed has not changed and nothing was parsed
+        """
+        start_time = time.time()
+        headers = {}
+        state = self.feed_state.get(rss_url, {})
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        try:
+            response = client.get(rss_url, headers=headers)
+            if response.status_code == 304:
+                return source, 304, [], time.time() - start_time, None, None
+            response.raise_for_status()
+            articles = self.read_feed_entries(feedparser.parse(response.content), rss_url)
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+            return source, response.status_code, articles, time.time() - start_time, validators, None
+        except Exception as e:
+            return source, None, [], time.time() - start_time, None, e
+
+    def fetch_all_feeds(self):
+        """
+        Fetch all feeds concurrently. Each request has its own timeout and the whole
+        fetch stops at the deadline; unchanged feeds answer 304 and are not parsed.
+        The HTML of all entries is cleaned once fetching is done, see clean_entries().
+        New validators are kept in memory until save_state() is called.
+        """
+        all_entries = []
+        start_time = time.time()
+        client = httpx.Client(timeout=self.timeout, follow_redirects=True,
+                              headers={'User-Agent': 'ai-agent-framework-rss/1.0'})
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        not_done = ()
+        try:
+            futures = {
+                executor.submit(self.fetch_feed, client, source, url): (source, url)
+                for source, url in self.feed_urls.items()
+            }
+            done, not_done = wait(futures, timeout=self.deadline)
+            for future, (source, url) in futures.items():
+                if future not in done:
+                    print(f"Skipped {source}: not done within the {self.deadline:g}s deadline")
+                    continue
+                source, status, articles, duration, validators, error = future.result()
+                if error is not None:
+                    print(f"Failed to fetch data from {source} after {duration:.2f}s: {error}")
+                elif status == 304:
+                    print(f"{source}: not modified ({duration:.2f}s)")
+                else:
+                    all_entries.extend(articles)
+                    self.feed_state[url] = validators
+                    print(f"Fetched {len(articles)} articles from {source} ({duration:.2f}s)")
+        finally:
+            # 超过截止时间的请求不再等待，由各自的超时结束；最后一个结束后再关闭客户端
+            executor.shutdown(wait=False, cancel_futures=True)
+            close_when_done(client, not_done)
+        print(f"Fetched {len(all_entries)} articles from {len(self.feed_urls)} feeds in {time.time() - start_time:.2f}s")
+        return self.clean_entries(all_entries)
+
+# Class to remember which articles have already been stored
+class SeenArticles:
+    """
+    Persistent seen-set of article keys: the feed's guid/link and the md5 of the
+    normalized content. Loaded into a dict once per run for O(1) lookups; each key
+    keeps the time it was last seen, keys not seen for retention_days are aged out
+    and at most max_keys of the most recently seen ones are kept.
+    """
+    DEFAULT_RETENTION_DAYS = 30
+    DEFAULT_MAX_KEYS = 200000
+
+    def __init__(self, seen_file='seen_articles.json', retention_days=DEFAULT_RETENTION_DAYS, max_keys=DEFAULT_MAX_KEYS):
+        """
+        :param seen_file: JSON file holding {key: last seen timestamp}, relative to this directory
+        :param retention_days: Days a key is remembered after it was last seen
+        :param max_keys: Maximum number of keys kept
+        """
+        self.seen_file = os.path.join(SCRIPT_DIR, seen_file)
+        self.retention = retention_days * 86400
+        self.max_keys = max_keys
+        self.keys = self.load()
+
+    def exists(self):
+        return os.path.exists(self.seen_file)
+
+    def load(self):
+        try:
+            with open(self.seen_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """Drop expired keys, keep the max_keys most recently seen and write the file"""
+        cutoff = time.time() - self.retention
+        keys = {key: seen for key, seen in self.keys.items() if seen >= cutoff}
+        if len(keys) > self.max_keys:
+            keys = dict(sorted(keys.items(), key=lambda item: item[1])[-self.max_keys:])
+        self.keys = keys
+        tmp_path = self.seen_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(keys, f)
+        os.replace(tmp_path, self.seen_file)
+
+    @staticmethod
+    def article_keys(article):
+        """The keys identifying an article: its guid/link if the feed has one, and its normalized content"""
+        normalized = ' '.join(article["data"].lower().split())
+        keys = ['content:' + hashlib.md5(normalized.encode('utf-8')).hexdigest()]
+        if article.get("guid"):
+            keys.append('guid:' + article["guid"])
+        return keys
+
+    def check_and_add(self, article, now=None):
+        """
+        Record the article as seen.
+
+        :return: True if any of its keys had been seen before (a duplicate)
+        """
+        now = now or time.time()
+        keys = self.article_keys(article)
+        duplicate = any(key in self.keys for key in keys)
+        # 重复文章也刷新时间，订阅源中仍在列出的文章不会过期后被重新加入
+        for key in keys:
+            self.keys[key] = now
+        return duplicate
+
+    def seed(self, articles):
+        """Mark existing articles (e.g. the archive on the first run) as seen"""
+        now = time.time()
+        for article in articles:
+            for key in self.article_keys(article):
+                self.keys[key] = now
+
+# Class to manage the knowledge base and update it
+class KnowledgeBaseUpdater:
+    def __init__(self, storage=None, rss_fetcher=None, seen_articles=None):
+        """
+        :param storage: 'sqlite' (knowledge_base.db) or 'jsonl' (knowledge_base.jsonl);
+                        defaults to the ARTICLE_STORAGE environment variable, then sqlite
+        """
+        # 首次运行时把已有的 knowledge_base.jsonl 或旧的 knowledge_base.json 导入所选格式
+        self.store = open_article_store(SCRIPT_DIR, storage)
+        self.tag_extractor = TagExtractor()
+        self.rss_fetcher = rss_fetcher or RSSFetcher()
+
+        self.seen_articles = seen_articles or SeenArticles()
+        if not self.seen_articles.exists() and self.store.exists():
+            # 第一次使用去重索引时，把存档中已有的文章标记为已见
+            self.seen_articles.seed(self.store)
+
+    def load_knowledge_base(self):
+        return list(self.store)
+
+    def save_knowledge_base(self, articles):
+        return self.store.append(articles)
+
+    def filter_new_articles(self, articles):
+        """Drop articles stored before (or repeated within this batch) and report duplicates per source"""
+        source_names = {url: source for source, url in self.rss_fetcher.feed_urls.items()}
+        counts = {}
+        new_articles = []
+        now = time.time()
+        for article in articles:
+            duplicate = self.seen_articles.check_and_add(article, now)
+            source_counts = counts.setdefault(source_names.get(article["source"], article["source"]), [0, 0])
+            source_counts[1 if duplicate else 0] += 1
+            if not duplicate:
+                new_articles.append(article)
+        for source, (new, duplicates) in counts.items():
+            print(f"{source}: {new} new, {duplicates} duplicates")
+        return new_articles
+
+    def update_database(self):
+        fetched_articles = self.rss_fetcher.fetch_all_feeds()
+        # 只有新文章进入标签提取和存储
+        new_articles = self.filter_new_articles(fetched_articles)
+        
+        tags_list = self.tag_extractor.extract_tags_many(article["data"] for article in new_articles)
+        for article, tags in zip(new_articles, tags_list):
+            article["tags"] = tags
+
+        # 新文章在一次写入（SQLite 中为一个事务）中追加，不再读取和重写整个存档
+        appended = self.save_knowledge_base(new_articles)
+        # 文章写入后再保存 ETag/Last-Modified 和去重索引，写入失败时下次仍会完整抓取
+        self.rss_fetcher.save_state()
+        self.seen_articles.save()
+        print(f"Database updated successfully with {appended} new articles, "
+              f"{len(fetched_articles) - appended} duplicates skipped ({self.store.size()} bytes).")
+
+# Function to trigger database update on one click
+def one_click_update(rss_fetcher=None, storage=None):
+    updater = KnowledgeBaseUpdater(storage=storage, rss_fetcher=rss_fetcher)
+    updater.update_database()
+
+def parse_day(value):
+    """Timestamp of a YYYY-MM-DD date (local midnight) given on the command line"""
+    return int(datetime.strptime(value, "%Y-%m-%d").timestamp())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the RSS feeds and store new articles in the knowledge base archive")
+    parser.add_argument('--feed-base-url', help="Fetch every feed as <URL>/<feed name>.xml, e.g. from recorded_feed_server.py")
+    parser.add_argument('--timeout', type=float, default=RSSFetcher.DEFAULT_TIMEOUT, help="Seconds per feed")
+    parser.add_argument('--deadline', type=float, default=RSSFetcher.DEFAULT_DEADLINE, help="Seconds for all feeds")
+    parser.add_argument('--workers', type=int, default=RSSFetcher.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--clean-workers', type=int, default=RSSFetcher.DEFAULT_CLEAN_WORKERS,
+                        help="Processes cleaning the fetched HTML, e.g. the number of CPUs; 0 cleans in this process")
+    parser.add_argument('--storage', choices=list(STORAGE_FILES),
+                        help="Archive format: sqlite (knowledge_base.db) or jsonl; defaults to ARTICLE_STORAGE or sqlite")
+    parser.add_argument('--export-json', metavar='PATH',
+                        help="Write the archive to PATH in the legacy knowledge_base.json format and exit")
+    parser.add_argument('--since', type=parse_day, help="With --export-json: first day to export, YYYY-MM-DD")
+    parser.add_argument('--until', type=parse_day, help="With --export-json: day to stop before, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    if args.export_json:
+        store = open_article_store(SCRIPT_DIR, args.storage)
+        if args.since is None and args.until is None:
+            # 完整导出按写入顺序，与原来的 knowledge_base.json 一致
+            export_json(store if store.exists() else [], args.export_json)
+        else:
+            # 按时间窗口查询，只读取需要导出的文章
+            export_json(store.query(args.since, args.until), args.export_json)
+        return
+
+    rss_fetcher = RSSFetcher(timeout=args.timeout, deadline=args.deadline, max_workers=args.workers,
+                             clean_workers=args.clean_workers)
+    if args.feed_base_url:
+        base_url = args.feed_base_url.rstrip('/')
+        rss_fetcher.feed_urls = {
+            source: f"{base_url}/{feed_slug(source)}.xml" for source in rss_fetcher.feed_urls
+        }
+    one_click_update(rss_fetcher, args.storage)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
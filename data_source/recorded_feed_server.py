@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import argparse
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 录制的订阅源默认保存在 data_source/recorded_feeds/<feed name>.xml
+DEFAULT_FEED_DIR = os.path.join(SCRIPT_DIR, 'recorded_feeds')
+
+
+class RecordedFeedHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /<feed name>.xml from the recorded feeds directory like a publisher
+    would: with an ETag (md5 of the file) and Last-Modified (file mtime), answering
+    304 Not Modified when the client sends matching validators. Feeds named in
+    server.slow_feeds are delayed by server.slow_delay seconds, to exercise timeouts.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        name = os.path.basename(self.path.split('?')[0])
+        path = os.path.join(server.feed_dir, name)
+        if not name.endswith('.xml') or not os.path.isfile(path):
+            self._send(404, b'Not found')
+            return
+
+        with server.stats_lock:
+            server.requests += 1
+        if name[:-len('.xml')] in server.slow_feeds:
+            time.sleep(server.slow_delay)
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        last_modified = formatdate(int(os.path.getmtime(path)), usegmt=True)
+        validators = {'ETag': etag, 'Last-Modified': last_modified}
+
+        # 与真实服务器一样优先比较 ETag，其次比较 Last-Modified
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if (if_none_match == etag) or (if_none_match is None and if_modified_since == last_modified):
+            with server.stats_lock:
+                server.not_modified += 1
+            self._send(304, headers=validators)
+            return
+        self._send(200, body, dict(validators, **{'Content-Type': 'application/rss+xml; charset=utf-8'}))
+
+
+def serve(feed_dir=DEFAULT_FEED_DIR, host='127.0.0.1', port=0, slow_feeds=(), slow_delay=0.0):
+    """
+    Start the recorded feed server on a background thread.
+
+    :param feed_dir: Directory with <feed name>.xml files
+    :param port: 0 picks a free port; read it back from server.server_address
+    :param slow_feeds: Feed names (without .xml) answered after slow_delay seconds
+    :param slow_delay: Delay for slow_feeds, in seconds
+    :return: The running ThreadingHTTPServer; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), RecordedFeedHandler)
+    server.daemon_threads = True
+    server.feed_dir = feed_dir
+    server.slow_feeds = set(slow_feeds)
+    server.slow_delay = slow_delay
+    server.stats_lock = threading.Lock()
+    server.requests = 0
+    server.not_modified = 0
+    threading.Thread(target=server.serve_forever, name="RecordedFeedServer", daemon=True).start()
+    return server
+
+
+def record_feeds(feed_dir=DEFAULT_FEED_DIR, timeout=10.0):
+    """Download the current content of every feed in RSSFetcher into feed_dir"""
+    import httpx
+    sys.path.insert(0, SCRIPT_DIR)
+    from main import RSSFetcher, feed_slug
+
+    os.makedirs(feed_dir, exist_ok=True)
+    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        for source, url in RSSFetcher().feed_urls.items():
+            try:
+                response = client.get(url)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Failed to record {source}: {e}")
+                continue
+            path = os.path.join(feed_dir, f"{feed_slug(source)}.xml")
+            with open(path, 'wb') as f:
+                f.write(response.content)
+            print(f"Recorded {source} ({len(response.content)} bytes) to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded RSS feeds locally with ETag/Last-Modified support")
+    parser.add_argument('--feed-dir', default=DEFAULT_FEED_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--record', action='store_true', help="Download the live feeds into --feed-dir and exit")
+    parser.add_argument('--slow', nargs='*', default=[], help="Feed names to delay, e.g. the_block")
+    parser.add_argument('--slow-delay', type=float, default=30.0, help="Seconds to delay --slow feeds")
+    args = parser.parse_args()
+
+    if args.record:
+        record_feeds(args.feed_dir)
+        return
+
+    server = serve(args.feed_dir, args.host, args.port, args.slow, args.slow_delay)
+    host, port = server.server_address[:2]
+    print(f"Serving {args.feed_dir} on http://{host}:{port}/ - run main.py --feed-base-url http://{host}:{port}. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"{server.requests} requests, {server.not_modified} not modified")
+
+
+if __name__ == "__main__":
+    main()
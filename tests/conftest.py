@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_SOURCE_DIR = os.path.join(PROJECT_ROOT, 'data_source')
+
+# 添加项目根目录到 Python 路径；data_source 下的脚本按顶层模块互相导入
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, DATA_SOURCE_DIR)
+
+
+@pytest.fixture(scope='session')
+def data_source_main():
+    """data_source/main.py, imported under its own name so it does not shadow other 'main' modules"""
+    spec = importlib.util.spec_from_file_location('data_source_main', os.path.join(DATA_SOURCE_DIR, 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
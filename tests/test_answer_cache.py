@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from ai_agent_framework.agents import answer_cache
+from ai_agent_framework.agents.agent_1001 import Agent1001
+from ai_agent_framework.agents.answer_cache import AnswerCache, question_symbols
+
+# 只差一个币种的问题，嵌入几乎相同
+BTC_QUESTION = "Should I buy BTC now?"
+ETH_QUESTION = "Should I buy ETH now?"
+QUESTION_VECTOR = np.array([1.0, 0.0, 0.0])
+PARAPHRASE_VECTOR = np.array([0.99, 0.1, 0.0])
+CONTEXT = ['a', 'b', 'c']
+
+
+def store(cache, question=BTC_QUESTION, context_ids=CONTEXT, answer="Buy the dip."):
+    cache.store(QUESTION_VECTOR, 'en', question_symbols(question), context_ids, answer)
+
+
+def lookup(cache, question=BTC_QUESTION, vector=PARAPHRASE_VECTOR, language='en', context_ids=CONTEXT):
+    return cache.lookup(vector, language, question_symbols(question), context_ids)
+
+
+def test_similar_question_about_the_same_coin_hits():
+    cache = AnswerCache(similarity_threshold=0.95)
+    store(cache)
+    entry = lookup(cache, "should i buy bitcoin now")
+    assert entry is not None and entry.answer == "Buy the dip."
+    # 上下文是缓存答案所用上下文的子集时仍然有效
+    assert lookup(cache, context_ids=['a', 'c']) is not None
+
+
+def test_dissimilar_question_or_other_language_misses():
+    cache = AnswerCache(similarity_threshold=0.95)
+    store(cache)
+    assert lookup(cache, vector=np.array([0.0, 1.0, 0.0])) is None
+    assert lookup(cache, language='zh') is None
+
+
+def test_question_about_another_coin_misses_even_with_the_same_embedding():
+    cache = AnswerCache(similarity_threshold=0.95)
+    store(cache)
+    assert lookup(cache, ETH_QUESTION, vector=QUESTION_VECTOR) is None
+    assert lookup(cache, "Should I buy BTC and ETH now?", vector=QUESTION_VECTOR) is None
+    assert lookup(cache, BTC_QUESTION, vector=QUESTION_VECTOR) is not None
+    assert cache.invalidated == 0
+
+
+def test_answer_expires_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, 'time', lambda: now[0])
+    cache = AnswerCache(ttl=600)
+    store(cache)
+    now[0] += 599
+    assert lookup(cache) is not None
+    now[0] += 2
+    assert lookup(cache) is None
+    assert cache.invalidated == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_new_article_in_the_context_invalidates_the_answer():
+    cache = AnswerCache()
+    store(cache)
+    assert lookup(cache, context_ids=['a', 'b', 'new']) is None
+    assert cache.invalidated == 1
+    # 条目已删除，之后旧上下文也不再命中
+    assert lookup(cache) is None
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = AnswerCache(max_entries=2)
+    for coin in ("BTC", "ETH", "SOL"):
+        store(cache, f"Should I buy {coin} now?", answer=coin)
+    assert lookup(cache, "Should I buy BTC now?") is None
+    assert lookup(cache, "Should I buy SOL now?").answer == "SOL"
+
+
+@pytest.mark.parametrize('question, symbols', [
+    ("What do you think about bitcoin?", {'BTC'}),
+    ("Thoughts on $eth and Ether?", {'ETH'}),
+    ("BTC vs ETH funding rates", {'BTC', 'ETH'}),
+    ("What happened to BTC in 2021?", {'BTC', '2021'}),
+    ("Is the ETF good for LINK?", {'ETF', 'LINK'}),
+    ("Send me a link to the docs", set()),
+    ("你觉得以太坊现在的价格怎么样？", {'ETH'}),
+    ("Что вы думаете о биткоине сейчас?", {'BTC'}),
+    ("What is the fear and greed index?", set()),
+])
+def test_question_symbols(question, symbols):
+    assert question_symbols(question) == symbols
+
+
+def test_shared_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(answer_cache, '_shared_cache', None)
+    monkeypatch.delenv('ANSWER_CACHE', raising=False)
+    assert answer_cache.get_answer_cache() is None
+    monkeypatch.setenv('ANSWER_CACHE', '0')
+    assert answer_cache.get_answer_cache() is None
+
+    monkeypatch.setenv('ANSWER_CACHE', '1')
+    monkeypatch.setenv('ANSWER_CACHE_THRESHOLD', '0.97')
+    cache = answer_cache.get_answer_cache()
+    assert cache is answer_cache.get_answer_cache()
+    assert cache.similarity_threshold == 0.97
+
+
+def test_follow_up_questions_do_not_use_the_cache():
+    cache = AnswerCache()
+    first = Agent1001(None, 'test-key', embedder=object(), answer_cache=cache, context_assembler=object(),
+                      language_detector=object())
+    follow_up = Agent1001(None, 'test-key', embedder=object(), answer_cache=cache, context_assembler=object(),
+                          language_detector=object(), conversation_history=[("What is BTC?", "A coin.")])
+    assert first._uses_answer_cache()
+    assert not follow_up._uses_answer_cache()
+    assert list(follow_up.conversation_history) == [("What is BTC?", "A coin.")]
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from ai_agent_framework.knowledge.article_store import ArticleStore, SQLiteArticleStore, export_json
+
+DAY = 86400
+
+# 写入顺序与时间顺序不同，用来区分按 id 和按时间排序
+ARTICLES = [
+    {"data": "ETF inflows rise", "source": "coindesk", "timestamp": 3 * DAY, "guid": "a", "tags": ["ETF", "Bitcoin"]},
+    {"data": "Ether upgrade ships", "source": "theblock", "timestamp": 1 * DAY, "tags": ["Ethereum"]},
+    {"data": "Line\u2028separator and\nnewline", "source": "coindesk", "timestamp": 2 * DAY, "guid": "c",
+     "tags": []},
+    {"data": "Bitcoin miners sell", "source": "theblock", "timestamp": 4 * DAY, "guid": "d", "tags": ["Bitcoin"]},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteArticleStore(str(tmp_path / 'knowledge_base.db'))
+    yield store
+    store.close()
+
+
+def test_append_stores_articles_in_one_transaction(store):
+    assert not store.exists()
+    assert store.append([]) == 0
+    assert store.append(ARTICLES[:2]) == 2
+    assert store.append(ARTICLES[2:]) == 2
+    assert store.exists()
+    assert store.count() == 4
+    assert store.size() > 0
+    assert list(store) == ARTICLES
+
+
+def test_append_rolls_back_a_failed_batch(store):
+    store.append(ARTICLES[:1])
+    with pytest.raises(KeyError):
+        store.append([ARTICLES[1], {"source": "no data"}])
+    assert list(store) == ARTICLES[:1]
+
+
+def test_iter_from_resumes_after_a_checkpoint(store):
+    store.append(ARTICLES[:2])
+    rows = list(store.iter_from(0))
+    assert [article for _, article in rows] == ARTICLES[:2]
+    checkpoint = rows[-1][0]
+
+    store.append(ARTICLES[2:])
+    assert [article for _, article in store.iter_from(checkpoint)] == ARTICLES[2:]
+    assert list(store.iter_from(checkpoint + 2)) == []
+    # 超出末尾的 checkpoint 来自被重建的数据库，从头读取
+    assert [article for _, article in store.iter_from(checkpoint + 100)] == ARTICLES
+
+
+def test_iter_from_on_a_missing_store_is_empty(store):
+    assert list(store.iter_from(0)) == []
+    assert list(store.query()) == []
+    assert not store.exists()
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({}, [1, 2, 0, 3]),
+    ({'start': 2 * DAY}, [2, 0, 3]),
+    ({'end': 3 * DAY}, [1, 2]),
+    ({'start': 2 * DAY, 'end': 4 * DAY}, [2, 0]),
+    ({'source': 'theblock'}, [1, 3]),
+    ({'tag': 'Bitcoin'}, [0, 3]),
+    ({'tag': 'Bitcoin', 'source': 'coindesk'}, [0]),
+    ({'tag': 'Bitcoin', 'start': 4 * DAY}, [3]),
+    ({'tag': 'Solana'}, []),
+])
+def test_query_filters_match_the_jsonl_store(tmp_path, store, filters, expected):
+    store.append(ARTICLES)
+    jsonl_store = ArticleStore(str(tmp_path / 'knowledge_base.jsonl'))
+    jsonl_store.append(ARTICLES)
+
+    assert list(store.query(**filters)) == [ARTICLES[i] for i in expected]
+    # JSONL 存档按写入顺序返回，结果集合相同
+    assert sorted(json.dumps(a) for a in jsonl_store.query(**filters)) == \
+        sorted(json.dumps(ARTICLES[i]) for i in expected)
+
+
+def test_export_json_writes_the_archive_in_id_order(tmp_path, store):
+    store.append(ARTICLES)
+    path = str(tmp_path / 'knowledge_base.json')
+
+    assert export_json(store, path) == 4
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    # 与 json.dump(articles, f, indent=4) 逐字节一致，U+2028 留在字符串内不缩进
+    assert text == json.dumps(ARTICLES, indent=4, ensure_ascii=False)
+    assert 'Line\u2028separator and\\nnewline' in text
+    assert [article['guid'] if 'guid' in article else None for article in json.loads(text)] == ['a', None, 'c', 'd']
+
+
+def test_export_json_of_a_query_and_of_nothing(tmp_path, store):
+    store.append(ARTICLES)
+    path = str(tmp_path / 'window.json')
+
+    assert export_json(store.query(start=2 * DAY, end=4 * DAY), path) == 2
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == [ARTICLES[2], ARTICLES[0]]
+
+    assert export_json([], path) == 0
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == '[]'
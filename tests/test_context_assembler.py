@@ -0,0 +1,27 @@
+from ai_agent_framework.agents.context_assembler import ContextAssembler
+
+
+class WordCounter:
+    """Counts whitespace-separated words, so the tests do not need a tokenizer model"""
+
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max(max_tokens, 0)])
+
+
+def test_history_comes_before_the_current_question():
+    assembler = ContextAssembler(token_budget=1000, counter=WordCounter())
+    results = [{'content': "Bitcoin rose 5% on Monday.", 'timestamp': '2024-01-01 00:00:00',
+                'tags': ['bitcoin'], 'similarity': 0.9}]
+    history = [("What is Bitcoin?", "A cryptocurrency."), ("What is Ether?", "Ethereum's currency.")]
+
+    messages, report = assembler.assemble("You are helpful.", "Why did Bitcoin rise?", results, "English", history)
+
+    assert [message['role'] for message in messages] == ['system', 'user', 'assistant', 'user', 'assistant', 'user']
+    assert messages[1]['content'] == "What is Bitcoin?"
+    assert messages[-1]['role'] == 'user'
+    assert "Question: Why did Bitcoin rise?" in messages[-1]['content']
+    assert "Bitcoin rose 5% on Monday." in messages[-1]['content']
+    assert report['history_turns'] == 2
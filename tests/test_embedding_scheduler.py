@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+import httpx
+import openai
+
+from ai_agent_framework.knowledge.embedding_scheduler import EmbeddingScheduler
+
+
+def api_error(error_class, status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers, request=httpx.Request('POST', 'http://test/embeddings'))
+    return error_class(f"status {status_code}", response=response, body=None)
+
+
+def fake_vector(text):
+    return [float(len(text)), float(sum(map(ord, text)) % 997)]
+
+
+def test_rate_limit_is_retried_after_the_requested_delay():
+    calls = []
+
+    def embed(texts):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise api_error(openai.RateLimitError, 429, {'retry-after-ms': '100'})
+        return [fake_vector(text) for text in texts]
+
+    scheduler = EmbeddingScheduler(embed, max_workers=1, initial_backoff=0.01)
+    vectors = scheduler.embed_all(["a", "b", "c"])
+
+    assert vectors == [fake_vector(text) for text in ["a", "b", "c"]]
+    assert scheduler.retries == 1
+    assert scheduler.requests == 2
+    assert calls[1] - calls[0] >= 0.1
+
+
+def test_rate_limit_without_retry_after_backs_off_exponentially():
+    calls = []
+
+    def embed(texts):
+        calls.append(time.monotonic())
+        if len(calls) <= 2:
+            raise api_error(openai.RateLimitError, 429)
+        return [fake_vector(text) for text in texts]
+
+    scheduler = EmbeddingScheduler(embed, max_workers=1, initial_backoff=0.05)
+    scheduler.embed_all(["a"])
+
+    assert scheduler.retries == 2
+    # 抖动后的延迟在 [0.5, 1] 倍之间：第一次至少 0.025 秒，第二次至少 0.05 秒
+    assert calls[1] - calls[0] >= 0.025
+    assert calls[2] - calls[1] >= 0.05
+
+
+def test_bad_input_is_isolated_by_bisection():
+    def embed(texts):
+        if "BAD" in texts:
+            raise api_error(openai.BadRequestError, 400)
+        return [fake_vector(text) for text in texts]
+
+    texts = [f"text {i}" for i in range(8)]
+    texts[5] = "BAD"
+    scheduler = EmbeddingScheduler(embed, max_batch_items=8, max_workers=1)
+    batches = list(scheduler.iter_batches(texts))
+
+    assert len(batches) == 1
+    batch = batches[0]
+    assert isinstance(batch.error, openai.BadRequestError)
+    assert [i for i, vector in enumerate(batch.vectors) if vector is None] == [5]
+    assert [vector for vector in batch.vectors if vector is not None] == \
+        [fake_vector(text) for text in texts if text != "BAD"]
+    assert scheduler.failed_texts == 1
+    assert scheduler.retries == 0
+
+
+def test_request_wide_errors_fail_the_batch_without_bisecting():
+    requests = []
+
+    def embed(texts):
+        requests.append(len(texts))
+        raise api_error(openai.AuthenticationError, 401)
+
+    scheduler = EmbeddingScheduler(embed, max_batch_items=8, max_workers=1)
+    batches = list(scheduler.iter_batches([f"text {i}" for i in range(8)]))
+
+    assert [(batch.start, batch.end, batch.vectors) for batch in batches] == [(0, 8, None)]
+    assert isinstance(batches[0].error, openai.AuthenticationError)
+    assert requests == [8]
+
+
+def test_results_keep_input_order_with_concurrent_requests():
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def embed(texts):
+        with lock:
+            delay = rng.uniform(0, 0.02)
+        # 后发出的请求可能先完成
+        time.sleep(delay)
+        return [fake_vector(text) for text in texts]
+
+    texts = [f"article {i} " * (i % 7 + 1) for i in range(200)]
+    scheduler = EmbeddingScheduler(embed, max_batch_items=7, max_workers=4)
+    batches = list(scheduler.iter_batches(texts))
+
+    assert [batch.start for batch in batches] == sorted(batch.start for batch in batches)
+    assert batches[-1].end == len(texts)
+    assert [vector for batch in batches for vector in batch.vectors] == [fake_vector(text) for text in texts]
+
+
+def test_long_inputs_are_truncated_to_the_token_limit():
+    seen = []
+
+    def embed(texts):
+        seen.extend(texts)
+        return [fake_vector(text) for text in texts]
+
+    scheduler = EmbeddingScheduler(embed, max_input_tokens=10, count_tokens=len)
+    scheduler.embed_all(["short", "x" * 50])
+
+    assert seen == ["short", "x" * 10]
+    assert scheduler.truncated == 1
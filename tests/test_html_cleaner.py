@@ -0,0 +1,22 @@
+import json
+import os
+
+import pytest
+
+import html_cleaner
+from html_cleaner import clean_html, clean_html_many
+
+GOLDEN_FILE = os.path.join(os.path.dirname(html_cleaner.__file__), 'clean_html_golden.json')
+
+with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+    GOLDEN_CASES = json.load(f)
+
+
+@pytest.mark.parametrize('case', GOLDEN_CASES, ids=[case['html'][:40] for case in GOLDEN_CASES])
+def test_golden_case(case):
+    assert clean_html(case['html']) == case['text']
+
+
+def test_process_pool_gives_the_same_texts():
+    contents = [case['html'] for case in GOLDEN_CASES]
+    assert clean_html_many(contents, processes=2) == [case['text'] for case in GOLDEN_CASES]
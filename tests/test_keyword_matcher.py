@@ -0,0 +1,66 @@
+import json
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatcher
+
+
+@pytest.fixture
+def tag_file(tmp_path):
+    path = tmp_path / 'tags.json'
+    path.write_text(json.dumps({
+        "tags": ["NFT", "stablecoin", "crypto", "cryptocurrency", "DAO", "defi", "defi protocols", "Ethereum"],
+        "aliases": {"Ethereum": ["eth", "ether"]}
+    }))
+    return str(path)
+
+
+def test_tag_extractor_matches_substrings_by_default(data_source_main, tag_file):
+    extractor = data_source_main.TagExtractor(tag_file)
+    tags = extractor.extract_tags("NFTs and stablecoins lead cryptocurrency news as DAOs vote")
+    assert set(tags) == {"NFT", "stablecoin", "crypto", "cryptocurrency", "DAO"}
+
+
+def test_tag_extractor_resolves_aliases(data_source_main, tag_file):
+    extractor = data_source_main.TagExtractor(tag_file, word_boundary=True)
+    assert extractor.extract_tags("ETH and Ether both rallied") == ["Ethereum"]
+    assert extractor.extract_tags("Nothing to see here") == []
+
+
+def test_word_boundary_skips_keywords_inside_words():
+    matcher = KeywordMatcher(["eth", "nft"], word_boundary=True)
+    assert matcher.match("A new method for together ethics") == []
+    assert matcher.match("NFTs are back") == []
+    assert matcher.match("ETH, then (eth) and eth-based NFT.") == ["eth", "nft"]
+
+
+def test_substring_matching_finds_keywords_inside_words():
+    matcher = KeywordMatcher(["eth"], word_boundary=False)
+    assert matcher.match("A new method") == ["eth"]
+
+
+def test_overlapping_keywords_are_all_reported():
+    matcher = KeywordMatcher(["he", "she", "hers", "his"], word_boundary=False)
+    assert sorted((start, end) for start, end, _ in matcher.iter_matches("ushers")) == [(1, 4), (2, 4), (2, 6)]
+    assert matcher.match("ushers") == ["she", "he", "hers"]
+
+    nested = KeywordMatcher(["defi", "defi protocols", "crypto", "cryptocurrency"], word_boundary=True)
+    assert set(nested.match("DeFi protocols accept cryptocurrency")) == {"defi", "defi protocols", "cryptocurrency"}
+
+
+def test_keyword_values_and_case_insensitivity():
+    matcher = KeywordMatcher([("btc", "Bitcoin"), ("bitcoin", "Bitcoin")])
+    assert matcher.match("BTC is bitcoin") == ["Bitcoin"]
+
+
+def test_substring_default_agrees_with_a_per_keyword_scan():
+    rng = random.Random(0)
+    alphabet = "abcdeth n"
+    keywords = sorted({''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))).strip() or 'a'
+                       for _ in range(60)})
+    matcher = KeywordMatcher(keywords, word_boundary=False)
+    for _ in range(500):
+        text = ''.join(rng.choice(alphabet + "ETH") for _ in range(rng.randint(0, 40)))
+        expected = {keyword for keyword in keywords if keyword in text.lower()}
+        assert set(matcher.match(text)) == expected
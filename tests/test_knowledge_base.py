@@ -0,0 +1,121 @@
+import numpy as np
+
+from ai_agent_framework.knowledge.knowledge_base import VectorDB
+
+VECTOR_DIM = 8
+
+
+def make_records(vectors, tags=None):
+    return [
+        {
+            'source': 'test',
+            'content': f'c{i}',
+            'vector': vector,
+            'tags': tags[i] if tags else [],
+            'timestamp': '2024-01-01 00:00:00'
+        }
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def test_hnsw_upsert_is_not_found_by_its_old_vector(tmp_path):
+    vectors = np.random.default_rng(0).random((10, VECTOR_DIM), dtype=np.float32)
+    db = VectorDB(str(tmp_path / 'knowledge.db'), index_type='hnsw', vector_dim=VECTOR_DIM)
+    db.insert_many(make_records(vectors))
+
+    # 同一内容再次写入时替换向量；HNSW 无法删除旧向量，它仍以同一 rowid 留在图中
+    moved = db.insert_many([{
+        'source': 'test',
+        'content': 'c5',
+        'vector': vectors[5] + 100,
+        'tags': [],
+        'timestamp': '2024-01-01 00:00:00'
+    }])
+    assert db.stale_vectors == 1
+
+    results = db.search(vectors[5], limit=3)
+    assert [result['content'] for result in results if result['content'] == 'c5'] == []
+    assert len(results) == 3
+    assert db.search(vectors[5] + 100, limit=1)[0]['id'] == moved[0]
+    db.close()
+
+
+def test_tag_filter_with_row_count_not_a_multiple_of_8(tmp_path):
+    vectors = np.random.default_rng(1).random((13, VECTOR_DIM), dtype=np.float32)
+    tags = [['last'] if i >= 9 else ['first'] for i in range(13)]
+    db = VectorDB(str(tmp_path / 'knowledge.db'), vector_dim=VECTOR_DIM)
+    db.insert_many(make_records(vectors, tags))
+    assert db.alive.size % 8 != 0
+
+    # rowid 13 落在位图最后一个不完整的字节中
+    results = db.search(vectors[12], limit=5, tags=['last'])
+    assert [result['content'] for result in results][0] == 'c12'
+    assert sorted(result['content'] for result in results) == ['c10', 'c11', 'c12', 'c9']
+    assert db.search(vectors[12], limit=1, tags=['first'])[0]['content'] != 'c12'
+    db.close()
+
+
+def test_saved_snapshot_prunes_tombstones(tmp_path):
+    db_path = str(tmp_path / 'knowledge.db')
+    vectors = np.random.default_rng(2).random((10, VECTOR_DIM), dtype=np.float32)
+    db = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    ids = db.insert_many(make_records(vectors))
+    db.delete(ids[:3])
+    db.close()
+
+    reopened = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    with reopened._connection() as conn:
+        assert conn.execute(f"SELECT COUNT(*) FROM {VectorDB.TOMBSTONE_TABLE_NAME}").fetchone()[0] == 0
+    assert reopened.index.ntotal == 7
+    assert {result['id'] for result in reopened.search(vectors[0], limit=10)} == set(ids[3:])
+    reopened.close()
+
+
+def assert_sorted_postings(db, expected):
+    assert set(db.tag_postings) == set(expected)
+    for tag, rowids in expected.items():
+        postings = db.tag_postings[tag]
+        assert postings.dtype == np.int64
+        assert postings.tolist() == sorted(rowids)
+
+
+def test_tag_postings_are_sorted_arrays_through_upserts_and_deletes(tmp_path):
+    db_path = str(tmp_path / 'knowledge.db')
+    vectors = np.random.default_rng(4).random((6, VECTOR_DIM), dtype=np.float32)
+    tags = [['btc'], ['eth'], ['btc', 'eth'], ['btc'], ['sol'], []]
+    db = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    ids = db.insert_many(make_records(vectors, tags))
+    assert_sorted_postings(db, {'btc': [1, 3, 4], 'eth': [2, 3], 'sol': [5]})
+
+    # 同一内容换标签写入时，旧标签的倒排表删除该 rowid
+    db.insert_many([dict(make_records(vectors[:1])[0], tags=['eth'])])
+    db.delete([ids[4]])
+    assert_sorted_postings(db, {'btc': [3, 4], 'eth': [1, 2, 3]})
+    assert db._tags_of([3, 1, 6]) == [['btc', 'eth'], ['eth'], []]
+
+    results = db.search(vectors[0], limit=10, tags=['btc', 'sol'])
+    assert sorted(result['content'] for result in results) == ['c2', 'c3']
+    assert db.search(vectors[0], limit=10, tags=['unknown']) == []
+    db.close()
+
+    reopened = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    assert_sorted_postings(reopened, {'btc': [3, 4], 'eth': [1, 2, 3]})
+    assert sorted(result['content'] for result in reopened.search(vectors[0], limit=10, tags=['eth'])) == \
+        ['c0', 'c1', 'c2']
+    reopened.close()
+
+
+def test_unsorted_postings_from_an_older_snapshot_are_sorted_on_load(tmp_path):
+    db_path = str(tmp_path / 'knowledge.db')
+    vectors = np.random.default_rng(5).random((5, VECTOR_DIM), dtype=np.float32)
+    db = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    db.insert_many(make_records(vectors, [['btc']] * 5))
+    # 旧版本按集合的迭代顺序写出倒排表
+    db.tag_postings['btc'] = db.tag_postings['btc'][::-1].copy()
+    db.save_index()
+    db.close()
+
+    reopened = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    assert_sorted_postings(reopened, {'btc': [1, 2, 3, 4, 5]})
+    assert reopened._tags_of([2]) == [['btc']]
+    reopened.close()
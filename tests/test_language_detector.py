@@ -0,0 +1,19 @@
+import pytest
+
+from ai_agent_framework.agents.language_detector import LanguageDetector
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return LanguageDetector()
+
+
+@pytest.mark.parametrize('text', ["ok", "BTC?"])
+def test_short_text_keeps_the_session_language(detector, text):
+    assert detector.detect_with_confidence(text)[1] is False
+    assert detector.detect(text, session_language='fr') == 'fr'
+    assert detector.detect(text, session_language='zh-cn') == 'zh-cn'
+
+
+def test_longer_text_overrides_the_session_language(detector):
+    assert detector.detect("Quel est le prix du bitcoin aujourd'hui ?", session_language='en') == 'fr'
@@ -0,0 +1,122 @@
+import os
+import time
+
+import httpx
+import pytest
+
+import recorded_feed_server
+
+FEED_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'feeds')
+
+
+@pytest.fixture
+def feed_server():
+    server = recorded_feed_server.serve(FEED_DIR, slow_feeds=['slow_news'], slow_delay=1.5)
+    host, port = server.server_address[:2]
+    server.base_url = f"http://{host}:{port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_fetcher(data_source_main, feed_server, tmp_path):
+    def make_fetcher(feeds=('chain_daily',), **kwargs):
+        feed_urls = {name: f"{feed_server.base_url}/{name}.xml" for name in feeds}
+        return data_source_main.RSSFetcher(feed_urls, state_file=str(tmp_path / 'feed_state.json'), **kwargs)
+    return make_fetcher
+
+
+def test_second_fetch_is_not_modified(make_fetcher, feed_server):
+    fetcher = make_fetcher()
+    url = fetcher.feed_urls['chain_daily']
+    with httpx.Client() as client:
+        source, status, entries, _, validators, error = fetcher.fetch_feed(client, 'chain_daily', url)
+        assert (source, status, error) == ('chain_daily', 200, None)
+        assert [entry['title'] for entry in entries] == [
+            "Bitcoin ETF inflows hit a record", "Ethereum developers set the Pectra date"
+        ]
+        assert entries[0]['guid'] == "https://chaindaily.example/btc-etf-inflows"
+        assert validators['etag'] and validators['last_modified']
+
+        fetcher.feed_state[url] = validators
+        _, status, entries, _, validators, error = fetcher.fetch_feed(client, 'chain_daily', url)
+        assert (status, entries, validators, error) == (304, [], None, None)
+    assert feed_server.not_modified == 1
+
+
+def test_fetch_all_feeds_parses_then_skips_unchanged_feeds(make_fetcher, feed_server):
+    fetcher = make_fetcher()
+    articles = fetcher.fetch_all_feeds()
+    assert [article['data'] for article in articles] == [
+        "Bitcoin ETF inflows hit a record - Spot Bitcoin ETFs took in $1.2B on Monday.",
+        "Ethereum developers set the Pectra date - The upgrade ships in March.",
+    ]
+    assert all(article['source'] == fetcher.feed_urls['chain_daily'] for article in articles)
+
+    assert fetcher.fetch_all_feeds() == []
+    assert (feed_server.requests, feed_server.not_modified) == (2, 1)
+
+
+def test_slow_feed_is_skipped_at_the_deadline(make_fetcher, monkeypatch, data_source_main):
+    clients = []
+
+    class RecordingClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(data_source_main.httpx, 'Client', RecordingClient)
+    fetcher = make_fetcher(('chain_daily', 'slow_news'), timeout=5.0, deadline=0.5)
+
+    start = time.time()
+    articles = fetcher.fetch_all_feeds()
+    assert time.time() - start < 1.5
+    assert {article['source'] for article in articles} == {fetcher.feed_urls['chain_daily']}
+    assert fetcher.feed_urls['slow_news'] not in fetcher.feed_state
+
+    # 超时的请求仍在使用客户端，它结束后客户端才关闭
+    (client,) = clients
+    assert not client.is_closed
+    for _ in range(50):
+        if client.is_closed:
+            break
+        time.sleep(0.1)
+    assert client.is_closed
+
+
+def test_client_is_closed_when_every_feed_is_done(make_fetcher, monkeypatch, data_source_main):
+    clients = []
+
+    class RecordingClient(httpx.Client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(data_source_main.httpx, 'Client', RecordingClient)
+    make_fetcher().fetch_all_feeds()
+    assert clients[0].is_closed
+
+
+def test_feed_state_round_trips_through_save_and_load(make_fetcher, feed_server):
+    fetcher = make_fetcher()
+    assert fetcher.feed_state == {}
+    fetcher.fetch_all_feeds()
+    fetcher.save_state()
+
+    reloaded = make_fetcher()
+    assert reloaded.feed_state == fetcher.feed_state
+    assert set(reloaded.feed_state[reloaded.feed_urls['chain_daily']]) == {'etag', 'last_modified'}
+    assert not os.path.exists(reloaded.state_file + '.tmp')
+    # 新进程用保存的 ETag 发起条件请求
+    assert reloaded.fetch_all_feeds() == []
+    assert feed_server.not_modified == 1
+
+
+def test_last_modified_alone_is_enough_for_a_304(make_fetcher, feed_server):
+    fetcher = make_fetcher()
+    fetcher.fetch_all_feeds()
+    url = fetcher.feed_urls['chain_daily']
+    fetcher.feed_state[url] = {'etag': None, 'last_modified': fetcher.feed_state[url]['last_modified']}
+    assert fetcher.fetch_all_feeds() == []
+    assert feed_server.not_modified == 1
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import pytest
+
+
+def article(data, guid=None):
+    article = {"data": data, "source": "https://example.com/feed", "timestamp": 0}
+    if guid:
+        article["guid"] = guid
+    return article
+
+
+@pytest.fixture
+def seen_file(tmp_path):
+    return str(tmp_path / 'seen_articles.json')
+
+
+def test_duplicates_are_detected_across_runs(data_source_main, seen_file):
+    first_run = data_source_main.SeenArticles(seen_file)
+    assert not first_run.exists()
+    assert first_run.check_and_add(article("Bitcoin tops $100k - Markets rally", "guid-1")) is False
+    # 同一批次中重复出现的文章
+    assert first_run.check_and_add(article("Bitcoin tops $100k - Markets rally", "guid-1")) is True
+    first_run.save()
+
+    second_run = data_source_main.SeenArticles(seen_file)
+    assert second_run.exists()
+    # 同一 guid，内容被编辑过
+    assert second_run.check_and_add(article("Bitcoin tops $100k - Markets rally (updated)", "guid-1")) is True
+    # 不同 guid，内容只有大小写和空白不同
+    assert second_run.check_and_add(article("bitcoin tops  $100K -\nmarkets rally", "guid-2")) is True
+    assert second_run.check_and_add(article("Ether upgrade ships", "guid-3")) is False
+
+
+def test_keys_not_seen_within_the_retention_are_aged_out(data_source_main, seen_file):
+    seen = data_source_main.SeenArticles(seen_file, retention_days=30)
+    now = time.time()
+    seen.check_and_add(article("Old story", "old"), now=now - 31 * 86400)
+    seen.check_and_add(article("Recent story", "recent"), now=now - 29 * 86400)
+    seen.save()
+
+    reloaded = data_source_main.SeenArticles(seen_file, retention_days=30)
+    assert 'guid:old' not in reloaded.keys
+    assert 'guid:recent' in reloaded.keys
+    assert reloaded.check_and_add(article("Old story", "old")) is False
+    assert reloaded.check_and_add(article("Recent story", "recent")) is True
+
+
+def test_seeing_a_duplicate_again_refreshes_its_keys(data_source_main, seen_file):
+    seen = data_source_main.SeenArticles(seen_file, retention_days=30)
+    now = time.time()
+    seen.check_and_add(article("Still in the feed", "listed"), now=now - 29 * 86400)
+    assert seen.check_and_add(article("Still in the feed", "listed"), now=now) is True
+    assert set(seen.keys.values()) == {now}
+
+
+def test_only_the_most_recently_seen_keys_are_kept(data_source_main, seen_file):
+    seen = data_source_main.SeenArticles(seen_file, max_keys=4)
+    now = time.time()
+    for i in range(4):
+        seen.check_and_add(article(f"Story {i}", f"guid-{i}"), now=now - 100 + i)
+    seen.save()
+
+    # 每篇文章两个键 (content 和 guid)，只保留最近的两篇
+    reloaded = data_source_main.SeenArticles(seen_file, max_keys=4)
+    assert sorted(key for key in reloaded.keys if key.startswith('guid:')) == ['guid:guid-2', 'guid:guid-3']
+    assert len(reloaded.keys) == 4
+
+
+def test_save_and_load_round_trip(data_source_main, seen_file):
+    seen = data_source_main.SeenArticles(seen_file)
+    now = time.time()
+    seen.seed([article("Seeded from the archive")])
+    seen.check_and_add(article("Fetched today", "https://example.com/a"), now=now)
+    seen.save()
+
+    with open(seen_file, encoding='utf-8') as f:
+        assert json.load(f) == seen.keys
+    assert not os.path.exists(seen_file + '.tmp')
+    reloaded = data_source_main.SeenArticles(seen_file)
+    assert reloaded.keys == seen.keys
+    assert set(reloaded.keys) == set(
+        data_source_main.SeenArticles.article_keys(article("Seeded from the archive")) +
+        data_source_main.SeenArticles.article_keys(article("Fetched today", "https://example.com/a"))
+    )
+
+
+def test_unreadable_file_starts_empty(data_source_main, seen_file):
+    with open(seen_file, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    assert data_source_main.SeenArticles(seen_file).keys == {}
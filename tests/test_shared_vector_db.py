@@ -0,0 +1,155 @@
+import logging
+
+import faiss
+import numpy as np
+import pytest
+
+from ai_agent_framework.knowledge.index_factory import copy_index
+from ai_agent_framework.knowledge.knowledge_base import VectorDB
+from ai_agent_framework.knowledge.shared_vector_db import SharedVectorDB
+
+VECTOR_DIM = 8
+# 小的 IVF 参数，几十个向量即可训练
+IVF_PARAMS = {'nlist': 2, 'nprobe': 2, 'min_train_points_per_list': 10}
+
+
+def make_records(vectors, prefix, tags=None):
+    return [
+        {
+            'source': 'test',
+            'content': f'{prefix}{i}',
+            'vector': vector,
+            'tags': tags or [],
+            'timestamp': '2024-01-01 00:00:00'
+        }
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def contents(db, vector, limit=100, **filters):
+    return sorted(result['content'] for result in db.search(vector, limit=limit, **filters))
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(3).random((60, VECTOR_DIM), dtype=np.float32)
+
+
+def open_shared(db_path, **kwargs):
+    return SharedVectorDB(db_path, refresh_interval=0, vector_dim=VECTOR_DIM, **kwargs)
+
+
+@pytest.mark.parametrize('index_type, index_params', [('flat', None), ('hnsw', None), ('ivf_flat', IVF_PARAMS)])
+def test_refresh_applies_only_the_new_changes(tmp_path, monkeypatch, vectors, index_type, index_params):
+    db_path = str(tmp_path / 'knowledge.db')
+    writer = VectorDB(db_path, index_type=index_type, index_params=index_params, vector_dim=VECTOR_DIM)
+    ids = writer.insert_many(make_records(vectors[:40], 'a', ['old']))
+    writer.save_index()
+
+    # 读取方打开与数据库同一代的快照，索引是内存映射的
+    shared = open_shared(db_path, index_type=index_type, index_params=index_params)
+    old_db = shared.db
+    assert old_db._index_mmapped
+
+    writer.insert_many(make_records(vectors[40:], 'b', ['new']))
+    writer.delete(ids[:5])
+
+    def reload():
+        raise AssertionError("refresh reloaded the snapshot instead of catching up")
+    monkeypatch.setattr(shared, '_open', reload)
+    assert shared.refresh()
+    fresh = shared.db
+    assert fresh is not old_db and fresh.generation == writer.generation
+
+    expected = sorted([f'a{i}' for i in range(5, 40)] + [f'b{i}' for i in range(20)])
+    assert contents(fresh, vectors[0]) == expected
+    assert contents(fresh, vectors[0], tags=['new']) == sorted(f'b{i}' for i in range(20))
+    # rowid 1-40 是第一批，前 5 行已删除
+    assert set(fresh.tag_postings['old']) == set(range(6, 41))
+    # 被替换的实例没有被修改
+    assert old_db.index is not fresh.index and old_db.generation < fresh.generation
+    assert set(old_db.tag_postings['old']) == set(range(1, 41))
+
+    assert not shared.refresh()
+    shared.close()
+    writer.close()
+
+
+def test_refresh_reloads_when_the_changes_cannot_be_replayed(tmp_path, vectors):
+    db_path = str(tmp_path / 'knowledge.db')
+    writer = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    ids = writer.insert_many(make_records(vectors[:20], 'a'))
+    shared = open_shared(db_path)
+
+    # 保存快照会清理删除记录，之前的代数无法再增量补齐
+    writer.delete(ids[:5])
+    writer.save_index()
+    assert shared.db.updated_copy() is None
+    assert shared.refresh()
+    assert contents(shared.db, vectors[0]) == sorted(f'a{i}' for i in range(5, 20))
+
+    # 清空数据库不留删除记录，同样需要重新加载
+    writer.clear_database()
+    writer.insert_many(make_records(vectors[20:23], 'b'))
+    assert shared.db.updated_copy() is None
+    assert shared.refresh()
+    assert contents(shared.db, vectors[0]) == ['b0', 'b1', 'b2']
+    shared.close()
+    writer.close()
+
+
+def test_refresh_keeps_the_instance_of_an_in_flight_search(tmp_path, vectors):
+    db_path = str(tmp_path / 'knowledge.db')
+    writer = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    writer.insert_many(make_records(vectors[:10], 'a'))
+    shared = open_shared(db_path)
+
+    with shared.acquire() as db:
+        writer.insert_many(make_records(vectors[10:12], 'b'))
+        assert shared.refresh()
+        # 进行中的调用仍可使用旧实例
+        assert len(contents(db, vectors[0])) == 10
+    assert db._connections == []
+    assert len(contents(shared.db, vectors[0])) == 12
+    shared.close()
+    writer.close()
+
+
+def test_refresh_errors_are_logged(tmp_path, monkeypatch, caplog, vectors):
+    db_path = str(tmp_path / 'knowledge.db')
+    writer = VectorDB(db_path, vector_dim=VECTOR_DIM)
+    writer.insert_many(make_records(vectors[:3], 'a'))
+    writer.close()
+
+    def fail():
+        raise RuntimeError("disk on fire")
+    with caplog.at_level(logging.ERROR, logger='ai_agent_framework.knowledge.shared_vector_db'):
+        shared = SharedVectorDB(db_path, refresh_interval=0.01, vector_dim=VECTOR_DIM)
+        monkeypatch.setattr(shared, 'refresh', fail)
+        for _ in range(100):
+            if caplog.records:
+                break
+            shared._stop_event.wait(0.01)
+        shared.close()
+    assert "Error refreshing shared VectorDB" in caplog.records[0].getMessage()
+    assert caplog.records[0].exc_info[1].args == ("disk on fire",)
+
+
+def test_copy_index_copies_a_memory_mapped_ivf_index(tmp_path, vectors):
+    db_path = str(tmp_path / 'knowledge.db')
+    writer = VectorDB(db_path, index_type='ivf_flat', index_params=IVF_PARAMS, vector_dim=VECTOR_DIM)
+    writer.insert_many(make_records(vectors, 'a'))
+    writer.close()
+
+    reader = VectorDB(db_path, index_type='ivf_flat', index_params=IVF_PARAMS, vector_dim=VECTOR_DIM, read_only=True)
+    assert reader._index_mmapped
+    copy = copy_index(reader.index)
+    # 快照文件删除后副本仍然可用
+    writer._remove_index_snapshot()
+    copy.add_with_ids(vectors[:1] + 10, np.array([1000], dtype=np.int64))
+    assert copy.ntotal == reader.index.ntotal + 1
+    _, ids = copy.search(vectors[:1], 1)
+    _, reader_ids = reader.index.search(vectors[:1], 1)
+    assert ids[0][0] == reader_ids[0][0]
+    assert isinstance(faiss.downcast_InvertedLists(faiss.try_extract_index_ivf(copy).invlists), faiss.ArrayInvertedLists)
+    reader.close()
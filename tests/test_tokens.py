@@ -0,0 +1,77 @@
+import threading
+
+import huggingface_hub
+import pytest
+
+from ai_agent_framework.utils.tokens import TokenCounter, estimate_tokens
+
+
+@pytest.fixture
+def tokenizer_file(tmp_path):
+    """A word-level tokenizer.json, so the tests do not need the Hub"""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    vocab = {"[UNK]": 0, "bitcoin": 1, "rose": 2, "on": 3, "monday": 4}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    path = str(tmp_path / 'tokenizer.json')
+    tokenizer.save(path)
+    return path
+
+
+def test_estimate_tokens_counts_utf8_bytes():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcdefgh") == 3
+    assert estimate_tokens("比特币") == 3
+
+
+def test_local_tokenizer_file_counts_and_truncates(tokenizer_file):
+    counter = TokenCounter(tokenizer_file)
+    assert counter.tokenizer is not None
+    assert counter.count("bitcoin rose on monday") == 4
+    assert counter.count("") == 0
+    assert counter.truncate("bitcoin rose on monday", 2) == "bitcoin rose"
+    assert counter.truncate("bitcoin rose", 5) == "bitcoin rose"
+
+
+def test_cached_tokenizer_is_loaded_without_downloading(monkeypatch, tokenizer_file):
+    calls = []
+
+    def hf_hub_download(repo_id, filename, local_files_only=False):
+        calls.append(local_files_only)
+        return tokenizer_file
+    monkeypatch.setattr(huggingface_hub, 'hf_hub_download', hf_hub_download)
+
+    counter = TokenCounter("Xenova/gpt-4")
+    assert counter.tokenizer is not None
+    assert calls == [True]
+
+
+def test_unreachable_hub_falls_back_to_the_estimate(monkeypatch):
+    release = threading.Event()
+
+    def hf_hub_download(repo_id, filename, local_files_only=False):
+        if local_files_only:
+            raise FileNotFoundError("not cached")
+        # 离线时 Hub 客户端不断重试
+        release.wait(30)
+        raise OSError("Name or service not known")
+    monkeypatch.setattr(huggingface_hub, 'hf_hub_download', hf_hub_download)
+
+    counter = TokenCounter("Xenova/gpt-4", download_timeout=0.1)
+    release.set()
+    assert counter.tokenizer is None
+    text = "Bitcoin rose 5% on Monday."
+    assert counter.count(text) == estimate_tokens(text)
+    assert counter.truncate(text, 2) == text[:8]
+    assert counter.truncate(text, 100) == text
+
+
+def test_failed_download_falls_back_to_the_estimate(monkeypatch):
+    def hf_hub_download(repo_id, filename, local_files_only=False):
+        raise OSError("offline")
+    monkeypatch.setattr(huggingface_hub, 'hf_hub_download', hf_hub_download)
+
+    counter = TokenCounter("Xenova/gpt-4")
+    assert counter.tokenizer is None
+    assert counter.count("abcd") == estimate_tokens("abcd")